@@ -1,15 +1,35 @@
 import json
-import tempfile
+import functools
+from io import BytesIO
 
+import anyio
 import gradio as gr
-import numpy as np
 from gradio.themes.utils import sizes as theme_sizes  # Because Gradio lookup fails
+from PIL import Image
 
 from src.utils import (
-    process_image, download_image, print_event_data, set_default_choice_str,
-    lock_slider_ratio, sync_height_to_width, validate_inputs
+    load_image_source, print_event_data, set_default_choice_str,
+    lock_slider_ratio, sync_height_to_width, validate_inputs, read_settings_file,
+    make_shred_params, to_gradio_error
 )
-from src.image_updater import get_image_url_from_item
+from src.core import ShredderError, ShredParams, render_final_shred_png, breed_sources
+from src.shredder import shred_period, padded_length, parse_strip_schedule, format_strip_schedule
+from src.image_store import image_store
+from src.render_scheduler import render_scheduler, RenderCancelled
+from src.render_cache import render_cache, make_render_key
+from src.pipeline import IncrementalPipeline, session_pipelines
+from src.render_pool import render_pool
+from src.sweep import render_sweep, sweep_chunk_sizes
+from src.seams import analyze_seams
+from src.warm_start import warm_start
+from src.fetcher import image_fetcher, FetchCancelled
+from src.deep_zoom import deep_zoom_views, add_deep_zoom_routes, viewer_iframe_html
+from src.artifacts import artifact_store, artifact_url, add_artifact_routes, DOWNLOAD_JS
+from src.admission import (
+    render_budget, estimate_render_bytes, estimate_export_bytes, estimate_sweep_bytes, downscale_image
+)
+from src.metrics import metrics, traced_request, start_metrics_server, format_trace_markdown
+from src.profiling import request_profiler, profiled_request
 from src.config import (
     DEFAULT_IMAGE_URL, DEFAULT_CHUNK_W, DEFAULT_CHUNK_H,
     MIN_CHUNK_SIZE_PX, INITIAL_MAX_CHUNK_PX, CHUNK_STEP_PX,
@@ -19,11 +39,34 @@ from src.config import (
     OUTPUT_IMAGE_WIDTH_IN_PIXELS, MIN_VALID_OUTPUT_WIDTH,
     DEFAULT_ERROR_DURATION, SAMPLE_IMAGE_CHOICES,
     BUTTON_SINGLE_IMAGE_TEXT, BUTTON_MULTIPLE_IMAGES_TEXT,
-    BUTTON_CUSTOM_URL_TEXT, CHUNK_RATIO_UNLOCKED_LABEL
+    BUTTON_CUSTOM_URL_TEXT, CHUNK_RATIO_UNLOCKED_LABEL, RENDER_BACKEND, RENDER_BACKENDS,
+    DEFAULT_SWEEP_MIN_CHUNK_PX, DEFAULT_SWEEP_MAX_CHUNK_PX, SWEEP_CURRENT_EFFECTS_PRESET,
+    METRICS_PORT, METRICS_HOST, SHOW_DEBUG_PANEL, DEEP_ZOOM_ENABLED, DEEP_ZOOM_VIEWER_HEIGHT_PX,
+    DEFAULT_ITERATIONS, MAX_ITERATIONS, DEFAULT_BREED_SOURCES, MAX_BREED_SOURCES, WARM_START_ENABLED, FETCH_WORKERS
 )
 
+DEEP_ZOOM_PLACEHOLDER = "<p>Load an image to explore its shred here.</p>"
+# Fetching events await upstreams without holding a worker, they share a queue slot pool as large as the fetch pool
+# (Gradio's default runs each event one at a time across all sessions)
+FETCH_EVENT_CONCURRENCY = dict(concurrency_limit=FETCH_WORKERS, concurrency_id="fetch")
+# Rendering events of all sessions share one slot pool per render worker (the render pool's processes with the
+# "process" backend, as many handler threads otherwise). A session's renders still run one at a time (render_scheduler)
+RENDER_EVENT_CONCURRENCY = dict(concurrency_limit=render_pool.workers, concurrency_id="render")
+
 
 def run_app():
+    if RENDER_BACKEND not in RENDER_BACKENDS:
+        raise ValueError(f"Unknown render backend '{RENDER_BACKEND}', expected one of: {', '.join(RENDER_BACKENDS)}.")
+    if RENDER_BACKEND == "process":
+        render_pool.start()  # Workers are warmed up before the first session connects
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT, METRICS_HOST)
+    default_sample = get_sample_item(set_default_choice_str())
+    if WARM_START_ENABLED and default_sample:
+        warm_start.start(default_sample)  # Page loads are served from its prefetched renders
+    if request_profiler.enabled:
+        print(f"🔬 Profiling {request_profiler.rate:.0%} of fetch and redraw requests into {request_profiler.directory}/")
+
     css = """
         .image-load-button { background-color: #FF5733 !important; color: white !important; }
         .settings-save-button { background-color: #28A745 !important; color: white !important; }
@@ -62,7 +105,7 @@ def run_app():
             "Real world example on a photo print using pasta maker: [Top breeder 🐕](https://youtu.be/f1fXCRtSUWU)")
         gr.Markdown("Enter an image URL and tweak the chunk sizes to shred and recombine to simulate it's content multiplication.")
 
-        cached_image_array_state = gr.State(None)
+        cached_image_key_state = gr.State(None)
         cached_image_url_state = gr.State(None)
         is_custom_url_state = gr.State(False)
         chunk_delta_state = gr.State(0)
@@ -77,10 +120,18 @@ def run_app():
             )
 
             with gr.Row(equal_height=True):
-                input_textbox_img_url = gr.Textbox(label='Image URL', value=DEFAULT_IMAGE_URL, scale=6)
+                input_textbox_img_url = gr.Textbox(label='Image URL or local path', value=DEFAULT_IMAGE_URL, scale=6)
                 input_button_update_image = gr.Button(
                     "Reload image", elem_id="Reload button", scale=1, min_width=10, elem_classes=["image-load-button"])
 
+            with gr.Row(equal_height=True, visible=is_multiple_sample(set_default_choice_str())) as breed_row:
+                input_slider_breed_sources = gr.Slider(
+                    minimum=2, maximum=MAX_BREED_SOURCES, step=1, value=DEFAULT_BREED_SOURCES,
+                    label="Breed sources", info="Random images whose strips get interleaved at the current chunk sizes",
+                    scale=6
+                )
+                input_button_breed = gr.Button("🧬 Breed", elem_id="Breed button", scale=1, min_width=10)
+
             with gr.Row():
                 input_slider_chunk_w = gr.Slider(
                     minimum=MIN_CHUNK_SIZE_PX,
@@ -106,6 +157,33 @@ def run_app():
                     interactive=True
                 )
 
+            with gr.Row(equal_height=True):
+                input_field_iterations = gr.Number(
+                    label="Shred Iterations",
+                    info="The final image is shredded again this many times",
+                    value=DEFAULT_ITERATIONS,
+                    precision=0,
+                    minimum=1,
+                    maximum=MAX_ITERATIONS,
+                    scale=1
+                )
+                output_markdown_period = gr.Markdown(format_shred_period(None), container=True)
+
+            with gr.Row():
+                input_textbox_strip_widths = gr.Textbox(
+                    label="Strip Widths",
+                    info="Empty for Chunk Width strips, e.g. '8, 16, 32' (last one repeats), "
+                         "'pattern: 8, 24' or 'geom: 4, 1.5'",
+                    placeholder="Chunk Width",
+                    max_lines=1
+                )
+                input_textbox_strip_heights = gr.Textbox(
+                    label="Strip Heights",
+                    info="Same as Strip Widths, for the rows. The last strip is cut at the edge, no padding",
+                    placeholder="Chunk Height",
+                    max_lines=1
+                )
+
             input_checkboxes_color_effects = gr.CheckboxGroup(
                 label="Color Effects (applied in order)",
                 choices=COLOR_EFFECTS,
@@ -143,11 +221,45 @@ def run_app():
 
         output_image_component = gr.Image(type='pil', show_label=False, format='png')
 
+        with gr.Accordion("Chunk size suggestions", open=False):
+            gr.Markdown(
+                "Chunk sizes whose strip seams blend in best, scored on the loaded image without rendering: "
+                "a seam score of 0 means the shred continues the image, 1.0 seams as strong as a typical pixel step.")
+            input_button_suggest_chunks = gr.Button("Suggest chunk sizes")
+            output_markdown_seams = gr.Markdown(format_seam_suggestions(None))
+            input_dropdown_seam_suggestion = gr.Dropdown(label="Apply suggestion", choices=[], value=None)
+
+        with gr.Accordion("Chunk size sweep", open=False):
+            gr.Markdown("Compare chunk sizes side by side: every width (columns) and height (rows) in the range, one block per effect preset.")
+            with gr.Row():
+                input_field_sweep_min = gr.Number(
+                    label="From (px)", value=DEFAULT_SWEEP_MIN_CHUNK_PX, precision=0, minimum=MIN_CHUNK_SIZE_PX)
+                input_field_sweep_max = gr.Number(
+                    label="To (px)", value=DEFAULT_SWEEP_MAX_CHUNK_PX, precision=0, minimum=MIN_CHUNK_SIZE_PX)
+                input_field_sweep_step = gr.Number(label="Step (px)", value=CHUNK_STEP_PX, precision=0, minimum=1)
+            input_checkboxes_sweep_presets = gr.CheckboxGroup(
+                label="Effect presets",
+                choices=[SWEEP_CURRENT_EFFECTS_PRESET] + COLOR_EFFECTS,
+                value=[SWEEP_CURRENT_EFFECTS_PRESET]
+            )
+            input_button_render_sweep = gr.Button("Render sweep")
+            output_sweep_image_component = gr.Image(type='pil', show_label=False, format='png')
+
+        with gr.Accordion("Deep zoom", open=False, visible=DEEP_ZOOM_ENABLED):
+            gr.Markdown("Pan and zoom the full-resolution final shred, only the visible tiles are rendered and sent.")
+            output_deep_zoom_html = gr.HTML(DEEP_ZOOM_PLACEHOLDER)
+
+        with gr.Accordion("Debug: last request", open=False, visible=SHOW_DEBUG_PANEL):
+            output_debug_markdown = gr.Markdown(format_trace_markdown(None))
+            input_button_refresh_debug = gr.Button("Refresh", size="sm")
+
         with gr.Row():
             input_button_reset_to_defaults = gr.Button("Reset to defaults", elem_id="Reset settings button", elem_classes=["settings-reset-button"])
-            input_button_save_settings = gr.DownloadButton("Download settings", elem_id="Save settings button", elem_classes=["settings-save-button"])
+            input_button_save_settings = gr.Button("Download settings", elem_id="Save settings button", elem_classes=["settings-save-button"])
             input_button_load_settings = gr.UploadButton(
                 "Load settings", file_types=[".json"], elem_id="Load settings button", elem_classes=["settings-load-button"])
+            input_button_export_shred = gr.Button("Download final shred", elem_id="Export shred button")
+        download_url_state = gr.Textbox(visible=False)  # Artifact URL handed to the browser's download
 
         # --------------------------------* Event Handlers *--------------------------------
 
@@ -157,56 +269,72 @@ def run_app():
             input_slider_chunk_w, input_checkbox_chunk_lock_ratio, input_slider_chunk_h, input_checkboxes_color_effects,
             input_slider_brightness, input_slider_contrast, input_checkbox_show_guidelines,
             input_dropdown_guideline_color, input_field_output_width, input_button_reset_to_defaults,
-            input_button_save_settings, input_button_load_settings
+            input_button_save_settings, input_button_load_settings, input_button_export_shred, input_button_breed
         ]
 
         for input_component in all_input_components:
             print_event_data(input_component)
 
-        input_dropdown_sample_images.change(
+        render_events = []  # Followed by the debug panel update
+
+        render_events.append(input_dropdown_sample_images.change(
             fn=fetch_and_process_image,
             inputs=[
                 is_custom_url_state, input_dropdown_sample_images,
                 input_textbox_img_url, input_slider_chunk_w, input_slider_chunk_h,
                 input_checkboxes_color_effects, input_slider_brightness, input_slider_contrast,
-                input_checkbox_show_guidelines, input_dropdown_guideline_color, input_field_output_width
+                input_checkbox_show_guidelines, input_dropdown_guideline_color, input_field_output_width,
+                input_field_iterations, input_textbox_strip_widths, input_textbox_strip_heights
             ],
             outputs=[
-                output_image_component, input_textbox_img_url, cached_image_array_state,
+                output_image_component, input_textbox_img_url, cached_image_key_state,
                 cached_image_url_state, is_custom_url_state
-            ]
-        )
+            ],
+            **FETCH_EVENT_CONCURRENCY
+        ))
 
         def on_sample_change(selected_sample):
-            current_sample = None
-            for item in SAMPLE_IMAGES_DATA:
-                if f"{item['name']} - {item['description']}" == selected_sample:
-                    current_sample = item
-                    break
-            if current_sample and current_sample.get('multiple'):
-                return BUTTON_MULTIPLE_IMAGES_TEXT
+            if is_multiple_sample(selected_sample):
+                return BUTTON_MULTIPLE_IMAGES_TEXT, gr.update(visible=True)
             else:
-                return BUTTON_SINGLE_IMAGE_TEXT
+                return BUTTON_SINGLE_IMAGE_TEXT, gr.update(visible=False)
         input_dropdown_sample_images.change(
             fn=on_sample_change,
             inputs=[input_dropdown_sample_images],
-            outputs=[input_button_update_image]
+            outputs=[input_button_update_image, breed_row]
         )
 
-        input_button_update_image.click(
+        render_events.append(input_button_breed.click(
+            fn=breed_and_process_image,
+            inputs=[
+                input_dropdown_sample_images, input_slider_breed_sources,
+                input_slider_chunk_w, input_slider_chunk_h, input_checkboxes_color_effects,
+                input_slider_brightness, input_slider_contrast,
+                input_checkbox_show_guidelines, input_dropdown_guideline_color, input_field_output_width,
+                input_field_iterations, input_textbox_strip_widths, input_textbox_strip_heights
+            ],
+            outputs=[output_image_component, cached_image_key_state, cached_image_url_state],
+            api_name="breed",
+            **FETCH_EVENT_CONCURRENCY
+        ))
+
+        render_events.append(input_button_update_image.click(
             fn=fetch_and_process_image,
             inputs=[
                 is_custom_url_state, input_dropdown_sample_images, input_textbox_img_url,
                 input_slider_chunk_w, input_slider_chunk_h, input_checkboxes_color_effects,
                 input_slider_brightness, input_slider_contrast,
                 input_checkbox_show_guidelines, input_dropdown_guideline_color,
-                input_field_output_width
+                input_field_output_width, input_field_iterations,
+                input_textbox_strip_widths, input_textbox_strip_heights
             ],
             outputs=[
-                output_image_component, input_textbox_img_url, cached_image_array_state,
+                output_image_component, input_textbox_img_url, cached_image_key_state,
                 cached_image_url_state, is_custom_url_state
-            ]
-        )
+            ],
+            api_name="fetch_image",  # Named API endpoints are what benchmarks.loadtest drives
+            **FETCH_EVENT_CONCURRENCY
+        ))
 
         def on_url_input(url):
             print(f"💬 Image URL input: {url}")
@@ -220,47 +348,61 @@ def run_app():
             outputs=[is_custom_url_state, input_button_update_image]
         )
 
-        input_textbox_img_url.submit(
+        render_events.append(input_textbox_img_url.submit(
             fn=fetch_and_process_image,
             inputs=[
                 is_custom_url_state, input_dropdown_sample_images, input_textbox_img_url,
                 input_slider_chunk_w, input_slider_chunk_h, input_checkboxes_color_effects,
                 input_slider_brightness, input_slider_contrast, input_checkbox_show_guidelines,
-                input_dropdown_guideline_color, input_field_output_width
+                input_dropdown_guideline_color, input_field_output_width, input_field_iterations,
+                input_textbox_strip_widths, input_textbox_strip_heights
             ],
             outputs=[
-                output_image_component, input_textbox_img_url, cached_image_array_state,
+                output_image_component, input_textbox_img_url, cached_image_key_state,
                 cached_image_url_state, is_custom_url_state
-            ]
-        )
+            ],
+            **FETCH_EVENT_CONCURRENCY
+        ))
 
-        for input_component in [
+        redraw_triggers = [input_component.change for input_component in [
             input_slider_chunk_w, input_slider_chunk_h, input_checkboxes_color_effects,
             input_slider_brightness, input_slider_contrast,
-            input_checkbox_show_guidelines, input_field_output_width
-        ]:
-            input_component.change(
+            input_checkbox_show_guidelines, input_field_output_width, input_field_iterations
+        ]]
+        # Strip schedules redraw once typed, not on every keystroke
+        for input_textbox in [input_textbox_strip_widths, input_textbox_strip_heights]:
+            redraw_triggers.extend([input_textbox.submit, input_textbox.blur])
+
+        for i, redraw_trigger in enumerate(redraw_triggers):
+            render_events.append(redraw_trigger(
                 fn=redraw_image,
                 inputs=[
-                    cached_image_array_state, cached_image_url_state,
+                    cached_image_key_state, cached_image_url_state,
                     input_slider_chunk_w, input_slider_chunk_h, input_checkboxes_color_effects,
                     input_slider_brightness, input_slider_contrast,
-                    input_checkbox_show_guidelines, input_dropdown_guideline_color, input_field_output_width
+                    input_checkbox_show_guidelines, input_dropdown_guideline_color, input_field_output_width,
+                    input_field_iterations, input_textbox_strip_widths, input_textbox_strip_heights
                 ],
-                outputs=[output_image_component, cached_image_array_state, cached_image_url_state]
-            )
+                outputs=[output_image_component, cached_image_key_state, cached_image_url_state],
+                trigger_mode="always_last",  # Gradio side coalescing, stale renders are also dropped by render_scheduler
+                api_name="redraw" if i == 0 else None,
+                **RENDER_EVENT_CONCURRENCY
+            ))
 
-        input_dropdown_guideline_color.change(
+        render_events.append(input_dropdown_guideline_color.change(
             fn=redraw_if_guidelines,
             inputs=[
                 input_checkbox_show_guidelines,
-                cached_image_array_state, cached_image_url_state,
+                cached_image_key_state, cached_image_url_state,
                 input_slider_chunk_w, input_slider_chunk_h, input_checkboxes_color_effects,
                 input_slider_brightness, input_slider_contrast,
-                input_checkbox_show_guidelines, input_dropdown_guideline_color, input_field_output_width
+                input_dropdown_guideline_color, input_field_output_width, input_field_iterations,
+                input_textbox_strip_widths, input_textbox_strip_heights
             ],
-            outputs=[output_image_component, cached_image_array_state, cached_image_url_state]
-        )
+            outputs=[output_image_component, cached_image_key_state, cached_image_url_state],
+            trigger_mode="always_last",
+            **RENDER_EVENT_CONCURRENCY
+        ))
 
         input_button_reset_to_defaults.click(
             fn=reset_inputs_and_redraw,
@@ -270,52 +412,106 @@ def run_app():
                 input_slider_chunk_w, input_slider_chunk_h, input_checkboxes_color_effects,
                 input_slider_brightness, input_slider_contrast,
                 input_checkbox_show_guidelines, input_dropdown_guideline_color, input_field_output_width,
-                output_image_component, cached_image_array_state, cached_image_url_state,
+                input_field_iterations, input_textbox_strip_widths, input_textbox_strip_heights,
+                output_image_component, cached_image_key_state, cached_image_url_state,
                 is_custom_url_state, input_button_update_image
-            ]
+            ],
+            **FETCH_EVENT_CONCURRENCY
         )
 
-        # Set up the event handlers for the image processing input components
-        image_processing_input_components = [
-            input_slider_chunk_w, input_slider_chunk_h, input_checkbox_chunk_lock_ratio,
-            input_checkboxes_color_effects, input_slider_brightness, input_slider_contrast
-        ]
-
-        for component in image_processing_input_components:
-            component.change(
-                fn=prepare_settings_file,
-                inputs=[
-                    input_slider_chunk_w, input_slider_chunk_h, input_checkbox_chunk_lock_ratio,
-                    input_checkboxes_color_effects, input_slider_brightness, input_slider_contrast
-                ],
-                outputs=[input_button_save_settings]
-            )
-
+        # Downloads are generated on click only and served from the session's in-memory artifacts
         input_button_save_settings.click(
             fn=prepare_settings_file,
             inputs=[
                 input_slider_chunk_w, input_slider_chunk_h,
                 input_checkbox_chunk_lock_ratio, input_checkboxes_color_effects,
-                input_slider_brightness, input_slider_contrast
+                input_slider_brightness, input_slider_contrast, input_field_iterations,
+                input_textbox_strip_widths, input_textbox_strip_heights
             ],
-            outputs=[input_button_save_settings]
-        )
+            outputs=[download_url_state],
+            api_name="download_settings"
+        ).then(fn=None, inputs=[download_url_state], js=DOWNLOAD_JS)
+
+        input_button_export_shred.click(
+            fn=export_final_shred,
+            inputs=[
+                cached_image_key_state, cached_image_url_state,
+                input_slider_chunk_w, input_slider_chunk_h, input_checkboxes_color_effects,
+                input_slider_brightness, input_slider_contrast,
+                input_checkbox_show_guidelines, input_dropdown_guideline_color,
+                input_field_iterations, input_textbox_strip_widths, input_textbox_strip_heights
+            ],
+            outputs=[download_url_state, cached_image_key_state],
+            api_name="export_shred",
+            **RENDER_EVENT_CONCURRENCY
+        ).then(fn=None, inputs=[download_url_state], js=DOWNLOAD_JS)
 
         input_button_load_settings.upload(
             fn=load_settings_and_redraw,
             inputs=[
                 input_button_load_settings,
-                cached_image_array_state, cached_image_url_state,
+                cached_image_key_state, cached_image_url_state,
                 input_checkbox_show_guidelines, input_dropdown_guideline_color,
                 input_field_output_width
             ],
             outputs=[
                 input_slider_chunk_w, input_slider_chunk_h,
                 input_checkbox_chunk_lock_ratio, input_checkboxes_color_effects,
+                input_slider_brightness, input_slider_contrast, input_field_iterations,
+                input_textbox_strip_widths, input_textbox_strip_heights,
+                output_image_component, cached_image_key_state, cached_image_url_state
+            ],
+            **RENDER_EVENT_CONCURRENCY
+        )
+
+        render_events.append(input_button_render_sweep.click(
+            fn=render_sweep_image,
+            inputs=[
+                cached_image_key_state, cached_image_url_state,
+                input_field_sweep_min, input_field_sweep_max, input_field_sweep_step,
+                input_checkboxes_sweep_presets, input_checkboxes_color_effects,
+                input_slider_brightness, input_slider_contrast, input_field_iterations
+            ],
+            outputs=[output_sweep_image_component, cached_image_key_state],
+            api_name="sweep",
+            **RENDER_EVENT_CONCURRENCY
+        ))
+
+        input_button_suggest_chunks.click(
+            fn=suggest_chunk_sizes,
+            inputs=[cached_image_key_state, cached_image_url_state],
+            outputs=[output_markdown_seams, input_dropdown_seam_suggestion, cached_image_key_state],
+            api_name="suggest_chunk_sizes",
+            **RENDER_EVENT_CONCURRENCY
+        )
+        input_dropdown_seam_suggestion.input(
+            fn=apply_seam_suggestion,
+            inputs=[input_dropdown_seam_suggestion],
+            outputs=[input_slider_chunk_w, input_slider_chunk_h, chunk_delta_state]
+        )
+
+        if DEEP_ZOOM_ENABLED:
+            deep_zoom_inputs = [
+                cached_image_key_state, cached_image_url_state,
+                input_slider_chunk_w, input_slider_chunk_h, input_checkboxes_color_effects,
                 input_slider_brightness, input_slider_contrast,
-                output_image_component, cached_image_array_state, cached_image_url_state
+                input_checkbox_show_guidelines, input_dropdown_guideline_color, input_field_iterations,
+                input_textbox_strip_widths, input_textbox_strip_heights
             ]
-        )
+            for event in render_events[:-1]:  # The sweep leaves the shred untouched
+                event.then(fn=show_deep_zoom_view, inputs=deep_zoom_inputs, outputs=[output_deep_zoom_html])
+
+        period_inputs = [
+            cached_image_key_state, input_slider_chunk_w, input_slider_chunk_h, input_field_iterations,
+            input_textbox_strip_widths, input_textbox_strip_heights
+        ]
+        for event in render_events[:-1]:
+            event.then(fn=show_shred_period, inputs=period_inputs, outputs=[output_markdown_period])
+
+        if SHOW_DEBUG_PANEL:
+            for event in render_events:
+                event.then(fn=show_last_request, inputs=[], outputs=[output_debug_markdown])
+            input_button_refresh_debug.click(fn=show_last_request, inputs=[], outputs=[output_debug_markdown])
 
         # Chunk size event handlers
         slider_sync_triggers = [input_checkbox_chunk_lock_ratio, input_slider_chunk_w]
@@ -332,7 +528,7 @@ def run_app():
             outputs=[input_slider_chunk_h]
         )
 
-        image_shredder_app.load(
+        initial_load_event = image_shredder_app.load(
             fn=initial_load_action,
             inputs=[],
             outputs=[
@@ -340,16 +536,33 @@ def run_app():
                 input_slider_chunk_w, input_slider_chunk_h, input_checkboxes_color_effects,
                 input_slider_brightness, input_slider_contrast,
                 input_checkbox_show_guidelines, input_dropdown_guideline_color, input_field_output_width,
-                output_image_component, cached_image_array_state, cached_image_url_state,
+                input_field_iterations, input_textbox_strip_widths, input_textbox_strip_heights,
+                output_image_component, cached_image_key_state, cached_image_url_state,
                 is_custom_url_state, input_button_update_image
-            ]
+            ],
+            api_name="load",
+            **FETCH_EVENT_CONCURRENCY
         )
+        initial_load_event.then(fn=show_shred_period, inputs=period_inputs, outputs=[output_markdown_period])
+        if DEEP_ZOOM_ENABLED:
+            initial_load_event.then(fn=show_deep_zoom_view, inputs=deep_zoom_inputs, outputs=[output_deep_zoom_html])
 
-    image_shredder_app.launch()
+    image_shredder_app.unload(fn=on_session_unload)
 
+    # Download and tile routes are added to the launched app, so they are served from the same origin as the UI
+    image_shredder_app.launch(prevent_thread_lock=True)
+    add_artifact_routes(image_shredder_app.server_app)
+    if DEEP_ZOOM_ENABLED:
+        add_deep_zoom_routes(image_shredder_app.server_app)
+    image_shredder_app.block_thread()
 
-def prepare_settings_file(chunk_w, chunk_h, is_locked, color_effects, brightness, contrast):
-    """Prepares the current settings, dumps to a temporary JSON file and returns its path for download button."""
+
+def prepare_settings_file(
+    chunk_w, chunk_h, is_locked, color_effects, brightness, contrast, iterations=DEFAULT_ITERATIONS,
+    strip_widths="", strip_heights="",
+    request: gr.Request = None
+):
+    """Dumps the current settings to a JSON artifact of the session and returns its download URL."""
     settings = {
         "chunk_w": chunk_w,
         "chunk_h": chunk_h,
@@ -357,47 +570,145 @@ def prepare_settings_file(chunk_w, chunk_h, is_locked, color_effects, brightness
         "color_effects": color_effects,
         "brightness": brightness,
         "contrast": contrast,
+        "iterations": iterations,
+        "strip_widths": strip_widths,
+        "strip_heights": strip_heights,
     }
-    file_name = "image_shredder_settings"
-    safe_name = "".join(c for c in str(file_name) if c.isalnum() or c in ("-", "_")).rstrip()
-    if not safe_name:
-        safe_name = "settings"
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".json", prefix=safe_name + "_", mode="w", encoding="utf-8")
-    json.dump(settings, tmp, indent=4)
-    tmp.close()
-    # print(f"Settings prepared for download: {tmp.name}")
-    return gr.update(value=tmp.name)
+    file_name = "image_shredder_settings.json"
+    artifact_id = artifact_store.put(
+        request.session_hash if request is not None else None, file_name,
+        json.dumps(settings, indent=4).encode("utf-8"), "application/json"
+    )
+    return artifact_url(artifact_id, file_name)
+
+
+@traced_request("export")
+def export_final_shred(
+    image_key, image_url,
+    chunk_w, chunk_h, color_effects,
+    brightness_offset, contrast_factor,
+    show_guidelines, guideline_color_name, iterations=DEFAULT_ITERATIONS,
+    strip_widths="", strip_heights="",
+    request: gr.Request = None
+):
+    """Renders the full-resolution final shred as a PNG artifact of the session, returns its URL and the image key."""
+    params = make_shred_params(
+        chunk_w, chunk_h, color_effects, brightness_offset, contrast_factor, show_guidelines,
+        GUIDELINE_COLORS.get(guideline_color_name, GUIDELINE_COLORS[DEFAULT_GUIDELINE_COLOR_NAME]),
+        OUTPUT_IMAGE_WIDTH_IN_PIXELS, iterations, strip_widths, strip_heights
+    )
+    img_array, image_key = get_stored_image(image_key, image_url)
+    if img_array is None:
+        raise gr.Error("No image loaded. Please fetch an image first.", title="Export Error")
+    try:
+        with render_budget.admit(img_array.shape, lambda shape: estimate_export_bytes(shape, params)) as admission:
+            if admission.scale < 1:
+                img_array = downscale_image(img_array, admission.shape)
+                gr.Warning(
+                    f"Image downscaled to {admission.shape[1]}x{admission.shape[0]} to fit the server's memory budget.")
+            png_data = render_final_shred_png(img_array, params)
+        file_name = f"shred_{params.chunk_w}x{params.chunk_h}.png"
+        artifact_id = artifact_store.put(
+            request.session_hash if request is not None else None, file_name, png_data, "image/png")
+    except ShredderError as e:
+        raise to_gradio_error(e, title="Export Error") from e
+    except ValueError as e:  # Larger than the artifact store
+        raise gr.Error(str(e), title="Export Error")
+    return artifact_url(artifact_id, file_name), image_key
+
+
+def show_deep_zoom_view(
+    image_key, image_url,
+    chunk_w, chunk_h, color_effects,
+    brightness_offset, contrast_factor,
+    show_guidelines, guideline_color_name, iterations=DEFAULT_ITERATIONS, strip_widths="", strip_heights=""
+):
+    """Registers the current final shred as a deep-zoom view and returns the viewer iframe."""
+    if not image_key:
+        return DEEP_ZOOM_PLACEHOLDER
+    try:
+        params = ShredParams.from_values(
+            chunk_w, chunk_h, color_effects, brightness_offset, contrast_factor, show_guidelines,
+            GUIDELINE_COLORS.get(guideline_color_name, GUIDELINE_COLORS[DEFAULT_GUIDELINE_COLOR_NAME]),
+            iterations=iterations, strip_widths=strip_widths, strip_heights=strip_heights
+        )
+    except ShredderError:
+        return gr.skip()  # The render already reported it
+    img_array = image_store.get(image_key)
+    if img_array is None:
+        return DEEP_ZOOM_PLACEHOLDER
+    view_id = deep_zoom_views.register(
+        image_key, params, lambda: image_store.get(image_key), img_array.shape, image_url)
+    return viewer_iframe_html(view_id, DEEP_ZOOM_VIEWER_HEIGHT_PX)
+
+
+def show_shred_period(image_key, chunk_w, chunk_h, iterations, strip_widths="", strip_heights=""):
+    """Return period of the current shred (image size, chunk sizes and strip schedules) for the iterations field."""
+    img_array = image_store.get(image_key) if image_key else None
+    try:
+        chunk_w, chunk_h, iterations = int(chunk_w), int(chunk_h), int(iterations)
+    except (TypeError, ValueError):
+        return gr.skip()
+    if img_array is None or chunk_w < 2 or chunk_h < 2:
+        return format_shred_period(None)
+    try:
+        strip_widths = format_strip_schedule(parse_strip_schedule(strip_widths))
+        strip_heights = format_strip_schedule(parse_strip_schedule(strip_heights))
+    except ValueError:
+        return gr.skip()  # The render reports invalid schedules
+    padded_h = padded_length(img_array.shape[0], chunk_h, strip_heights)
+    padded_w = padded_length(img_array.shape[1], chunk_w, strip_widths)
+    return format_shred_period(
+        shred_period(padded_h, padded_w, chunk_w, chunk_h, strip_widths, strip_heights), iterations)
+
+
+def format_shred_period(period, iterations=DEFAULT_ITERATIONS):
+    if period is None:
+        return "Return period: load an image"
+    if iterations % period == 0:
+        return f"Return period: **{period}** iterations (this one shows the original image)"
+    return f"Return period: **{period}** iterations (the image returns to the original every {period} shreds)"
+
 
+def show_last_request(request: gr.Request = None):
+    """Stage breakdown of the session's last request for the debug panel."""
+    return format_trace_markdown(metrics.last_trace(request.session_hash if request is not None else None))
 
+
+@traced_request("load_settings")
 def load_settings_and_redraw(
     uploaded_file,
-    img_array, image_url,
-    show_guidelines, guideline_color_name, output_image_width
+    image_key, image_url,
+    show_guidelines, guideline_color_name, output_image_width,
+    request: gr.Request = None
 ):
     """Loads settings from an uploaded JSON file and redraws the image."""
     if uploaded_file is None:
         gr.Warning("No file uploaded.")
-        return (gr.skip(),) * 9
+        return (gr.skip(),) * 12
 
     try:
-        with open(uploaded_file.name, 'r', encoding='utf-8') as f:
-            settings = json.load(f)
+        settings = read_settings_file(uploaded_file.name)
     except Exception as e:
         raise gr.Error(f"Failed to load or parse settings file: {e}")
 
-    chunk_w = settings.get("chunk_w", DEFAULT_CHUNK_W)
-    chunk_h = settings.get("chunk_h", DEFAULT_CHUNK_H)
-    is_locked = settings.get("is_locked", False)
-    color_effects = settings.get("color_effects", DEFAULT_COLOR_EFFECT)
-    brightness = settings.get("brightness", DEFAULT_BRIGHTNESS)
-    contrast = settings.get("contrast", DEFAULT_CONTRAST)
+    chunk_w = settings["chunk_w"]
+    chunk_h = settings["chunk_h"]
+    is_locked = settings["is_locked"]
+    color_effects = settings["color_effects"]
+    brightness = settings["brightness"]
+    contrast = settings["contrast"]
+    iterations = settings["iterations"]
+    strip_widths = settings["strip_widths"]
+    strip_heights = settings["strip_heights"]
 
     try:
-        processed_img, new_img_array, new_image_url = redraw_image(
-            img_array, image_url,
+        processed_img, new_image_key, new_image_url = redraw_image(
+            image_key, image_url,
             chunk_w, chunk_h, color_effects,
             brightness, contrast,
-            show_guidelines, guideline_color_name, output_image_width
+            show_guidelines, guideline_color_name, output_image_width, iterations, strip_widths, strip_heights,
+            request=request
         )
 
         return (
@@ -407,52 +718,82 @@ def load_settings_and_redraw(
             gr.update(value=color_effects),
             gr.update(value=brightness),
             gr.update(value=contrast),
+            gr.update(value=iterations),
+            gr.update(value=strip_widths),
+            gr.update(value=strip_heights),
             processed_img,
-            new_img_array,
+            new_image_key,
             new_image_url
         )
     except Exception as e:
         raise gr.Error(f"Error applying loaded settings: {e}")
 
 
-def redraw_if_guidelines(show_guidelines, *args):
+def redraw_if_guidelines(
+    show_guidelines, image_key, image_url,
+    chunk_w, chunk_h, color_effects,
+    brightness_offset, contrast_factor,
+    guideline_color_name, output_image_width, iterations=DEFAULT_ITERATIONS,
+    strip_widths="", strip_heights="",
+    request: gr.Request = None
+):
     if show_guidelines:
-        return redraw_image(*args)
+        return redraw_image(
+            image_key, image_url,
+            chunk_w, chunk_h, color_effects,
+            brightness_offset, contrast_factor,
+            show_guidelines, guideline_color_name, output_image_width, iterations, strip_widths, strip_heights,
+            request=request
+        )
     else:
         return gr.skip(), gr.skip(), gr.skip()
 
 
-def fetch_and_process_image(
+def on_session_unload(request: gr.Request):
+    image_fetcher.cancel(request.session_hash)
+    render_scheduler.forget(request.session_hash)
+    session_pipelines.forget(request.session_hash)
+    artifact_store.forget(request.session_hash)
+
+
+@traced_request("fetch")
+@profiled_request("fetch")
+async def fetch_and_process_image(
     is_custom_url,
     selected_sample_choice_str,
     url_from_input_field,
     chunk_w, chunk_h, color_effects,
     brightness_offset, contrast_factor,
-    show_guidelines, guideline_color_name, output_image_width
+    show_guidelines, guideline_color_name, output_image_width, iterations=DEFAULT_ITERATIONS,
+    strip_widths="", strip_heights="",
+    request: gr.Request = None
 ):
     """
         Fetches (scrapes if needed) and processes the image.
+        Scrape and download are awaited under deadlines on the fetch pool (src.fetcher), the session's next image
+        request or its disconnect cancels them. The render runs in a handler thread (or the render pool).
         Returns: processed_img, new_image_url, new_cached_array, new_cached_url
     """
     image_url = url_from_input_field
+    session_id = request.session_hash if request is not None else None
+    if request is not None:
+        # A new image makes all pending redraws of the previous one obsolete
+        render_scheduler.supersede(session_id)
     try:
-        validate_inputs(chunk_w, chunk_h, brightness_offset, contrast_factor, output_image_width)
+        validate_inputs(
+            chunk_w, chunk_h, brightness_offset, contrast_factor, output_image_width, iterations,
+            strip_widths, strip_heights
+        )
 
+        current_sample = None
         if not is_custom_url and selected_sample_choice_str:
-            current_sample = None
-            for item in SAMPLE_IMAGES_DATA:
-                if f"{item['name']} - {item['description']}" == selected_sample_choice_str:
-                    current_sample = item
-                    break
-
-            if current_sample:
-                if current_sample.get("scraping"):
-                    image_url = get_image_url_from_item(current_sample)
-                else:
-                    image_url = current_sample.get("image_url") or current_sample.get("source_url")
+            current_sample = get_sample_item(selected_sample_choice_str)
 
         try:
-            img_array = download_image(image_url)
+            img_array, image_url = await image_fetcher.fetch(session_id, item=current_sample, image_url=image_url)
+            image_key = image_store.put(img_array)
+        except FetchCancelled:
+            raise
         except Exception as e:
             raise gr.Error(
                 f"{str(e)}",
@@ -460,20 +801,19 @@ def fetch_and_process_image(
                 title="Image Fetching Error"
             )
 
-        guideline_color_rgb = np.array(GUIDELINE_COLORS.get(
-            guideline_color_name, GUIDELINE_COLORS[DEFAULT_GUIDELINE_COLOR_NAME]), dtype=np.uint8)
-        processed_img = process_image(
-            base_img_array=img_array,
-            chunk_w=chunk_w, chunk_h=chunk_h,
-            color_effects=color_effects,
-            brightness_offset=brightness_offset,
-            contrast_factor=contrast_factor,
-            show_guidelines=show_guidelines,
-            guideline_color_rgb_array=guideline_color_rgb,
-            output_image_width=output_image_width,
-            image_url=image_url
-        )
-        return processed_img, image_url, img_array, image_url, False
+        processed_img, image_key = await anyio.to_thread.run_sync(functools.partial(
+            render_stored_image,
+            image_key, image_url,
+            chunk_w, chunk_h, color_effects,
+            brightness_offset, contrast_factor,
+            show_guidelines, guideline_color_name, output_image_width, iterations, strip_widths, strip_heights,
+            session_id=session_id
+        ))
+        return processed_img, image_url, image_key, image_url, False
+    except FetchCancelled:
+        # Superseded by a newer image request (which updates the outputs) or the session is gone
+        metrics.annotate(outcome="cancelled")
+        return gr.skip(), gr.skip(), gr.skip(), gr.skip(), gr.skip()
     # except gr.Error:
     #     raise
     except Exception as e:
@@ -486,39 +826,194 @@ def fetch_and_process_image(
         return None, image_url, None, image_url, is_custom_url
 
 
-def redraw_image(
-    img_array, image_url,
+@traced_request("breed")
+async def breed_and_process_image(
+    selected_sample_choice_str, breed_sources_count,
     chunk_w, chunk_h, color_effects,
     brightness_offset, contrast_factor,
-    show_guidelines, guideline_color_name, output_image_width
+    show_guidelines, guideline_color_name, output_image_width, iterations=DEFAULT_ITERATIONS,
+    strip_widths="", strip_heights="",
+    request: gr.Request = None
 ):
     """
-    Processes the already-fetched image with new parameters.
+        Fetches several images of the selected random sample source, interleaves their strips and processes the result.
+        The images are fetched concurrently on the fetch pool under one deadline (src.fetcher), the session's next
+        image request or its disconnect cancels them.
+        Returns: processed_img, new_cached_array, new_cached_url (None, a bred image can't be fetched again)
     """
+    session_id = request.session_hash if request is not None else None
+    if request is not None:
+        render_scheduler.supersede(session_id)
+    params = make_shred_params(
+        chunk_w, chunk_h, color_effects, brightness_offset, contrast_factor, show_guidelines, None,
+        output_image_width, iterations, strip_widths, strip_heights
+    )
+    current_sample = get_sample_item(selected_sample_choice_str)
+    if not current_sample or not current_sample.get("multiple"):
+        raise gr.Error("Breeding needs a random image sample source.", title="Breeding Error")
+
     try:
-        validate_inputs(chunk_w, chunk_h, brightness_offset, contrast_factor, output_image_width)
+        fetched = await image_fetcher.fetch_many(session_id, current_sample, int(breed_sources_count))
+    except FetchCancelled:
+        metrics.annotate(outcome="cancelled")
+        return gr.skip(), gr.skip(), gr.skip()
+    except ShredderError as e:
+        raise to_gradio_error(e) from e
+    images = [img for img, _ in fetched]
+    del fetched
+    return await anyio.to_thread.run_sync(functools.partial(
+        _breed_and_render, images, params,
+        chunk_w, chunk_h, color_effects,
+        brightness_offset, contrast_factor,
+        show_guidelines, guideline_color_name, output_image_width, iterations, strip_widths, strip_heights,
+        session_id=session_id
+    ))
+
+
+def _breed_and_render(images, params, *render_args, session_id=None):
+    try:
+        with metrics.span("breed"):
+            bred_img = breed_sources(images, params)
+    except ShredderError as e:
+        raise to_gradio_error(e, title="Breeding Error") from e
+    images.clear()
+    image_key = image_store.put(bred_img)
+    processed_img, image_key = render_stored_image(image_key, None, *render_args, session_id=session_id)
+    return processed_img, image_key, None
+
+
+def get_stored_image(image_key, image_url):
+    """
+    Returns the session's image from the shared store and its key.
+    Evicted images are reloaded from the cached URL (random image sources return a new image).
+    """
+    img_array = image_store.get(image_key)
+    if img_array is None and image_url:
+        print(f"Info: Image '{image_key}' evicted from the store, reloading from {image_url}")
+        image_key = image_store.put(load_image_source(image_url))
+        img_array = image_store.get(image_key)
+    return img_array, image_key
+
+
+def render_stored_image(
+    image_key, image_url,
+    chunk_w, chunk_h, color_effects,
+    brightness_offset, contrast_factor,
+    show_guidelines, guideline_color_name, output_image_width, iterations=DEFAULT_ITERATIONS,
+    strip_widths="", strip_heights="",
+    cancel_check=None, session_id=None
+):
+    """
+    Renders the stored image, memoized in the shared render cache of encoded outputs.
+    Cache misses run the session's incremental pipeline, which recomputes only the stages affected by changed inputs,
+    or a full render in a worker process with the process render backend.
+    Returns the render as a PNG file path (a PIL image if it doesn't fit the cache) and the image key (changes if
+    an evicted image got reloaded). Cached renders are served as is, a PIL image would be re-encoded on every hit.
+    """
+    params = make_shred_params(
+        chunk_w, chunk_h, color_effects, brightness_offset, contrast_factor, show_guidelines,
+        GUIDELINE_COLORS.get(guideline_color_name, GUIDELINE_COLORS[DEFAULT_GUIDELINE_COLOR_NAME]),
+        output_image_width, iterations, strip_widths, strip_heights
+    )
+    cache_key = make_render_key(image_key, params, image_url)
+    png_data = render_cache.get(cache_key)
+    metrics.annotate(render_cache="hit" if png_data is not None else "miss")
+    if png_data is None:
+        img_array, loaded_image_key = get_stored_image(image_key, image_url)
         if img_array is None:
             raise gr.Error(
                 "No image loaded. Please fetch an image first.",
                 duration=DEFAULT_ERROR_DURATION,
                 title="Image Redraw Error"
             )
+        metrics.annotate(image_width=int(img_array.shape[1]), image_height=int(img_array.shape[0]))
+
+        # Taken before admission, so reclaiming retained stage results spares this session's as long as possible
+        pipeline = None
+        if RENDER_BACKEND != "process":
+            pipeline = session_pipelines.get(session_id) if session_id else IncrementalPipeline()
+        try:
+            with render_budget.admit(
+                img_array.shape, lambda shape: estimate_render_bytes(shape, params), cancel_check
+            ) as admission:
+                render_key, load_image = loaded_image_key, lambda: img_array
+                if admission.scale < 1:
+                    # Downscaled sources get their own key, the session pipeline keeps full-size stages apart
+                    render_key = f"{loaded_image_key}@{admission.shape[1]}x{admission.shape[0]}"
+                    load_image = lambda: downscale_image(img_array, admission.shape)  # noqa: E731
+                    metrics.annotate(downscaled_to=f"{admission.shape[1]}x{admission.shape[0]}")
+                    gr.Warning(
+                        f"Image downscaled to {admission.shape[1]}x{admission.shape[0]} to fit the server's memory budget.")
+                if RENDER_BACKEND == "process":
+                    png_data = render_pool.render(
+                        render_key, load_image, params, image_url=image_url, cancel_check=cancel_check)
+                else:
+                    png_data = pipeline.run(params, render_key, load_image, image_url=image_url, cancel_check=cancel_check)
+                    metrics.annotate(recomputed=",".join(pipeline.last_recomputed))
+        except ShredderError as e:
+            raise to_gradio_error(e) from e
+        image_key = loaded_image_key
+        cache_key = make_render_key(image_key, params, image_url)
+        render_cache.put(cache_key, png_data)
+    path = render_cache.path(cache_key)
+    if path is None:  # Larger than the whole cache
+        return Image.open(BytesIO(png_data)), image_key
+    return path, image_key
+
+
+@traced_request("redraw")
+@profiled_request("redraw")
+def redraw_image(
+    image_key, image_url,
+    chunk_w, chunk_h, color_effects,
+    brightness_offset, contrast_factor,
+    show_guidelines, guideline_color_name, output_image_width, iterations=DEFAULT_ITERATIONS,
+    strip_widths="", strip_heights="",
+    request: gr.Request = None
+):
+    """
+    Processes the already-fetched image with new parameters.
+    Renders are scheduled latest-wins per session, superseded ones are dropped and leave the outputs untouched.
+    """
+    if request is None:
+        return _redraw_image(
+            image_key, image_url, chunk_w, chunk_h, color_effects, brightness_offset, contrast_factor,
+            show_guidelines, guideline_color_name, output_image_width, iterations, strip_widths, strip_heights
+        )
+    try:
+        with render_scheduler.render(request.session_hash) as ticket:
+            return _redraw_image(
+                image_key, image_url, chunk_w, chunk_h, color_effects, brightness_offset, contrast_factor,
+                show_guidelines, guideline_color_name, output_image_width, iterations, strip_widths, strip_heights,
+                cancel_check=ticket.check, session_id=request.session_hash
+            )
+    except RenderCancelled:
+        metrics.annotate(outcome="cancelled")
+        return gr.skip(), gr.skip(), gr.skip()
 
-        guideline_color_rgb = np.array(GUIDELINE_COLORS.get(
-            guideline_color_name, GUIDELINE_COLORS[DEFAULT_GUIDELINE_COLOR_NAME]), dtype=np.uint8)
-        processed_img = process_image(
-            base_img_array=img_array,
-            chunk_w=chunk_w, chunk_h=chunk_h,
-            color_effects=color_effects,
-            brightness_offset=brightness_offset,
-            contrast_factor=contrast_factor,
-            show_guidelines=show_guidelines,
-            guideline_color_rgb_array=guideline_color_rgb,
-            output_image_width=output_image_width,
-            image_url=image_url
+
+def _redraw_image(
+    image_key, image_url,
+    chunk_w, chunk_h, color_effects,
+    brightness_offset, contrast_factor,
+    show_guidelines, guideline_color_name, output_image_width, iterations=DEFAULT_ITERATIONS,
+    strip_widths="", strip_heights="",
+    cancel_check=None, session_id=None
+):
+    try:
+        validate_inputs(
+            chunk_w, chunk_h, brightness_offset, contrast_factor, output_image_width, iterations,
+            strip_widths, strip_heights
         )
-        return processed_img, img_array, image_url
-    except gr.Error:
+        processed_img, image_key = render_stored_image(
+            image_key, image_url,
+            chunk_w, chunk_h, color_effects,
+            brightness_offset, contrast_factor,
+            show_guidelines, guideline_color_name, output_image_width, iterations, strip_widths, strip_heights,
+            cancel_check=cancel_check, session_id=session_id
+        )
+        return processed_img, image_key, image_url
+    except (gr.Error, RenderCancelled):
         raise
     except Exception as e:
         raise gr.Error(
@@ -528,8 +1023,87 @@ def redraw_image(
         )
 
 
-def initial_load_action():
-    return reset_inputs_and_redraw()
+@traced_request("sweep")
+def render_sweep_image(
+    image_key, image_url,
+    sweep_min, sweep_max, sweep_step, effect_presets,
+    color_effects, brightness_offset, contrast_factor, iterations=DEFAULT_ITERATIONS
+):
+    """Renders the chunk size sweep contact sheet of the stored image."""
+    try:
+        chunk_sizes = sweep_chunk_sizes(sweep_min, sweep_max, sweep_step)
+        params = make_shred_params(
+            chunk_sizes[0], chunk_sizes[0], color_effects, brightness_offset, contrast_factor,
+            False, None, OUTPUT_IMAGE_WIDTH_IN_PIXELS, iterations
+        )
+        img_array, image_key = get_stored_image(image_key, image_url)
+        if img_array is None:
+            raise gr.Error("No image loaded. Please fetch an image first.", title="Sweep Error")
+        presets = [
+            color_effects if preset == SWEEP_CURRENT_EFFECTS_PRESET else [preset]
+            for preset in (effect_presets or [SWEEP_CURRENT_EFFECTS_PRESET])
+        ]
+        estimate = lambda shape: estimate_sweep_bytes(shape, chunk_sizes, chunk_sizes, presets, params)  # noqa: E731
+        with render_budget.admit(img_array.shape, estimate) as admission:
+            if admission.scale < 1:
+                img_array = downscale_image(img_array, admission.shape)
+                gr.Warning(
+                    f"Image downscaled to {admission.shape[1]}x{admission.shape[0]} to fit the server's memory budget.")
+            sheet = render_sweep(img_array, chunk_sizes, chunk_sizes, presets, params)
+    except ShredderError as e:
+        raise to_gradio_error(e, title="Sweep Error") from e
+    return sheet, image_key
+
+
+@traced_request("seams")
+def suggest_chunk_sizes(image_key, image_url):
+    """Scores the slider's chunk sizes by the seams they would leave in the stored image, best ones first."""
+    try:
+        img_array, image_key = get_stored_image(image_key, image_url)
+        if img_array is None:
+            raise gr.Error("No image loaded. Please fetch an image first.", title="Seam Analysis Error")
+        with metrics.span("seams"):
+            suggestions = analyze_seams(img_array).suggestions()
+    except ShredderError as e:
+        raise to_gradio_error(e, title="Seam Analysis Error") from e
+    choices = [(f"{w} x {h} px (score {score:.3f})", f"{w}x{h}") for w, h, score in suggestions]
+    return format_seam_suggestions(suggestions), gr.update(choices=choices, value=None), image_key
+
+
+def format_seam_suggestions(suggestions):
+    if suggestions is None:
+        return "Load an image and press **Suggest chunk sizes**."
+    if not suggestions:
+        return "The image is too small for the chunk size range, every size leaves fewer than 3 strips."
+    rows = [f"| {w} x {h} px | {score:.3f} |" for w, h, score in suggestions]
+    return "\n".join(["| Chunk width x height | Seam score (lower is better) |", "|---|---|", *rows])
+
+
+def apply_seam_suggestion(suggestion):
+    """Sets the chunk sliders to a suggestion ("WxH"), the slider changes redraw the image."""
+    if not suggestion:
+        return gr.skip(), gr.skip(), gr.skip()
+    new_w, new_h = (int(value) for value in suggestion.split("x"))
+    return new_w, new_h, new_h - new_w  # The delta keeps a locked ratio on the suggestion
+
+
+@traced_request("load")
+async def initial_load_action(request: gr.Request = None):
+    return await reset_inputs_and_redraw(request)
+
+
+def get_sample_item(sample_choice_str):
+    """The SAMPLE_IMAGES_DATA entry of a sample choice, None if there's no such sample."""
+    for item in SAMPLE_IMAGES_DATA:
+        if f"{item['name']} - {item['description']}" == sample_choice_str:
+            return item
+    return None
+
+
+def is_multiple_sample(sample_choice_str):
+    """Whether the sample returns a different image on every fetch (breeding and "Change image")."""
+    item = get_sample_item(sample_choice_str)
+    return bool(item and item.get('multiple'))
 
 
 def get_image_load_button_text(sample_choice_str):
@@ -548,7 +1122,7 @@ def get_image_load_button_text(sample_choice_str):
         return BUTTON_CUSTOM_URL_TEXT
 
 
-def reset_inputs_and_redraw():
+async def reset_inputs_and_redraw(request: gr.Request = None):
     default_choice_str = set_default_choice_str()
     submit_button_text = get_image_load_button_text(default_choice_str)
     default_url = DEFAULT_IMAGE_URL
@@ -560,20 +1134,31 @@ def reset_inputs_and_redraw():
     default_show_guidelines = DEFAULT_SHOW_GUIDELINES
     default_guideline_color = DEFAULT_GUIDELINE_COLOR_NAME
     default_output_width = OUTPUT_IMAGE_WIDTH_IN_PIXELS
-
-    processed_img, image_url, img_array, cached_url, is_custom_url = fetch_and_process_image(
-        False,
-        default_choice_str, default_url,
-        default_chunk_w, default_chunk_h, default_color_effects,
-        default_brightness, default_contrast,
-        default_show_guidelines, default_guideline_color, default_output_width
-    )
+    default_iterations = DEFAULT_ITERATIONS
+    default_strip_widths = default_strip_heights = ""
+
+    warm_render = warm_start.take()
+    metrics.annotate(warm_start="hit" if warm_render is not None else "miss")
+    if warm_render is not None:
+        processed_img = warm_render.path  # Served as is, a PIL image would be re-encoded
+        image_url = cached_url = warm_render.image_url
+        image_key, is_custom_url = warm_render.image_key, False
+    else:
+        processed_img, image_url, image_key, cached_url, is_custom_url = await fetch_and_process_image(
+            False,
+            default_choice_str, default_url,
+            default_chunk_w, default_chunk_h, default_color_effects,
+            default_brightness, default_contrast,
+            default_show_guidelines, default_guideline_color, default_output_width, default_iterations,
+            default_strip_widths, default_strip_heights, request=request
+        )
 
     return (
         default_choice_str, image_url, default_chunk_w, default_chunk_h,
         default_color_effects, default_brightness, default_contrast,
-        default_show_guidelines, default_guideline_color, default_output_width,
-        processed_img, img_array, cached_url, is_custom_url, submit_button_text
+        default_show_guidelines, default_guideline_color, default_output_width, default_iterations,
+        default_strip_widths, default_strip_heights,
+        processed_img, image_key, cached_url, is_custom_url, submit_button_text
     )
 
 
@@ -0,0 +1,7 @@
+"""
+Benchmark suite of the shredder stages on synthetic images.
+
+    python -m benchmarks run [-o baseline.json] [--sizes 256,1024,4k] [--filter shred] [--repeats 5]
+    python -m benchmarks compare baseline.json current.json [--threshold 0.15]
+    python -m benchmarks loadtest [--sessions 4] [--rounds 3]
+"""
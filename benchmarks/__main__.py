@@ -0,0 +1,139 @@
+import sys
+import argparse
+
+from benchmarks.suite import IMAGE_SIZES, DEFAULT_SIZES, run_suite
+from benchmarks.estimates import DEFAULT_ESTIMATE_SIZES, check_estimates
+from benchmarks.seams import check_seam_ranking
+from benchmarks.memory import check_memory_accounting
+from benchmarks.upstream_stub import DEFAULT_IMAGE_SIZE, serve
+from benchmarks.loadtest import run_loadtest, print_results
+from benchmarks.loadtest import save_results as save_loadtest_results
+from benchmarks.compare import (
+    DEFAULT_MIN_TIME_S, load_results, save_results, compare_results, print_comparison
+)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="benchmarks", description="Shredder stage benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Run the suite and write a JSON baseline")
+    run.add_argument("-o", "--output", default="benchmark_results.json", help="Results JSON (default: %(default)s)")
+    run.add_argument("--sizes", default=",".join(DEFAULT_SIZES),
+                     help=f"Comma separated image sizes out of {', '.join(IMAGE_SIZES)} (default: all)")
+    run.add_argument("--filter", help="Case name fnmatch pattern or substring, e.g. 'shred/*' or 'sepia'")
+    run.add_argument("--repeats", type=int, default=5, help="Timed runs per case, median is compared (default: %(default)s)")
+    run.add_argument("--compare", metavar="BASELINE", help="Compare the results with a baseline JSON right away")
+    _add_threshold_arguments(run)
+
+    compare = subparsers.add_parser("compare", help="Compare two results files, exits 1 on regressions")
+    compare.add_argument("baseline", help="Baseline results JSON")
+    compare.add_argument("current", help="Current results JSON")
+    compare.add_argument("--all", action="store_true", help="Show all compared cases, not only regressions")
+    _add_threshold_arguments(compare)
+
+    estimates = subparsers.add_parser(
+        "estimates", help="Check render memory estimates against tracemalloc peaks, exits 1 on mismatches")
+    estimates.add_argument("--sizes", default=",".join(DEFAULT_ESTIMATE_SIZES),
+                           help=f"Comma separated image sizes out of {', '.join(IMAGE_SIZES)} (default: %(default)s)")
+
+    subparsers.add_parser(
+        "seams", help="Check that seam analysis ranks a tiled pattern's period multiples first, exits 1 if not")
+    subparsers.add_parser(
+        "memory", help="Check zero-copy image storage and retained byte accounting, exits 1 on failures")
+
+    loadtest = subparsers.add_parser(
+        "loadtest", help="Drive concurrent sessions through the app with a local upstream stub, exits 1 on errors")
+    loadtest.add_argument("--sessions", type=int, default=4, help="Concurrent sessions (default: %(default)s)")
+    loadtest.add_argument("--rounds", type=int, default=3,
+                          help="Slider drags and image changes per session (default: %(default)s)")
+    loadtest.add_argument("--ramp-up", type=float, default=0.0,
+                          help="Seconds over which the session starts are spread (default: %(default)s)")
+    _add_stub_arguments(loadtest)
+    loadtest.add_argument("--app-url", help="Drive an already running app instead of launching one")
+    loadtest.add_argument("--app-log", help="Output of the launched app (default: discarded)")
+    loadtest.add_argument("-o", "--output", help="Results JSON")
+
+    stub = subparsers.add_parser("stub", help="Serve the upstream stub for an app started separately")
+    stub.add_argument("--samples-file", default="stub_samples.json",
+                      help="Rewritten samples, for IMAGE_SHREDDER_SAMPLES_FILE (default: %(default)s)")
+    stub.add_argument("--port", type=int, default=0, help="Stub port (default: any free port)")
+    _add_stub_arguments(stub)
+    return parser
+
+
+def _add_stub_arguments(parser):
+    parser.add_argument("--image-size", default=DEFAULT_IMAGE_SIZE, choices=tuple(IMAGE_SIZES),
+                        help="Size of the stub's synthetic images (default: %(default)s)")
+    parser.add_argument("--upstream-delay", type=float, default=0.0,
+                        help="Seconds the stub waits before each response, like a remote host (default: %(default)s)")
+
+
+def _add_threshold_arguments(parser):
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Allowed relative slowdown before flagging a regression (default: %(default)s)")
+    parser.add_argument("--memory-threshold", type=float, default=None,
+                        help="Allowed relative peak memory growth (default: same as --threshold)")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME_S,
+                        help="Cases faster than this many seconds are not flagged for time (default: %(default)s)")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command in ("run", "estimates"):
+        sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+        unknown = [size for size in sizes if size not in IMAGE_SIZES]
+        if unknown:
+            print(f"Unknown size(s): {', '.join(unknown)}, expected some of: {', '.join(IMAGE_SIZES)}")
+            return 2
+
+    if args.command == "stub":
+        serve(args.samples_file, image_size=args.image_size, delay_s=args.upstream_delay, port=args.port)
+        return 0
+
+    if args.command == "loadtest":
+        results = run_loadtest(
+            args.sessions, args.rounds, image_size=args.image_size, upstream_delay_s=args.upstream_delay,
+            ramp_up_s=args.ramp_up, app_url=args.app_url, app_log=args.app_log
+        )
+        print_results(results)
+        if args.output:
+            save_loadtest_results(results, args.output)
+            print(f"Results saved to {args.output}")
+        return 1 if results["errors"] else 0
+
+    if args.command == "estimates":
+        failures = check_estimates(sizes)
+        print(f"{len(failures)} estimate mismatch(es)")
+        return 1 if failures else 0
+
+    if args.command == "seams":
+        failures = check_seam_ranking()
+        print(f"{len(failures)} seam ranking failure(s)")
+        return 1 if failures else 0
+
+    if args.command == "memory":
+        failures = check_memory_accounting()
+        print(f"{len(failures)} memory check failure(s)")
+        return 1 if failures else 0
+
+    if args.command == "run":
+        current = run_suite(sizes, pattern=args.filter, repeats=args.repeats)
+        save_results(current, args.output)
+        print(f"Results of {len(current['results'])} case(s) saved to {args.output}")
+        if not args.compare:
+            return 0
+        baseline = load_results(args.compare)
+        show_all = False
+    else:
+        baseline, current = load_results(args.baseline), load_results(args.current)
+        show_all = args.all
+
+    rows = compare_results(
+        baseline, current, threshold=args.threshold, memory_threshold=args.memory_threshold, min_time_s=args.min_time)
+    return 1 if print_comparison(baseline, current, rows, show_all=show_all) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
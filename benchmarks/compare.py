@@ -0,0 +1,59 @@
+import json
+
+# Cases faster than this (in both runs) are too noisy to flag time regressions
+DEFAULT_MIN_TIME_S = 0.001
+
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_results(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def compare_results(baseline, current, threshold=0.15, memory_threshold=None, min_time_s=DEFAULT_MIN_TIME_S):
+    """
+    Compares two run_suite results case by case.
+    Returns a list of (case, metric, baseline value, current value, ratio, regressed) rows for cases present in both,
+    metric is 'median_s' or 'peak_bytes'. A case regresses when current / baseline exceeds 1 + threshold.
+    """
+    memory_threshold = threshold if memory_threshold is None else memory_threshold
+    rows = []
+    base_results, current_results = baseline["results"], current["results"]
+    for case in sorted(set(base_results) & set(current_results)):
+        base, cur = base_results[case], current_results[case]
+
+        base_time, cur_time = base["median_s"], cur["median_s"]
+        ratio = cur_time / base_time if base_time > 0 else float("inf")
+        noisy = max(base_time, cur_time) < min_time_s
+        rows.append((case, "median_s", base_time, cur_time, ratio, not noisy and ratio > 1 + threshold))
+
+        base_peak, cur_peak = base["peak_bytes"], cur["peak_bytes"]
+        ratio = cur_peak / base_peak if base_peak > 0 else (1.0 if cur_peak == 0 else float("inf"))
+        rows.append((case, "peak_bytes", base_peak, cur_peak, ratio, ratio > 1 + memory_threshold))
+    return rows
+
+
+def format_value(metric, value):
+    return f"{value * 1000:.2f} ms" if metric == "median_s" else f"{value / 2 ** 20:.1f} MiB"
+
+
+def print_comparison(baseline, current, rows, show_all=False):
+    """Prints regressions (all rows with show_all) and missing/new cases, returns the number of regressions."""
+    regressions = [row for row in rows if row[5]]
+    for case, metric, base_value, cur_value, ratio, regressed in (rows if show_all else regressions):
+        status = "❌" if regressed else ("✅" if ratio < 1 else "  ")
+        print(f"{status} {case:<48} {metric:<10} {format_value(metric, base_value):>12} -> "
+              f"{format_value(metric, cur_value):>12} ({ratio - 1:+.1%})")
+
+    missing = sorted(set(baseline["results"]) - set(current["results"]))
+    new = sorted(set(current["results"]) - set(baseline["results"]))
+    if missing:
+        print(f"Not in current run: {len(missing)} case(s), e.g. {', '.join(missing[:5])}")
+    if new:
+        print(f"Not in baseline: {len(new)} case(s), e.g. {', '.join(new[:5])}")
+    print(f"{len(regressions)} regression(s) in {len(rows) // 2} compared case(s)")
+    return len(regressions)
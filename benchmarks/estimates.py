@@ -0,0 +1,80 @@
+import functools
+import tracemalloc
+
+from src.core import ShredParams, render_shreds, apply_guidelines, compose_shred_view, encode_view_png
+from src.admission import estimate_render_bytes
+from src.config import OUTPUT_RENDERERS
+
+from benchmarks.suite import IMAGE_SIZES, synthetic_image
+
+# (label, ShredParams overrides) covering the estimator's branches
+ESTIMATE_CASES = (
+    ("c16", dict(chunk_w=16, chunk_h=16)),
+    ("c4", dict(chunk_w=4, chunk_h=4)),
+    ("c7x33_guidelines", dict(chunk_w=7, chunk_h=33, show_guidelines=True)),
+    ("sepia_contrast", dict(chunk_w=16, chunk_h=16, color_effects=("Sepia",), contrast_factor=1.5)),
+    ("gray1", dict(chunk_w=16, chunk_h=16, color_effects=("Grayscale 1 Channel",), show_guidelines=True)),
+    ("chain", dict(chunk_w=32, chunk_h=8, color_effects=("Invert Colors", "Grayscale", "Sepia", "Solarize"),
+                   brightness_offset=20, contrast_factor=1.2)),
+    ("width_4000", dict(chunk_w=16, chunk_h=16, output_image_width=4000)),
+    ("strips", dict(chunk_w=16, chunk_h=16, strip_widths="pattern: 4, 12, 28", strip_heights="geom: 8, 1.2")),
+    ("iterated_strips", dict(chunk_w=16, chunk_h=16, strip_widths="8, 24", iterations=7, show_guidelines=True)),
+)
+
+DEFAULT_ESTIMATE_SIZES = ("512", "1080p", "4k")
+
+# Estimates over this many times the measured peak are flagged as too pessimistic (renders get downscaled for nothing)
+MAX_OVERESTIMATE_RATIO = 3.0
+
+
+def _render(img, params, renderer):
+    """Same stages as core.render_png, with an explicit renderer."""
+    padded_img, vertical_shred, final_shred = render_shreds(img, params)
+    display_vertical, display_final = apply_guidelines(
+        vertical_shred, final_shred, params.chunk_w, params.chunk_h, params.show_guidelines, params.guideline_color_rgb,
+        params.strip_widths, params.strip_heights)
+    view = compose_shred_view(
+        padded_img, display_vertical, display_final, params.color_effects, params.brightness_offset,
+        params.contrast_factor, params.output_image_width, renderer=renderer)
+    return encode_view_png(view)
+
+
+def traced_peak(fn):
+    """Peak bytes allocated through the Python allocator (NumPy buffers included) while running fn."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - baseline
+
+
+def check_estimates(sizes=DEFAULT_ESTIMATE_SIZES, renderers=OUTPUT_RENDERERS, progress=print):
+    """
+    Measures the traced peak of full renders and compares it with estimate_render_bytes's traced part.
+    Returns the failures: (case, estimated, measured) where the estimate is under the measured peak
+    or over MAX_OVERESTIMATE_RATIO times it. Native (Agg/Pillow) buffers are invisible to tracemalloc and not checked.
+    """
+    failures = []
+    for renderer in renderers:
+        _render(synthetic_image(64, 64), ShredParams(), renderer)  # Warmup: lazy imports, fonts and caches
+        for size_name in sizes:
+            width, height = IMAGE_SIZES[size_name]
+            img = synthetic_image(width, height)
+            for label, overrides in ESTIMATE_CASES:
+                params = ShredParams(**overrides)
+                estimated = estimate_render_bytes(img.shape, params, renderer).traced
+                measured = traced_peak(functools.partial(_render, img, params, renderer))
+                ratio = estimated / measured if measured else float("inf")
+                ok = 1 <= ratio <= MAX_OVERESTIMATE_RATIO
+                case = f"{renderer}/{size_name}/{label}"
+                if not ok:
+                    failures.append((case, estimated, measured))
+                if progress:
+                    progress(f"{'✅' if ok else '❌'} {case:<40} estimated {estimated / 2 ** 20:8.1f} MiB  "
+                             f"measured {measured / 2 ** 20:8.1f} MiB  ({ratio:.2f}x)")
+            del img
+    return failures
@@ -0,0 +1,295 @@
+"""
+Load test of the app: concurrent sessions driven through Gradio's client API, upstream sources served by the stub.
+
+The app is launched as a subprocess with its samples pointed at benchmarks.upstream_stub (no network needed), then
+every simulated session loads the page, drags the chunk width slider and changes the image, for a number of rounds.
+Reports p50/p95/p99 latency per action, throughput and the app's resident memory (app and worker processes).
+
+    python -m benchmarks loadtest --sessions 8 --rounds 3 [-o loadtest.json]
+    python -m benchmarks loadtest --app-url http://127.0.0.1:7860/   # An app already pointed at `benchmarks stub`
+"""
+import os
+import sys
+import json
+import math
+import time
+import socket
+import contextlib
+import platform
+import datetime
+import tempfile
+import threading
+import subprocess
+from urllib.request import urlopen
+
+from benchmarks.upstream_stub import DEFAULT_IMAGE_SIZE, UpstreamStub
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Chunk widths of one slider drag, each one a redraw of the session's image
+DRAG_CHUNK_WIDTHS = (20, 24, 28, 32, 16)
+PERCENTILES = (50, 95, 99)
+APP_START_TIMEOUT_S = 120
+RSS_SAMPLE_INTERVAL_S = 0.25
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def process_tree_rss(pid):
+    """Resident bytes of a process and its descendants (render pool workers), read from /proc (Linux only)."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rpartition(")")[2].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+        pending.extend(children.get(current, ()))
+    return total
+
+
+class RssSampler:
+    """Samples the resident memory of a process tree in a background thread while the load runs."""
+
+    def __init__(self, pid, interval_s=RSS_SAMPLE_INTERVAL_S):
+        self.pid = pid
+        self.interval_s = interval_s
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.samples.append(process_tree_rss(self.pid))
+            self._stop.wait(self.interval_s)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self):
+        if not self.samples:
+            return None
+        return {"start_bytes": self.samples[0], "peak_bytes": max(self.samples), "end_bytes": self.samples[-1]}
+
+
+class LaunchedApp:
+    """app.py in a subprocess with its sample images read from samples_file, ready once its page answers."""
+
+    def __init__(self, samples_file, log_path, port=None, extra_env=None):
+        self.port = port or _free_port()
+        self.url = f"http://127.0.0.1:{self.port}/"
+        self.log_path = log_path
+        env = dict(
+            os.environ,
+            IMAGE_SHREDDER_SAMPLES_FILE=samples_file,
+            IMAGE_SHREDDER_METRICS_PORT="0",
+            IMAGE_SHREDDER_METRICS_LOG="0",
+            GRADIO_SERVER_NAME="127.0.0.1",
+            GRADIO_SERVER_PORT=str(self.port),
+            GRADIO_ANALYTICS_ENABLED="False",
+        )
+        env.update(extra_env or {})  # e.g. IMAGE_SHREDDER_RENDER_BACKEND=process
+        self._log = open(log_path, "w", encoding="utf-8")
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(PROJECT_ROOT, "app.py")],
+            cwd=PROJECT_ROOT, env=env, stdout=self._log, stderr=subprocess.STDOUT
+        )
+
+    def wait_ready(self, timeout_s=APP_START_TIMEOUT_S):
+        deadline = time.monotonic() + timeout_s
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"The app exited with code {self.process.returncode}, see {self.log_path}")
+            try:
+                with urlopen(self.url, timeout=2) as response:
+                    if response.status == 200:
+                        return self
+            except OSError:
+                pass
+            time.sleep(0.5)
+        raise RuntimeError(f"The app did not answer on {self.url} within {timeout_s}s, see {self.log_path}")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self._log.close()
+
+
+def _sample_choices(samples):
+    return [f"{item['name']} - {item['description']}" for item in samples]
+
+
+def run_session(app_url, session_index, rounds, sample_choices, record, start_delay_s=0.0):
+    """One simulated user: page load, then per round a slider drag and an image change (next sample in turn)."""
+    from gradio_client import Client  # Lazy import, only the load test needs it
+
+    time.sleep(start_delay_s)
+    client = Client(app_url, verbose=False, download_files=False)
+    strips = dict(strip_widths="", strip_heights="")
+
+    def timed(action, check, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = client.predict(**kwargs)
+            error = None if check(result) else "empty result"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        record(action, time.perf_counter() - start, error)
+
+    timed("load", lambda result: result[13] is not None, api_name="/load")  # The image after 13 input values
+    for round_index in range(rounds):
+        for chunk_w in DRAG_CHUNK_WIDTHS:
+            timed("redraw", lambda result: result is not None, chunk_w=chunk_w, api_name="/redraw", **strips)
+        choice = sample_choices[(session_index + round_index) % len(sample_choices)]
+        timed("change_image", lambda result: result[0] is not None,
+              selected_sample_choice_str=choice, api_name="/fetch_image", **strips)
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, action, seconds, error=None):
+        with self._lock:
+            if error:
+                self.errors.setdefault(action, []).append(error)
+            else:
+                self.latencies.setdefault(action, []).append(seconds)
+
+    def summary(self):
+        rows = {}
+        all_latencies = []
+        for action in sorted(set(self.latencies) | set(self.errors)):
+            latencies = sorted(self.latencies.get(action, []))
+            all_latencies.extend(latencies)
+            rows[action] = _latency_row(latencies, len(self.errors.get(action, [])))
+        rows["all"] = _latency_row(sorted(all_latencies), sum(len(e) for e in self.errors.values()))
+        return rows
+
+
+def _latency_row(sorted_latencies, errors):
+    row = {"count": len(sorted_latencies), "errors": errors}
+    for p in PERCENTILES:
+        row[f"p{p}_s"] = percentile(sorted_latencies, p)
+    row["max_s"] = sorted_latencies[-1] if sorted_latencies else None
+    return row
+
+
+def run_load(app_url, sessions, rounds, sample_choices, ramp_up_s=0.0, pid=None):
+    """Runs the sessions concurrently against app_url, returns the results dict (latencies, throughput, RSS)."""
+    recorder = LatencyRecorder()
+    threads = [
+        threading.Thread(
+            target=run_session, name=f"session-{i}",
+            args=(app_url, i, rounds, sample_choices, recorder, ramp_up_s * i / max(sessions, 1))
+        )
+        for i in range(sessions)
+    ]
+    start = time.perf_counter()
+    with RssSampler(pid) if pid is not None else contextlib.nullcontext() as sampler:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed_s = time.perf_counter() - start
+
+    latencies = recorder.summary()
+    first_errors = {action: errors[:3] for action, errors in recorder.errors.items()}
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "sessions": sessions,
+        "rounds": rounds,
+        "elapsed_s": elapsed_s,
+        "throughput_rps": latencies["all"]["count"] / elapsed_s if elapsed_s else None,
+        "latency": latencies,
+        "rss": sampler.summary() if sampler else None,
+        "errors": first_errors,
+    }
+
+
+def run_loadtest(sessions, rounds, image_size=DEFAULT_IMAGE_SIZE, upstream_delay_s=0.0, ramp_up_s=0.0,
+                 app_url=None, app_log=None, app_env=None):
+    """Starts the upstream stub and the app (unless app_url is given), runs the load and returns the results."""
+    from src.sample_image_metadata import SAMPLE_IMAGES_DATA
+
+    with UpstreamStub(SAMPLE_IMAGES_DATA, image_size=image_size, delay_s=upstream_delay_s) as stub, \
+            tempfile.TemporaryDirectory(prefix="shredder-loadtest-") as tmp_dir:
+        samples = stub.stub_samples()
+        if app_url:
+            return run_load(app_url, sessions, rounds, _sample_choices(samples), ramp_up_s)
+
+        samples_file = stub.write_samples_file(os.path.join(tmp_dir, "samples.json"))
+        app = LaunchedApp(samples_file, app_log or os.path.join(tmp_dir, "app.log"), extra_env=app_env)
+        try:
+            app.wait_ready()
+            print(f"App ready on {app.url}, upstream stub on {stub.base_url}, running {sessions} session(s)")
+            results = run_load(app.url, sessions, rounds, _sample_choices(samples), ramp_up_s, pid=app.process.pid)
+        finally:
+            app.stop()
+        results.update(image_size=image_size, upstream_delay_s=upstream_delay_s, upstream_requests=stub.requests)
+        return results
+
+
+def _ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.0f}"
+
+
+def print_results(results):
+    header = f"{'action':<14}{'count':>7}{'errors':>8}" + "".join(f"{f'p{p} ms':>10}" for p in PERCENTILES)
+    print(header + f"{'max ms':>10}")
+    for action, row in results["latency"].items():
+        print(f"{action:<14}{row['count']:>7}{row['errors']:>8}"
+              + "".join(f"{_ms(row[f'p{p}_s']):>10}" for p in PERCENTILES) + f"{_ms(row['max_s']):>10}")
+    print(f"{results['sessions']} session(s) x {results['rounds']} round(s) in {results['elapsed_s']:.1f}s, "
+          f"throughput {results['throughput_rps']:.2f} req/s")
+    if results["rss"]:
+        rss = {k: v / 1024 ** 2 for k, v in results["rss"].items()}
+        print(f"App RSS: start {rss['start_bytes']:.0f} MB, peak {rss['peak_bytes']:.0f} MB, "
+              f"end {rss['end_bytes']:.0f} MB")
+    for action, errors in results["errors"].items():
+        print(f"{action} errors, e.g.: {errors[0]}")
+
+
+def save_results(results, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+from src.image_store import ImageStore
+from src.shredder import shred_image_iterated
+from src.pipeline import owned_nbytes
+
+# (label, iterations, strip widths, strip heights) of shreds whose retained bytes are checked
+SHRED_CASES = (
+    ("shred x1", 1, "", ""),
+    ("shred x3", 3, "", ""),
+    ("scheduled shred x3", 3, "8,16,24", "12,20"),
+)
+# Allowed difference between reported and traced bytes, Python objects of the result (tuple, array headers)
+ACCOUNTING_SLACK_BYTES = 4096
+
+
+def _stored_npy_shares_memory(tmp_dir):
+    """A read-only memmapped .npy source (as load_npy_image maps it) and its RGB view are stored without a copy."""
+    path = os.path.join(tmp_dir, "source.npy")
+    np.save(path, np.arange(64 * 48 * 4, dtype=np.uint8).reshape(64, 48, 4))
+    store = ImageStore()
+    checks = []
+    for label, source in (("npy", np.load(path, mmap_mode="r")),
+                          ("npy RGB view", np.load(path, mmap_mode="r")[..., :3]),
+                          ("memmap", np.memmap(path, mode="r", dtype=np.uint8))):
+        stored = store.get(store.put(source))
+        checks.append((f"stored {label} shares memory", np.shares_memory(stored, source) and not stored.flags.writeable))
+    return checks
+
+
+def _shred_bytes_match_allocation(cases=SHRED_CASES):
+    """The bytes a pipeline reports for a retained shred match the memory the shred holds, traced by tracemalloc."""
+    img = np.random.default_rng(0).integers(0, 256, (192, 256, 3), dtype=np.uint8)
+    checks = []
+    for label, iterations, strip_widths, strip_heights in cases:
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            result = shred_image_iterated(img, 16, 16, iterations, strip_widths, strip_heights)
+            held = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        reported = owned_nbytes([result], store=ImageStore())
+        checks.append((f"{label} reports {reported} of {held} held bytes", abs(reported - held) <= ACCOUNTING_SLACK_BYTES))
+    return checks
+
+
+def check_memory_accounting(progress=print):
+    """Checks zero-copy image storage and retained byte accounting. Returns the labels of the failed checks."""
+    failures = []
+    with tempfile.TemporaryDirectory(prefix="shredder-memory-") as tmp_dir:
+        checks = _stored_npy_shares_memory(tmp_dir) + _shred_bytes_match_allocation()
+    for label, ok in checks:
+        if not ok:
+            failures.append(label)
+        if progress:
+            progress(f"{'✅' if ok else '❌'} {label}")
+    return failures
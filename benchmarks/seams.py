@@ -0,0 +1,61 @@
+import numpy as np
+
+from src.seams import analyze_seams
+
+# (label, period px, image width, image height, pattern, varying axes) of tiled patterns whose seamless chunk sizes
+# are the period's multiples. Patterns varying along x only leave every chunk height seamless
+PERIODIC_CASES = (
+    ("p12_sawtooth", 12, 240, 240, "sawtooth", "x"),
+    ("p12_stripes", 12, 240, 240, "smooth", "x"),
+    ("p12_240x240", 12, 240, 240, "smooth", "xy"),
+    ("p20_480x320", 20, 480, 320, "smooth", "xy"),
+    ("p32_640x480", 32, 640, 480, "smooth", "xy"),
+)
+# Best ranked chunk sizes per axis that have to be multiples of the period
+TOP_RANKED = 3
+
+
+def periodic_image(period, width, height, axes="xy", seed=0):
+    """Smooth RGB pattern tiled with the period along axes ("x", "y" or "xy"): sinusoids of whole cycles per tile."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[:height, :width] * (2 * np.pi / period)
+    img = np.zeros((height, width, 3))
+    for channel in range(3):
+        for fx, fy in rng.integers(1, 3, size=(3, 2)) * [["x" in axes, "y" in axes]]:
+            img[..., channel] += np.sin(fx * x + fy * y + rng.uniform(0, 2 * np.pi))
+    img -= img.min()
+    return (img * (255 / max(img.max(), 1e-9))).astype(np.uint8)
+
+
+def sawtooth_image(period, width, height):
+    """Gray ramp over each period along x with a hard edge between tiles (a tile's own seam)."""
+    ramp = (np.arange(width) % period * (255 // (period - 1))).astype(np.uint8)
+    return np.repeat(np.broadcast_to(ramp[None, :, None], (height, width, 1)), 3, axis=2)
+
+
+def _ranked(chunk_sizes, scores):
+    return [size for _, size in sorted((s, size) for size, s in zip(chunk_sizes, scores) if s is not None)]
+
+
+def check_seam_ranking(cases=PERIODIC_CASES, progress=print):
+    """
+    Checks that seam analysis ranks multiples of a tiled pattern's period first on its varying axes, and suggests
+    one. Returns the failures: (case, best widths, best heights).
+    """
+    failures = []
+    for label, period, width, height, pattern, axes in cases:
+        img = sawtooth_image(period, width, height) if pattern == "sawtooth" else \
+            periodic_image(period, width, height, axes)
+        analysis = analyze_seams(img)
+        best_widths = _ranked(analysis.chunk_widths, analysis.width_scores)[:TOP_RANKED]
+        best_heights = _ranked(analysis.chunk_heights, analysis.height_scores)[:TOP_RANKED]
+        suggested_w, suggested_h, _ = analysis.suggestions(1)[0]
+        checked = (best_widths + [suggested_w] if "x" in axes else []) + \
+            (best_heights + [suggested_h] if "y" in axes else [])
+        ok = all(size % period == 0 for size in checked)
+        if not ok:
+            failures.append((label, best_widths, best_heights))
+        if progress:
+            progress(f"{'✅' if ok else '❌'} {label:<16} best widths {best_widths}  best heights {best_heights}  "
+                     f"suggested {suggested_w}x{suggested_h}")
+    return failures
@@ -0,0 +1,196 @@
+import os
+import sys
+import time
+import fnmatch
+import platform
+import datetime
+import statistics
+import tracemalloc
+
+import numpy as np
+
+from src.shredder import shred_image, shred_image_iterated, shred_image_scheduled, breed_images
+from src.seams import analyze_seams
+from src.core import (
+    ShredParams, pad_image_to_fit_chunks, apply_color_effect, draw_guidelines, apply_guidelines,
+    compose_shred_view, encode_view_png, render_png, render_final_shred_png
+)
+from src.config import (
+    MIN_CHUNK_SIZE_PX, INITIAL_MAX_CHUNK_PX, COLOR_EFFECTS, OUTPUT_RENDERERS, OUTPUT_IMAGE_WIDTH_IN_PIXELS,
+    GUIDELINE_COLORS, DEFAULT_GUIDELINE_COLOR_NAME
+)
+
+# Synthetic image sizes (width, height) by name, from 256² to 8K UHD
+IMAGE_SIZES = {
+    "256": (256, 256),
+    "512": (512, 512),
+    "1024": (1024, 1024),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+    "8k": (7680, 4320),
+}
+DEFAULT_SIZES = tuple(IMAGE_SIZES)
+
+# Chunk sizes swept from MIN_CHUNK_SIZE_PX to INITIAL_MAX_CHUNK_PX in powers of two
+CHUNK_SIZES = tuple(c for c in (2 ** p for p in range(1, 16)) if MIN_CHUNK_SIZE_PX <= c <= INITIAL_MAX_CHUNK_PX)
+
+# Common effect chains besides every single effect, brightness and contrast
+EFFECT_CHAINS = (
+    ("Grayscale", "Sepia"),
+    ("Swap R/G Channels", "Invert Colors"),
+    ("Red Channel Only", "Solarize"),
+    ("Invert Colors", "Grayscale", "Sepia", "Solarize"),
+)
+
+# Chunk size of the iterated shred, guidelines, compose and full render cases
+REFERENCE_CHUNK_PX = 16
+
+# Iterated shred cases, the cost should grow with log(k)
+ITERATION_COUNTS = (2, 1000, 10 ** 9)
+
+# Strip schedule cases (label, strip widths, strip heights), should cost about the same as uniform chunks
+STRIP_SCHEDULES = (
+    ("list", "8, 16, 32", "24, 8"),
+    ("pattern", "pattern: 4, 12, 28", "pattern: 16, 6"),
+    ("geom", "geom: 2, 1.05", "geom: 64, 0.9"),
+)
+
+
+def synthetic_image(width, height, seed=0):
+    """Deterministic RGB uint8 test image: smooth gradients with noise (compresses like a photo, not like a flat fill)."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    gradient = np.stack([x / max(width - 1, 1), y / max(height - 1, 1), (x + y) / max(width + height - 2, 1)], axis=2)
+    noise = rng.normal(0, 12, size=(height, width, 3)).astype(np.float32)
+    return np.clip(gradient * 255 + noise, 0, 255).astype(np.uint8)
+
+
+def _effects_label(effects):
+    return "+".join(e.lower().replace(" ", "_").replace("/", "") for e in effects)
+
+
+def build_cases(img, size_name):
+    """
+    Returns a list of (case name, setup) for one synthetic image.
+    setup() prepares the case inputs (not measured) and returns the callable to measure,
+    so filtered out cases never allocate their inputs.
+    """
+    cases = []
+    for chunk in CHUNK_SIZES:
+        cases.append((f"pad/{size_name}/c{chunk}", lambda c=chunk: lambda: pad_image_to_fit_chunks(img, c, c)))
+
+    def shred_case(chunk):
+        padded = pad_image_to_fit_chunks(img, chunk, chunk)
+        return lambda: shred_image(padded, chunk, chunk)
+    for chunk in CHUNK_SIZES:
+        cases.append((f"shred/{size_name}/c{chunk}", lambda c=chunk: shred_case(c)))
+
+    def iterated_shred_case(iterations):
+        padded = pad_image_to_fit_chunks(img, REFERENCE_CHUNK_PX, REFERENCE_CHUNK_PX)
+        return lambda: shred_image_iterated(padded, REFERENCE_CHUNK_PX, REFERENCE_CHUNK_PX, iterations)
+    for iterations in ITERATION_COUNTS:
+        cases.append((f"shred_iterated/{size_name}/k{iterations}", lambda k=iterations: iterated_shred_case(k)))
+    for label, strip_widths, strip_heights in STRIP_SCHEDULES:
+        cases.append((f"shred_scheduled/{size_name}/{label}",
+                      lambda w=strip_widths, h=strip_heights: lambda: shred_image_scheduled(img, w, h)))
+
+    def breed_case(sources):
+        stack = np.stack([np.roll(img, i * 7, axis=1) for i in range(sources)])
+        return lambda: breed_images(stack, REFERENCE_CHUNK_PX, REFERENCE_CHUNK_PX)
+    for sources in (2, 4):
+        cases.append((f"breed/{size_name}/n{sources}", lambda n=sources: breed_case(n)))
+
+    def effects_case(effects, brightness_offset, contrast_factor):
+        return lambda: apply_color_effect(img, effects, brightness_offset, contrast_factor)
+    for effect in COLOR_EFFECTS:
+        cases.append((f"effects/{size_name}/{_effects_label([effect])}", lambda e=effect: effects_case([e], 0, 1.0)))
+    cases.append((f"effects/{size_name}/brightness", lambda: effects_case([], 40, 1.0)))
+    cases.append((f"effects/{size_name}/contrast", lambda: effects_case([], 0, 1.5)))
+    for chain in EFFECT_CHAINS:
+        cases.append((f"effects/{size_name}/{_effects_label(chain)}", lambda c=chain: effects_case(c, 20, 1.2)))
+
+    color = np.array(GUIDELINE_COLORS[DEFAULT_GUIDELINE_COLOR_NAME], dtype=np.uint8)
+
+    def shredded():
+        padded = pad_image_to_fit_chunks(img, REFERENCE_CHUNK_PX, REFERENCE_CHUNK_PX)
+        return (padded, *shred_image(padded, REFERENCE_CHUNK_PX, REFERENCE_CHUNK_PX))
+
+    def guidelines_case(orientation):
+        _, vertical_shred, final_shred = shredded()
+        shred = vertical_shred if orientation == 'vertical' else final_shred
+        return lambda: draw_guidelines(shred, REFERENCE_CHUNK_PX, orientation=orientation, line_color_rgb=color)
+    for orientation in ('vertical', 'horizontal'):
+        cases.append((f"guidelines/{size_name}/{orientation}", lambda o=orientation: guidelines_case(o)))
+
+    def compose_case(renderer):
+        padded, vertical_shred, final_shred = shredded()
+        display_vertical, display_final = apply_guidelines(
+            vertical_shred, final_shred, REFERENCE_CHUNK_PX, REFERENCE_CHUNK_PX, True, color)
+        return lambda: encode_view_png(compose_shred_view(
+            padded, display_vertical, display_final, [], 0, 1.0, OUTPUT_IMAGE_WIDTH_IN_PIXELS, renderer=renderer))
+    for renderer in OUTPUT_RENDERERS:
+        cases.append((f"compose/{size_name}/{renderer}", lambda r=renderer: compose_case(r)))
+
+    cases.append((f"seams/{size_name}", lambda: lambda: analyze_seams(img)))
+
+    params = ShredParams.from_values(REFERENCE_CHUNK_PX, REFERENCE_CHUNK_PX, show_guidelines=True)
+    cases.append((f"render_png/{size_name}/c{REFERENCE_CHUNK_PX}", lambda: lambda: render_png(img, params)))
+    cases.append((f"export_png/{size_name}/c{REFERENCE_CHUNK_PX}",
+                  lambda: lambda: render_final_shred_png(img, params)))
+    return cases
+
+
+def measure(fn, repeats):
+    """Returns wall times of `repeats` runs (after a warmup run) and the peak traced allocation of a separate run."""
+    fn()
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+
+    # Traced separately, tracemalloc slows allocations down. NumPy reports its buffers to tracemalloc.
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        fn()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return timings, peak_bytes
+
+
+def environment_info():
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_suite(sizes=DEFAULT_SIZES, pattern=None, repeats=5, progress=print):
+    """
+    Runs all cases (optionally filtered by an fnmatch pattern on the case name, e.g. 'shred/*' or '*/4k/*').
+    Returns the baseline dict: {"environment": ..., "results": {case: {"median_s", "min_s", "repeats", "peak_bytes"}}}.
+    """
+    results = {}
+    for size_name in sizes:
+        width, height = IMAGE_SIZES[size_name]
+        img = synthetic_image(width, height)
+        for name, setup in build_cases(img, size_name):
+            if pattern and not fnmatch.fnmatch(name, pattern) and pattern not in name:
+                continue
+            timings, peak_bytes = measure(setup(), repeats)
+            results[name] = {
+                "median_s": statistics.median(timings),
+                "min_s": min(timings),
+                "repeats": repeats,
+                "peak_bytes": peak_bytes,
+            }
+            if progress:
+                progress(f"{name:<48} {results[name]['median_s'] * 1000:10.2f} ms  {peak_bytes / 2 ** 20:9.1f} MiB")
+        del img
+    return {"environment": environment_info(), "results": results}
@@ -0,0 +1,208 @@
+"""
+Local stand-in for the upstream image sources of SAMPLE_IMAGES_DATA, so load tests never hit the real hosts.
+
+Every sample is rewritten to point at the stub: static image URLs become /img/<index>/<name> (one deterministic
+synthetic image per path), "multiple" samples become /random/<index>/<name> (a fixed number of variants served
+round-robin) and scraped samples become /page/<index>, a JSON or HTML page their scraping regexes resolve to an
+image URL of the stub.
+
+    python -m benchmarks stub --samples-file stub_samples.json   # Then IMAGE_SHREDDER_SAMPLES_FILE=stub_samples.json
+"""
+import re
+import copy
+import json
+import time
+import zlib
+import functools
+import itertools
+import threading
+from io import BytesIO
+from urllib.parse import urlparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from PIL import Image
+
+from benchmarks.suite import IMAGE_SIZES, synthetic_image
+
+DEFAULT_IMAGE_SIZE = "1024"
+RANDOM_VARIANTS = 8  # Distinct images of a "multiple" sample, so repeated fetches aren't all identical
+
+# Scrape page templates, {url} is the image URL as written in the page
+PAGE_TEMPLATES = (
+    ("application/json", '{{"message":"{url}","status":"success"}}'),
+    ("text/html; charset=utf-8",
+     '<!DOCTYPE html><html><head><title>Stub</title></head><body>'
+     '<picture id="mainImageContainer"><source srcset="{url}"><img alt="Stub image" src="{url}"></picture>'
+     '</body></html>'),
+)
+
+_CONTENT_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".webp": "image/webp"}
+
+
+def _url_variants(url):
+    """Spellings of an image URL a page may carry: JSON escaped slashes, a '_large' rendition directory, as is."""
+    head, _, tail = url.rpartition("/")
+    return url.replace("/", "\\/"), f"{head}_large/{tail}", url
+
+
+def _scraped_url(scraping, page):
+    # Same steps as image_updater._fetch_image_url_with_regex, minus the URL normalization
+    match = re.search(scraping["image_selector_regex"], page, re.DOTALL | re.IGNORECASE)
+    if not match:
+        return None
+    found_url = match.group(1)
+    transform, replacement = scraping.get("url_transform_regex"), scraping.get("url_transform_replacement")
+    if transform and replacement:
+        found_url = re.sub(transform, replacement, found_url)
+    return found_url
+
+
+def build_page(scraping, image_url):
+    """(content type, page) whose scraping regex and transform resolve to image_url, raises ValueError if none does."""
+    for content_type, template in PAGE_TEMPLATES:
+        for url in _url_variants(image_url):
+            page = template.format(url=url)
+            if _scraped_url(scraping, page) == image_url:
+                return content_type, page
+    raise ValueError(f"No stub page template matches the scraping config {scraping!r}")
+
+
+def _image_name(url):
+    name = urlparse(url).path.rstrip("/").rpartition("/")[2]
+    return name if name.lower().endswith(tuple(_CONTENT_TYPES)) else "image.jpg"
+
+
+class UpstreamStub:
+    """Threaded HTTP server with the sample images rewritten to it (stub_samples), started by start()."""
+
+    def __init__(self, samples, image_size=DEFAULT_IMAGE_SIZE, delay_s=0.0, host="127.0.0.1", port=0):
+        self.samples = samples
+        self.image_shape = IMAGE_SIZES[image_size]
+        self.delay_s = delay_s
+        self._counters = [itertools.count() for _ in samples]
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stub_samples(self):
+        """SAMPLE_IMAGES_DATA pointed at the stub (same names, so sample choices stay valid)."""
+        stubbed = []
+        for index, item in enumerate(self.samples):
+            item = copy.deepcopy(item)
+            if item.get("scraping"):
+                item["source_url"] = f"{self.base_url}/page/{index}"
+                item.pop("image_url", None)
+                build_page(item["scraping"], self._image_url(index, item))  # Fails early on unmatched regexes
+            else:
+                item["image_url"] = self._image_url(index, item)
+                item["source_url"] = item["image_url"]
+            stubbed.append(item)
+        return stubbed
+
+    def write_samples_file(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.stub_samples(), f, indent=2, ensure_ascii=False)
+        return path
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="upstream-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _image_url(self, index, item):
+        kind = "random" if item.get("multiple") else "img"
+        return f"{self.base_url}/{kind}/{index}/{_image_name(item.get('image_url') or item['source_url'])}"
+
+    def _next_variant(self, index):
+        with self._lock:
+            return next(self._counters[index]) % RANDOM_VARIANTS
+
+    def respond(self, path):
+        """(status, content type, body) of a stub GET."""
+        parts = urlparse(path).path.strip("/").split("/")
+        try:
+            kind, index = parts[0], int(parts[1])
+            item = self.samples[index]
+        except (IndexError, ValueError):
+            return 404, "text/plain", b"Not found"
+
+        if kind == "page" and item.get("scraping") and len(parts) == 2:
+            image_url = self._image_url(index, item)
+            if item.get("multiple"):  # A fresh image per scrape, like dog.ceo
+                image_url = f"{self.base_url}/img/{index}/{self._next_variant(index)}-{_image_name(image_url)}"
+            content_type, page = build_page(item["scraping"], image_url)
+            return 200, content_type, page.encode("utf-8")
+        if kind in ("img", "random") and len(parts) == 3:
+            if kind == "random":
+                seed = index * RANDOM_VARIANTS + self._next_variant(index)
+            else:
+                seed = zlib.crc32("/".join(parts).encode())
+            name = parts[2].lower()
+            image_format = "PNG" if name.endswith(".png") else "WEBP" if name.endswith(".webp") else "JPEG"
+            content_type = _CONTENT_TYPES.get(name[name.rfind("."):], "image/jpeg")
+            return 200, content_type, _encoded_image(self.image_shape, seed, image_format)
+        return 404, "text/plain", b"Not found"
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                if stub.delay_s:
+                    time.sleep(stub.delay_s)  # Upstream network latency
+                status, content_type, body = stub.respond(self.path)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The app gave up on the request (fetch deadline or cancellation)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+@functools.lru_cache(maxsize=64)
+def _encoded_image(shape, seed, image_format):
+    """Encoded once per (size, seed, format), so the stub stays cheap next to the app under test."""
+    width, height = shape
+    buffer = BytesIO()
+    Image.fromarray(synthetic_image(width, height, seed=seed % 2 ** 32)).save(buffer, format=image_format, quality=90)
+    return buffer.getvalue()
+
+
+def serve(samples_file, image_size=DEFAULT_IMAGE_SIZE, delay_s=0.0, port=0):
+    """Runs the stub until interrupted, with the rewritten samples written to samples_file."""
+    from src.sample_image_metadata import SAMPLE_IMAGES_DATA
+
+    with UpstreamStub(SAMPLE_IMAGES_DATA, image_size=image_size, delay_s=delay_s, port=port) as stub:
+        stub.write_samples_file(samples_file)
+        print(f"Upstream stub on {stub.base_url}, samples written to {samples_file}")
+        print(f"Start the app with IMAGE_SHREDDER_SAMPLES_FILE={samples_file}, Ctrl+C to stop")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,316 @@
+"""
+Memory admission control of renders.
+estimate_render_bytes predicts the peak memory of a render from the source shape and ShredParams
+(calibrated with tracemalloc, see `python -m benchmarks estimates`), MemoryBudget admits renders while the
+sum of the running estimates stays under a global budget: others wait, are downscaled or rejected.
+"""
+import math
+import time
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from src.core import ResourceLimitError, _compose_layout
+from src.shredder import padded_length
+from src.metrics import metrics
+from src.config import (
+    OUTPUT_RENDERER, RENDER_MEMORY_BUDGET_BYTES, ADMISSION_POLICY, ADMISSION_POLICIES, ADMISSION_MAX_WAIT_S,
+    SWEEP_WORKERS, SWEEP_CELL_WIDTH_PX, STREAM_BAND_BYTES
+)
+
+MIB = 1024 * 1024
+
+# Peak float32 working copies (in units of the padded image as float32 RGB) held by apply_color_effect,
+# astype + clip + uint8 cast alone need 2.25, measured with tracemalloc. Chains, brightness and contrast add
+# temporaries on top of the costliest effect.
+EFFECTS_BASE_FLOAT_COPIES = 2.25
+EFFECT_FLOAT_COPIES = {
+    "Invert Colors": 2.25,
+    "Swap R/G Channels": 2.7,
+    "Red Channel Only": 2.25,
+    "Grayscale": 2.6,
+    "Grayscale 1 Channel": 1.4,
+    "Sepia": 3.35,
+    "Solarize": 2.5,
+}
+CHAINED_EFFECTS_FLOAT_COPIES = 0.6
+BRIGHTNESS_FLOAT_COPIES = 1.0
+CONTRAST_FLOAT_COPIES = 0.75
+EFFECTS_FIXED_BYTES = 1 * MIB
+
+# Compose + PNG encode, bytes per output canvas pixel and per panel (padded image) pixel.
+# "Native" memory is allocated by Agg/Pillow outside of the Python allocator and not visible to tracemalloc.
+MATPLOTLIB_CANVAS_BYTES_PER_PX = 24.5
+MATPLOTLIB_PANEL_BYTES_PER_PX = 60
+MATPLOTLIB_NATIVE_CANVAS_BYTES_PER_PX = 8
+MATPLOTLIB_FIXED_BYTES = 8 * MIB
+PILLOW_CANVAS_BYTES_PER_PX = 2
+PILLOW_NATIVE_CANVAS_BYTES_PER_PX = 3
+PILLOW_NATIVE_PANEL_BYTES_PER_PX = 6
+PILLOW_FIXED_BYTES = 2 * MIB
+
+# Streamed export, per band byte: the gathered band, int16 filter rows (band, above, left) and the scanlines
+STREAM_BAND_COPIES = 8
+
+# Smallest side a downscaled source may get, smaller images are rejected instead
+MIN_DOWNSCALED_SIDE_PX = 64
+
+
+@dataclass(frozen=True)
+class MemoryEstimate:
+    """Predicted peak bytes of a render, `traced` is the part visible to tracemalloc (NumPy and Python objects)."""
+    total: int
+    traced: int
+    stages: dict = field(default_factory=dict, compare=False)
+
+
+def _padded_shape(shape, chunk_w, chunk_h, strip_widths="", strip_heights=""):
+    h, w = shape[:2]
+    return padded_length(h, chunk_h, strip_heights), padded_length(w, chunk_w, strip_widths)
+
+
+def effects_peak_bytes(pixels, color_effects, brightness_offset, contrast_factor):
+    """Peak bytes of apply_color_effect on an RGB uint8 image of `pixels` pixels (input excluded)."""
+    copies = max([EFFECTS_BASE_FLOAT_COPIES] + [EFFECT_FLOAT_COPIES.get(e, EFFECTS_BASE_FLOAT_COPIES) for e in color_effects])
+    if len(color_effects) > 1:
+        copies += CHAINED_EFFECTS_FLOAT_COPIES
+    if brightness_offset != 0:
+        copies += BRIGHTNESS_FLOAT_COPIES
+    if contrast_factor != 1.0:
+        copies += CONTRAST_FLOAT_COPIES
+    return int(copies * pixels * 3 * 4) + EFFECTS_FIXED_BYTES
+
+
+def compose_bytes(padded_shape, params, renderer=None):
+    """(traced, native) peak bytes of composing and encoding the 3-panel view."""
+    renderer = renderer or OUTPUT_RENDERER
+    # Layout only reads the shape, a broadcast view allocates nothing
+    layout_probe = np.broadcast_to(np.uint8(0), (*padded_shape, 1))
+    _, _, width_px, height_px = _compose_layout(
+        layout_probe, params.color_effects, params.brightness_offset, params.contrast_factor, params.output_image_width)
+    canvas_px = width_px * height_px
+    panel_px = padded_shape[0] * padded_shape[1]
+    if renderer == "pillow":
+        traced = PILLOW_CANVAS_BYTES_PER_PX * canvas_px + PILLOW_FIXED_BYTES
+        native = PILLOW_NATIVE_CANVAS_BYTES_PER_PX * canvas_px + PILLOW_NATIVE_PANEL_BYTES_PER_PX * panel_px
+    else:
+        traced = MATPLOTLIB_CANVAS_BYTES_PER_PX * canvas_px + MATPLOTLIB_PANEL_BYTES_PER_PX * panel_px + MATPLOTLIB_FIXED_BYTES
+        native = MATPLOTLIB_NATIVE_CANVAS_BYTES_PER_PX * canvas_px
+    return int(traced), int(native)
+
+
+def estimate_render_bytes(shape, params, renderer=None):
+    """
+    Predicts the peak memory of rendering a source of `shape` (H, W[, C]) with ShredParams, the source itself excluded.
+    Stages keep their outputs alive until the render ends (as in render_png and the incremental pipeline),
+    the peak is the largest sum of live outputs plus the running stage's working memory.
+    """
+    padded_h, padded_w = _padded_shape(shape, params.chunk_w, params.chunk_h, params.strip_widths, params.strip_heights)
+    pixels = padded_h * padded_w
+    channels_out = 1 if "Grayscale 1 Channel" in params.color_effects else 3
+    padded = pixels * 3
+    effects_out = pixels * channels_out
+
+    stages = {
+        "pad": padded,
+        "effects": effects_peak_bytes(pixels, params.color_effects, params.brightness_offset, params.contrast_factor),
+        "shred": 2 * effects_out,
+        "guidelines": 2 * effects_out if params.show_guidelines else 0,
+    }
+    compose_traced, compose_native = compose_bytes((padded_h, padded_w), params, renderer)
+    stages["compose"] = compose_traced + compose_native
+
+    live_before_compose = padded + effects_out + stages["shred"] + stages["guidelines"]
+    traced = max(padded + stages["effects"], live_before_compose + compose_traced)
+    total = max(padded + stages["effects"], live_before_compose + stages["compose"])
+    return MemoryEstimate(total=int(total), traced=int(traced), stages=stages)
+
+
+def estimate_export_bytes(shape, params):
+    """
+    Predicts the peak memory of render_final_shred_png (the streamed export), the source itself excluded:
+    one band in flight plus the encoded PNG, bounded by the raw pixel bytes.
+    """
+    padded_h, padded_w = _padded_shape(shape, params.chunk_w, params.chunk_h, params.strip_widths, params.strip_heights)
+    channels_out = 1 if "Grayscale 1 Channel" in params.color_effects else 3
+    band_rows = min(padded_h, max(1, STREAM_BAND_BYTES // (padded_w * 3)))
+    band_pixels = band_rows * padded_w
+    stages = {
+        "band": STREAM_BAND_COPIES * band_pixels * 3 + effects_peak_bytes(
+            band_pixels, params.color_effects, params.brightness_offset, params.contrast_factor),
+        "png": padded_h * padded_w * channels_out,
+    }
+    total = stages["band"] + stages["png"]
+    return MemoryEstimate(total=int(total), traced=int(total), stages=stages)
+
+
+def estimate_sweep_bytes(shape, chunk_widths, chunk_heights, effect_presets, params,
+                         cell_width=SWEEP_CELL_WIDTH_PX, workers=None):
+    """Predicts the peak memory of src.sweep.render_sweep (effects once per preset, cells in parallel threads)."""
+    pixels = shape[0] * shape[1]
+    largest_padded = max(
+        math.prod(_padded_shape(shape, chunk_w, chunk_h)) for chunk_w in chunk_widths for chunk_h in chunk_heights)
+    effects = max(
+        effects_peak_bytes(pixels, preset or (), params.brightness_offset, params.contrast_factor)
+        for preset in effect_presets
+    )
+    cells = len(chunk_widths) * len(chunk_heights)
+    workers = min(workers or SWEEP_WORKERS or 8, cells)
+    # Pad, both shred stacks and the Pillow copy of the final shred per running cell
+    cells_bytes = workers * largest_padded * 3 * 6
+    # Cells with their label rows and margins, RGB
+    cell_height = max(1, round(cell_width * shape[0] / shape[1]))
+    sheet_bytes = int(len(effect_presets) * cells * cell_width * (cell_height + cell_width // 4) * 1.5) * 3
+    stages = {"effects": effects, "cells": cells_bytes, "sheet": sheet_bytes}
+    total = sheet_bytes + pixels * 3 + max(effects, cells_bytes)
+    return MemoryEstimate(total=int(total), traced=int(pixels * 3 + max(effects, cells_bytes)), stages=stages)
+
+
+def downscale_image(img, shape):
+    """Resizes an RGB uint8 image to shape (H, W, ...) with box filtering."""
+    from PIL import Image
+
+    height, width = shape[:2]
+    return np.asarray(Image.fromarray(np.ascontiguousarray(img)).resize((width, height), Image.Resampling.BOX))
+
+
+@dataclass(frozen=True)
+class Admission:
+    """Admitted render: shape to render (downscaled if scale < 1) and its estimate."""
+    shape: tuple
+    scale: float
+    estimate: MemoryEstimate
+    waited_s: float = 0.0
+
+
+admissions = metrics.counter("shredder_admissions_total", "Render admission decisions by result.")
+
+
+class MemoryBudget:
+    """
+    Global memory budget of concurrent renders.
+    A render is admitted when its estimate fits next to the running ones and the retained bytes (stage results
+    kept between renders, see retain) or nothing else runs, otherwise it waits up to max_wait_s. Reclaimers are
+    asked to drop retained bytes before a render waits for room. Renders over the whole budget are downscaled until they fit ("downscale" policy)
+    or rejected ("reject" policy) with ResourceLimitError.
+    """
+
+    def __init__(self, budget_bytes=RENDER_MEMORY_BUDGET_BYTES, policy=ADMISSION_POLICY, max_wait_s=ADMISSION_MAX_WAIT_S):
+        if policy not in ADMISSION_POLICIES:
+            raise ValueError(f"Unknown admission policy '{policy}', expected one of: {', '.join(ADMISSION_POLICIES)}.")
+        self.budget_bytes = budget_bytes
+        self.policy = policy
+        self.max_wait_s = max_wait_s
+        self._reserved = 0
+        self._retained = 0
+        self._running = 0
+        self._reclaimers = []
+        self._condition = threading.Condition()
+
+    @property
+    def reserved_bytes(self):
+        return self._reserved
+
+    @property
+    def retained_bytes(self):
+        return self._retained
+
+    def retain(self, delta):
+        """Counts delta bytes kept alive between renders (negative when they are freed)."""
+        with self._condition:
+            self._retained += delta
+            if delta < 0:
+                self._condition.notify_all()
+
+    def add_reclaimer(self, reclaim):
+        """Registers reclaim(nbytes), called to free retained bytes when a render doesn't fit, returns the freed bytes."""
+        self._reclaimers.append(reclaim)
+
+    def _reclaim(self, needed):
+        # Called without the condition held, reclaimers update the retained bytes through retain
+        with self._condition:
+            overshoot = self._reserved + self._retained + needed - self.budget_bytes
+        for reclaim in self._reclaimers:
+            if overshoot <= 0:
+                break
+            overshoot -= reclaim(overshoot)
+
+    def plan(self, shape, estimate):
+        """
+        Returns (shape, scale, MemoryEstimate) fitting the budget, `estimate` maps a shape to its MemoryEstimate.
+        Raises ResourceLimitError if the render can't fit.
+        """
+        full = estimate(shape)
+        if full.total <= self.budget_bytes:
+            return tuple(shape), 1.0, full
+        if self.policy == "reject":
+            admissions.inc(result="rejected")
+            raise ResourceLimitError(
+                f"Rendering this {shape[1]}x{shape[0]} image needs about {full.total / MIB:.0f} MiB, over the server's "
+                f"{self.budget_bytes / MIB:.0f} MiB budget. Please use a smaller image or output width."
+            )
+
+        # Estimates grow with the source area, bisect the largest scale that fits
+        min_scale = MIN_DOWNSCALED_SIDE_PX / max(min(shape[:2]), 1)
+        low, high = min(min_scale, 1.0), 1.0
+        scaled = lambda s: (max(1, int(shape[0] * s)), max(1, int(shape[1] * s)), *shape[2:])  # noqa: E731
+        if estimate(scaled(low)).total > self.budget_bytes:
+            admissions.inc(result="rejected")
+            raise ResourceLimitError(
+                f"This render doesn't fit the server's {self.budget_bytes / MIB:.0f} MiB memory budget even downscaled, "
+                f"mostly due to the output size. Please lower the output image width."
+            )
+        for _ in range(12):
+            middle = (low + high) / 2
+            if estimate(scaled(middle)).total <= self.budget_bytes:
+                low = middle
+            else:
+                high = middle
+        admissions.inc(result="downscaled")
+        return scaled(low), low, estimate(scaled(low))
+
+    @contextmanager
+    def admit(self, shape, estimate, cancel_check=None):
+        """
+        Context manager reserving the render's estimated bytes, yields an Admission.
+        cancel_check is polled while waiting, so superseded renders leave the queue.
+        """
+        shape, scale, memory = self.plan(shape, estimate)
+        started = time.monotonic()
+        self._reclaim(memory.total)
+        with self._condition:
+            if self._running and self._reserved + self._retained + memory.total > self.budget_bytes:
+                admissions.inc(result="queued")
+            while self._running and self._reserved + self._retained + memory.total > self.budget_bytes:
+                remaining = self.max_wait_s - (time.monotonic() - started)
+                if remaining <= 0:
+                    admissions.inc(result="rejected")
+                    raise ResourceLimitError(
+                        "The server is busy rendering other images, please try again in a moment.", title="Server Busy")
+                self._condition.wait(timeout=min(remaining, 0.1))
+                if cancel_check is not None:
+                    cancel_check("admission")
+            self._reserved += memory.total
+            self._running += 1
+        admissions.inc(result="admitted")
+        try:
+            yield Admission(shape=shape, scale=scale, estimate=memory, waited_s=time.monotonic() - started)
+        finally:
+            with self._condition:
+                self._reserved -= memory.total
+                self._running -= 1
+                self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {"budget_bytes": self.budget_bytes, "reserved_bytes": self._reserved,
+                    "retained_bytes": self._retained, "running": self._running}
+
+
+render_budget = MemoryBudget()
+metrics.gauge("shredder_admission_reserved_bytes", "Estimated bytes reserved by running renders.",
+              lambda: render_budget.reserved_bytes)
+metrics.gauge("shredder_admission_retained_bytes", "Bytes kept between renders, counted against the render budget.",
+              lambda: render_budget.retained_bytes)
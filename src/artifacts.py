@@ -0,0 +1,141 @@
+"""
+Session-scoped download artifacts (settings files, exported images) kept in memory and served by add_artifact_routes.
+Artifacts are generated when a download is requested, never written to disk, expire after a TTL and
+are bounded in count per session and in bytes overall (oldest first). A session's artifacts go when it unloads.
+"""
+import time
+import secrets
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from src.metrics import metrics
+from src.config import ARTIFACT_BUDGET_BYTES, ARTIFACT_TTL_S, ARTIFACT_MAX_PER_SESSION
+
+ROUTE_PREFIX = "/artifacts"
+
+# Browser side of a download: fetches the artifact URL returned by the handler (relative to the app's root path)
+DOWNLOAD_JS = """
+(url) => {
+    if (!url) return;
+    const link = document.createElement("a");
+    link.href = url;
+    link.download = url.split("/").pop();
+    document.body.appendChild(link);
+    link.click();
+    link.remove();
+}
+"""
+
+
+@dataclass(frozen=True)
+class Artifact:
+    session_id: str
+    filename: str
+    media_type: str
+    data: bytes
+    created: float
+
+
+class ArtifactStore:
+    """In-memory artifacts by unguessable id, in creation order (TTL and byte budget evict the oldest)."""
+
+    def __init__(self, budget_bytes=ARTIFACT_BUDGET_BYTES, ttl_s=ARTIFACT_TTL_S, max_per_session=ARTIFACT_MAX_PER_SESSION):
+        self.budget_bytes = budget_bytes
+        self.ttl_s = ttl_s
+        self.max_per_session = max_per_session
+        self._artifacts = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.expired = 0
+        self.evictions = 0
+
+    def put(self, session_id, filename, data, media_type="application/octet-stream"):
+        """Stores an artifact and returns its id, its URL is artifact_url(artifact_id, filename)."""
+        if len(data) > self.budget_bytes:
+            raise ValueError(f"Artifact '{filename}' is larger than the artifact store budget.")
+        artifact_id = secrets.token_urlsafe(16)
+        now = time.monotonic()
+        with self._lock:
+            self._collect(now)
+            session_ids = [k for k, a in self._artifacts.items() if a.session_id == session_id]
+            for stale_id in session_ids[:max(0, len(session_ids) - self.max_per_session + 1)]:
+                self._remove(stale_id)
+                self.evictions += 1
+            self._artifacts[artifact_id] = Artifact(session_id, filename, media_type, data, now)
+            self._nbytes += len(data)
+            while self._nbytes > self.budget_bytes:
+                self._remove(next(iter(self._artifacts)))
+                self.evictions += 1
+        return artifact_id
+
+    def get(self, artifact_id):
+        """The artifact, None if unknown or expired."""
+        with self._lock:
+            self._collect(time.monotonic())
+            return self._artifacts.get(artifact_id)
+
+    def forget(self, session_id):
+        with self._lock:
+            for artifact_id in [k for k, a in self._artifacts.items() if a.session_id == session_id]:
+                self._remove(artifact_id)
+
+    def collect(self):
+        """Drops the expired artifacts, returns how many. Also done by every put and get."""
+        with self._lock:
+            return self._collect(time.monotonic())
+
+    def _collect(self, now):
+        removed = 0
+        while self._artifacts:
+            artifact_id, artifact = next(iter(self._artifacts.items()))
+            if now - artifact.created < self.ttl_s:
+                break
+            self._remove(artifact_id)
+            removed += 1
+        self.expired += removed
+        return removed
+
+    def _remove(self, artifact_id):
+        self._nbytes -= len(self._artifacts.pop(artifact_id).data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "artifacts": len(self._artifacts),
+                "bytes": self._nbytes,
+                "budget_bytes": self.budget_bytes,
+                "expired": self.expired,
+                "evictions": self.evictions,
+            }
+
+
+artifact_store = ArtifactStore()
+metrics.gauge("shredder_artifact_store_bytes", "Bytes held by the download artifact store.",
+              lambda: artifact_store.stats()["bytes"])
+
+
+def artifact_url(artifact_id, filename):
+    """Download URL of an artifact, relative to the app's root path."""
+    return f"{ROUTE_PREFIX.lstrip('/')}/{artifact_id}/{filename}"
+
+
+def add_artifact_routes(app, store=artifact_store):
+    """Adds the /artifacts/{artifact_id}/{filename} download route to a FastAPI app (e.g. the launched Gradio app)."""
+    from fastapi import APIRouter, HTTPException
+    from fastapi.responses import Response
+
+    router = APIRouter(prefix=ROUTE_PREFIX)
+
+    @router.get("/{artifact_id}/{filename}")
+    def download(artifact_id: str, filename: str):
+        artifact = store.get(artifact_id)
+        if artifact is None or artifact.filename != filename:
+            raise HTTPException(status_code=404, detail="Unknown or expired download, request it again.")
+        return Response(artifact.data, media_type=artifact.media_type, headers={
+            "Content-Disposition": f'attachment; filename="{artifact.filename}"',
+            "Cache-Control": "private, no-store",
+        })
+
+    app.include_router(router)
+    return app
@@ -0,0 +1,135 @@
+import os
+import re
+import sys
+import time
+import runpy
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.config import OUTPUT_IMAGE_WIDTH_IN_PIXELS
+from src.core import ShredderError, ShredParams, get_timestamp, read_settings_file, render_png, write_final_shred_png
+from src.sources import load_image_source, resolve_local_path, list_directory_images
+
+
+def expand_inputs(inputs, input_list_path=None):
+    """Expands directories into their supported image files and appends sources listed in a text file."""
+    sources = list(inputs)
+    if input_list_path:
+        with open(input_list_path, 'r', encoding='utf-8') as f:
+            sources.extend(line.strip() for line in f if line.strip() and not line.lstrip().startswith('#'))
+
+    expanded = []
+    for source in sources:
+        local_path = resolve_local_path(source)
+        if local_path is not None and os.path.isdir(local_path):
+            expanded.extend(list_directory_images(local_path))
+        else:
+            expanded.append(source)
+    return expanded
+
+
+def output_file_name(index, source):
+    """Numbered, filesystem-safe output name derived from the source's last path segment."""
+    stem = os.path.splitext(os.path.basename(source.rstrip('/').split('?')[0]))[0] or "image"
+    stem = re.sub(r'[^A-Za-z0-9_-]+', '_', stem).strip('_')[:64] or "image"
+    return f"{index:04d}_{stem}.png"
+
+
+def shred_source(source, params, output_path, composite=False):
+    """
+    Loads, shreds and writes a single source. Runs in a worker process.
+    Writes the final shredded image, or the app's 3-panel view when composite is set.
+    Returns (source, output_path, image shape, seconds).
+    """
+    started = time.perf_counter()
+    img = load_image_source(source, allow_local=True)
+
+    if composite:
+        png_data = render_png(img, params, image_url=source)
+        with open(output_path, 'wb') as f:
+            f.write(png_data)
+    else:
+        with open(output_path, 'wb') as f:
+            write_final_shred_png(img, params, f)
+
+    return source, output_path, img.shape, time.perf_counter() - started
+
+
+def run_batch(args):
+    settings = read_settings_file(args.settings)
+    params = ShredParams.from_settings(settings, show_guidelines=False, output_image_width=args.output_width)
+
+    sources = expand_inputs(args.inputs, args.input_list)
+    if not sources:
+        print(f"{get_timestamp()} ⚠️ No inputs to process.")
+        return 1
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    workers = args.workers or os.cpu_count() or 1
+    print(f"{get_timestamp()} 🚀 Shredding {len(sources)} image(s) with {workers} worker(s), settings: {settings}")
+
+    started = time.perf_counter()
+    succeeded, failed, total_pixels = 0, 0, 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                shred_source, source, params,
+                os.path.join(args.output_dir, output_file_name(index, source)),
+                args.composite
+            ): source
+            for index, source in enumerate(sources)
+        }
+        for done_count, future in enumerate(as_completed(futures), start=1):
+            source = futures[future]
+            try:
+                _, output_path, shape, seconds = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"{get_timestamp()} [{done_count}/{len(sources)}] ❌ {source}\n    Error: {e}")
+                continue
+            succeeded += 1
+            total_pixels += shape[0] * shape[1]
+            print(f"{get_timestamp()} [{done_count}/{len(sources)}] ✅ {source} -> {output_path} "
+                  f"({shape[1]}x{shape[0]}, {seconds:.2f}s)")
+
+    elapsed = time.perf_counter() - started
+    print(f"{get_timestamp()} 🏁 Done: {succeeded} succeeded, {failed} failed in {elapsed:.2f}s")
+    if elapsed > 0:
+        print(f"    Throughput: {succeeded / elapsed:.2f} images/s, {total_pixels / elapsed / 1e6:.2f} MP/s")
+    return 1 if failed else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="shredder", description="NumPy Image Shredder")
+    subparsers = parser.add_subparsers(dest="command")
+
+    subparsers.add_parser("ui", help="Launch the Gradio web UI (default)")
+
+    batch = subparsers.add_parser("batch", help="Shred many images headlessly using a process pool")
+    batch.add_argument("inputs", nargs="*", help="Image URLs, local files, .npy arrays or directories")
+    batch.add_argument("-i", "--input-list", help="Text file with one source per line ('#' comments allowed)")
+    batch.add_argument("-s", "--settings", required=True, help="Settings JSON saved from the app")
+    batch.add_argument("-o", "--output-dir", default="shredded", help="Output directory (default: %(default)s)")
+    batch.add_argument("-w", "--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    batch.add_argument("--composite", action="store_true", help="Write the app's 3-panel view instead of the final image")
+    batch.add_argument("--output-width", type=int, default=OUTPUT_IMAGE_WIDTH_IN_PIXELS,
+                       help="Composite image width in pixels (default: %(default)s)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "batch":
+        try:
+            return run_batch(args)
+        except (OSError, ValueError, ShredderError) as e:
+            print(f"{get_timestamp()} ⚠️ {e}")
+            return 2
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runpy.run_path(os.path.join(project_root, "app.py"), run_name="__main__")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
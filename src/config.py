@@ -1,7 +1,5 @@
 import os
 
-from .sample_image_metadata import SAMPLE_IMAGES_DATA  # from .image_updater import get_updated_sample_images
-
 # Output image width in pixels
 OUTPUT_IMAGE_WIDTH_IN_PIXELS = 1800
 MIN_VALID_OUTPUT_WIDTH = 800
@@ -15,6 +13,10 @@ OUTPUT_IMAGE_HEIGHT = OUTPUT_IMAGE_WIDTH * 0.375
 # Matlibplot settings
 DEFAULT_TITLE_FONT_SIZE = 12
 
+# 3-panel view renderer: "matplotlib" (default) or "pillow" (faster, Matplotlib is never imported)
+OUTPUT_RENDERERS = ("matplotlib", "pillow")
+OUTPUT_RENDERER = os.environ.get("IMAGE_SHREDDER_RENDERER", "matplotlib")
+
 # Gradio settings
 DEFAULT_CHUNK_W = 16
 DEFAULT_CHUNK_H = 16
@@ -39,13 +41,137 @@ GUIDELINE_COLORS = {
 }
 DEFAULT_GUIDELINE_COLOR_NAME = "White"
 
-SAMPLE_IMAGE_CHOICES = [f"{item['name']} - {item['description']}" for item in SAMPLE_IMAGES_DATA]
+_SAMPLE_SETTINGS = ("SAMPLE_IMAGES_DATA", "SAMPLE_IMAGE_CHOICES", "DEFAULT_IMAGE_URL")
+
+
+def __getattr__(name):
+    # Sample images settings are loaded on first access (PEP 562), so core and batch imports don't pay for them
+    if name not in _SAMPLE_SETTINGS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    samples_file = os.environ.get("IMAGE_SHREDDER_SAMPLES_FILE")  # e.g. the load test's upstream stub samples
+    if samples_file:
+        import json
+
+        with open(samples_file, encoding="utf-8") as f:
+            SAMPLE_IMAGES_DATA = json.load(f)
+    else:
+        from .sample_image_metadata import SAMPLE_IMAGES_DATA  # from .image_updater import get_updated_sample_images
+
+    SAMPLE_IMAGE_CHOICES = [f"{item['name']} - {item['description']}" for item in SAMPLE_IMAGES_DATA]
+
+    if SAMPLE_IMAGES_DATA:
+        first_item = SAMPLE_IMAGES_DATA[0]
+        DEFAULT_IMAGE_URL = first_item.get("image_url") or first_item.get("source_url")
+    else:
+        DEFAULT_IMAGE_URL = "https://upload.wikimedia.org/wikipedia/commons/thumb/5/58/Yellow_flowers_a.jpg/960px-Yellow_flowers_a.jpg"
+
+    globals().update(
+        SAMPLE_IMAGES_DATA=SAMPLE_IMAGES_DATA,
+        SAMPLE_IMAGE_CHOICES=SAMPLE_IMAGE_CHOICES,
+        DEFAULT_IMAGE_URL=DEFAULT_IMAGE_URL
+    )
+    return globals()[name]
+
+# Local image sources (file paths, file:// URLs, directories and raw .npy arrays)
+# Opt-in (IMAGE_SHREDDER_ALLOW_LOCAL_FILES=1), enabled UI users are able to read any image on the server disk.
+# The batch CLI always reads local files
+ALLOW_LOCAL_IMAGE_SOURCES = os.environ.get("IMAGE_SHREDDER_ALLOW_LOCAL_FILES", "0") == "1"
+LOCAL_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif", ".tif", ".tiff")
+NUMPY_IMAGE_EXTENSIONS = (".npy",)
+
+# Image fetching deadlines. The UI scrapes and downloads in a thread pool off the Gradio workers, a session's pending
+# fetch is cancelled by its next image request or when it disconnects (src.fetcher)
+SCRAPE_TIMEOUT_S = float(os.environ.get("IMAGE_SHREDDER_SCRAPE_TIMEOUT_S", "15"))
+DOWNLOAD_TIMEOUT_S = float(os.environ.get("IMAGE_SHREDDER_DOWNLOAD_TIMEOUT_S", "30"))
+FETCH_TIMEOUT_S = float(os.environ.get("IMAGE_SHREDDER_FETCH_TIMEOUT_S", "45"))  # Scrape and download together
+FETCH_WORKERS = int(os.environ.get("IMAGE_SHREDDER_FETCH_WORKERS", "16"))
+DOWNLOAD_CHUNK_BYTES = 64 * 1024  # Downloads check their cancellation between chunks
+# Concurrent downloads of one URL share a single download and decode (never for random sources), scrapes and
+# downloads per upstream host are capped (0 disables), more wait in line up to the max wait
+DOWNLOAD_HOST_CONCURRENCY = int(os.environ.get("IMAGE_SHREDDER_HOST_CONCURRENCY", "4"))
+DOWNLOAD_HOST_MAX_WAIT_S = float(os.environ.get("IMAGE_SHREDDER_HOST_MAX_WAIT_S", "30"))
+
+# Shared decoded image store, each image is kept once per process (LRU evicted over the budget)
+IMAGE_STORE_BUDGET_BYTES = int(os.environ.get("IMAGE_SHREDDER_IMAGE_STORE_MB", "512")) * 1024 * 1024
+
+# Encoded render outputs LRU, repeated parameter sets are served without re-rendering
+RENDER_CACHE_BUDGET_BYTES = int(os.environ.get("IMAGE_SHREDDER_RENDER_CACHE_MB", "128")) * 1024 * 1024
 
-if SAMPLE_IMAGES_DATA:
-    first_item = SAMPLE_IMAGES_DATA[0]
-    DEFAULT_IMAGE_URL = first_item.get("image_url") or first_item.get("source_url")
-else:
-    DEFAULT_IMAGE_URL = "https://upload.wikimedia.org/wikipedia/commons/thumb/5/58/Yellow_flowers_a.jpg/960px-Yellow_flowers_a.jpg"
+# Incremental render pipelines keep per-session results of the costly stages (effects and shred), least recently used
+# sessions are dropped over the session count or byte budget. The kept bytes count against the render memory budget
+PIPELINE_MAX_SESSIONS = int(os.environ.get("IMAGE_SHREDDER_PIPELINE_SESSIONS", "16"))
+PIPELINE_BUDGET_BYTES = int(os.environ.get("IMAGE_SHREDDER_PIPELINE_MB", "256")) * 1024 * 1024
+
+# Render backend: "thread" renders in Gradio's handler threads, "process" dispatches renders to a pool of
+# worker processes (source images are passed through shared memory), so concurrent sessions scale with cores
+RENDER_BACKENDS = ("thread", "process")
+RENDER_BACKEND = os.environ.get("IMAGE_SHREDDER_RENDER_BACKEND", "thread")
+RENDER_WORKERS = int(os.environ.get("IMAGE_SHREDDER_RENDER_WORKERS", "0"))  # 0 means CPU count
+RENDER_POOL_SHARED_BYTES = int(os.environ.get("IMAGE_SHREDDER_RENDER_POOL_SHARED_MB", "256")) * 1024 * 1024
+RENDER_POOL_HEALTH_INTERVAL_S = float(os.environ.get("IMAGE_SHREDDER_RENDER_POOL_HEALTH_INTERVAL", "30"))
+RENDER_POOL_TASK_TIMEOUT_S = float(os.environ.get("IMAGE_SHREDDER_RENDER_POOL_TIMEOUT", "120"))
+
+# Render memory admission control: estimated peak bytes of concurrent renders are kept under the budget.
+# Renders that don't fit next to the running ones wait (up to the max wait), renders exceeding the budget alone
+# are downscaled ("downscale" policy) or rejected ("reject" policy)
+RENDER_MEMORY_BUDGET_BYTES = int(os.environ.get("IMAGE_SHREDDER_RENDER_MEMORY_MB", "2048")) * 1024 * 1024
+ADMISSION_POLICIES = ("downscale", "reject")
+ADMISSION_POLICY = os.environ.get("IMAGE_SHREDDER_ADMISSION_POLICY", "downscale")
+ADMISSION_MAX_WAIT_S = float(os.environ.get("IMAGE_SHREDDER_ADMISSION_MAX_WAIT", "30"))
+
+# Metrics: Prometheus text endpoint on a local port (0 disables), one JSON log line per request,
+# optional UI panel with the last request's stage breakdown
+METRICS_PORT = int(os.environ.get("IMAGE_SHREDDER_METRICS_PORT", "9464"))
+METRICS_HOST = os.environ.get("IMAGE_SHREDDER_METRICS_HOST", "127.0.0.1")
+METRICS_LOG_REQUESTS = os.environ.get("IMAGE_SHREDDER_METRICS_LOG", "1") != "0"
+SHOW_DEBUG_PANEL = os.environ.get("IMAGE_SHREDDER_DEBUG_PANEL", "0") == "1"
+
+# Request profiling (opt-in): a sampled share of fetch and redraw requests runs under a profiler and is saved to
+# PROFILE_DIR as a pstats file with a JSON sidecar, `python -m src.profiling` aggregates and diffs them
+PROFILE_RATE = float(os.environ.get("IMAGE_SHREDDER_PROFILE_RATE", "0"))  # 0 disables, 1 profiles every request
+PROFILE_DIR = os.environ.get("IMAGE_SHREDDER_PROFILE_DIR", "profiles")
+PROFILERS = ("auto", "cprofile", "pyinstrument")  # auto: pyinstrument's sampling profiler if installed, else cProfile
+PROFILER = os.environ.get("IMAGE_SHREDDER_PROFILER", "auto")
+PROFILE_MAX_FILES = 500  # Oldest profiles are deleted beyond this
+
+# Chunk size sweep contact sheet
+SWEEP_CELL_WIDTH_PX = 192
+SWEEP_MAX_CELLS = 400
+SWEEP_WORKERS = int(os.environ.get("IMAGE_SHREDDER_SWEEP_WORKERS", "0"))  # 0 means min(8, CPU count)
+DEFAULT_SWEEP_MIN_CHUNK_PX = 4
+DEFAULT_SWEEP_MAX_CHUNK_PX = 64
+SWEEP_CURRENT_EFFECTS_PRESET = "Current effects"
+
+# Warm start: the page-load render of the default sample is prefetched in the background and served to new tabs.
+# Random ("multiple") sources keep a pool of prefetched renders, each one served once
+WARM_START_ENABLED = os.environ.get("IMAGE_SHREDDER_WARM_START", "1") != "0"
+WARM_START_REFRESH_S = float(os.environ.get("IMAGE_SHREDDER_WARM_START_REFRESH_S", "600"))
+WARM_START_POOL_SIZE = int(os.environ.get("IMAGE_SHREDDER_WARM_START_POOL", "4"))
+WARM_START_RETRY_S = 30
+
+# Seam analysis: chunk sizes suggested by how seamless the strip boundaries of the shred would be
+SEAM_SUGGESTIONS = 5
+
+# Deep-zoom viewer of the final shred: DZI tile pyramid generated tile by tile on demand, encoded tiles are
+# kept in a byte-budgeted LRU. The viewer (OpenSeadragon) is loaded from a CDN by the browser
+DEEP_ZOOM_ENABLED = os.environ.get("IMAGE_SHREDDER_DEEP_ZOOM", "1") != "0"
+DEEP_ZOOM_TILE_PX = 256
+DEEP_ZOOM_TILE_FORMAT = "jpg"
+DEEP_ZOOM_TILE_QUALITY = 90
+DEEP_ZOOM_SUPERSAMPLE = 4  # Samples per axis averaged into a pixel of the downscaled levels
+DEEP_ZOOM_CACHE_BUDGET_BYTES = int(os.environ.get("IMAGE_SHREDDER_DEEP_ZOOM_CACHE_MB", "64")) * 1024 * 1024
+DEEP_ZOOM_MAX_VIEWS = 64
+DEEP_ZOOM_VIEWER_HEIGHT_PX = 600
+OPENSEADRAGON_URL = "https://cdn.jsdelivr.net/npm/openseadragon@4.1.1/build/openseadragon"
+
+# Download artifacts (settings files, exported shreds): generated on request, kept in memory per session
+ARTIFACT_BUDGET_BYTES = int(os.environ.get("IMAGE_SHREDDER_ARTIFACTS_MB", "128")) * 1024 * 1024
+ARTIFACT_TTL_S = float(os.environ.get("IMAGE_SHREDDER_ARTIFACT_TTL_S", "600"))
+ARTIFACT_MAX_PER_SESSION = 4
+
+# Full-resolution shred exports are gathered, filtered and compressed in row bands of about this many bytes
+STREAM_BAND_BYTES = int(os.environ.get("IMAGE_SHREDDER_STREAM_BAND_MB", "8")) * 1024 * 1024
 
 BUTTON_SINGLE_IMAGE_TEXT = "Reload image"
 BUTTON_MULTIPLE_IMAGES_TEXT = "Change image"
@@ -61,3 +187,11 @@ DEFAULT_COLOR_EFFECT = []
 # Defaults for sliders
 DEFAULT_BRIGHTNESS = 0
 DEFAULT_CONTRAST = 1.0  # Factor 1.0 means no change
+
+# Breeding: strips of several images from a random ("multiple") sample source interleaved into one
+DEFAULT_BREED_SOURCES = 2
+MAX_BREED_SOURCES = 4
+
+# Iterated shredding (the final image fed back in), computed as powers of the strip permutations
+DEFAULT_ITERATIONS = 1
+MAX_ITERATIONS = 10 ** 9
@@ -0,0 +1,687 @@
+"""
+UI-free shredder core: effects, padding, shredding, guidelines and composing.
+Imports NumPy and src.shredder, src.png_stream, src.metrics and src.config (themselves NumPy and stdlib only),
+Pillow and Matplotlib are imported on first use. Errors are plain exceptions.
+"""
+import json
+import datetime
+from io import BytesIO
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from src.shredder import (
+    shred_image_iterated, parse_strip_schedule, format_strip_schedule, shredded_strip_boundaries, breed_images,
+    iterated_index_maps, padded_length, _take_columns
+)
+from src.png_stream import PngStreamWriter
+from src.metrics import metrics
+from src.config import (
+    OUTPUT_IMAGE_DPI, OUTPUT_IMAGE_ASPECT_RATIO, OUTPUT_IMAGE_WIDTH_IN_PIXELS,
+    MIN_VALID_OUTPUT_WIDTH, DEFAULT_TITLE_FONT_SIZE,
+    DEFAULT_CHUNK_W, DEFAULT_CHUNK_H, DEFAULT_COLOR_EFFECT, DEFAULT_BRIGHTNESS, DEFAULT_CONTRAST,
+    DEFAULT_SHOW_GUIDELINES, GUIDELINE_COLORS, DEFAULT_GUIDELINE_COLOR_NAME, OUTPUT_RENDERER, OUTPUT_RENDERERS,
+    DEFAULT_ITERATIONS, MAX_ITERATIONS, STREAM_BAND_BYTES
+)
+
+
+class ShredderError(Exception):
+    """Base class of all shredder errors, `title` is a short category shown by the UI."""
+    default_title = "Image Shredder Error"
+
+    def __init__(self, message, title=None):
+        super().__init__(message)
+        self.title = title or self.default_title
+
+
+class InvalidParametersError(ShredderError, ValueError):
+    default_title = "Inputs Validation"
+
+
+class ImageSourceError(ShredderError):
+    default_title = "Image Loading Error"
+
+
+class RenderError(ShredderError):
+    default_title = "Image Processing Error"
+
+
+class ResourceLimitError(ShredderError):
+    default_title = "Server Memory Limit"
+
+
+def get_timestamp():
+    return datetime.datetime.now().strftime('%H:%M:%S.%f')[:-3]
+
+
+@dataclass(frozen=True)
+class ShredParams:
+    """Validated, hashable render parameters."""
+    chunk_w: int = DEFAULT_CHUNK_W
+    chunk_h: int = DEFAULT_CHUNK_H
+    color_effects: tuple = tuple(DEFAULT_COLOR_EFFECT)
+    brightness_offset: int = DEFAULT_BRIGHTNESS
+    contrast_factor: float = DEFAULT_CONTRAST
+    show_guidelines: bool = DEFAULT_SHOW_GUIDELINES
+    guideline_color_rgb: tuple = field(default=tuple(GUIDELINE_COLORS[DEFAULT_GUIDELINE_COLOR_NAME]))
+    output_image_width: int = OUTPUT_IMAGE_WIDTH_IN_PIXELS
+    iterations: int = DEFAULT_ITERATIONS
+    strip_widths: str = ""  # Strip schedules (see shredder.parse_strip_schedule), empty for uniform chunks
+    strip_heights: str = ""
+
+    @classmethod
+    def from_values(
+        cls, chunk_w, chunk_h, color_effects=None, brightness_offset=DEFAULT_BRIGHTNESS,
+        contrast_factor=DEFAULT_CONTRAST, show_guidelines=DEFAULT_SHOW_GUIDELINES,
+        guideline_color_rgb=None, output_image_width=OUTPUT_IMAGE_WIDTH_IN_PIXELS, iterations=DEFAULT_ITERATIONS,
+        strip_widths="", strip_heights=""
+    ):
+        """
+        Validates and coerces raw UI/settings values (e.g. a locked slider's '16'),
+        raises InvalidParametersError.
+        """
+        validate_inputs(
+            chunk_w, chunk_h, brightness_offset, contrast_factor, output_image_width, iterations,
+            strip_widths, strip_heights
+        )
+        if guideline_color_rgb is None:
+            guideline_color_rgb = GUIDELINE_COLORS[DEFAULT_GUIDELINE_COLOR_NAME]
+        return cls(
+            chunk_w=int(chunk_w),
+            chunk_h=int(chunk_h),
+            color_effects=tuple(color_effects or ()),
+            brightness_offset=int(brightness_offset),
+            contrast_factor=float(contrast_factor),
+            show_guidelines=bool(show_guidelines),
+            guideline_color_rgb=tuple(int(c) for c in guideline_color_rgb),
+            output_image_width=int(output_image_width),
+            iterations=int(iterations),
+            strip_widths=format_strip_schedule(parse_strip_schedule(strip_widths)),
+            strip_heights=format_strip_schedule(parse_strip_schedule(strip_heights)),
+        )
+
+    @classmethod
+    def from_settings(cls, settings, **overrides):
+        """Builds parameters from a read_settings_file() dict, keyword overrides win."""
+        values = dict(
+            chunk_w=settings["chunk_w"],
+            chunk_h=settings["chunk_h"],
+            color_effects=settings["color_effects"],
+            brightness_offset=settings["brightness"],
+            contrast_factor=settings["contrast"],
+            iterations=settings["iterations"],
+            strip_widths=settings["strip_widths"],
+            strip_heights=settings["strip_heights"],
+        )
+        values.update(overrides)
+        return cls.from_values(**values)
+
+
+def pad_image_to_fit_chunks(img, chunk_width, chunk_height, strip_widths="", strip_heights=""):
+    """Edge-pads the image to a multiple of the chunk sizes, axes with a strip schedule aren't padded."""
+    img_h, img_w, _ = img.shape
+    pad_h = 0 if strip_heights else (chunk_height - (img_h % chunk_height)) % chunk_height
+    pad_w = 0 if strip_widths else (chunk_width - (img_w % chunk_width)) % chunk_width
+    if not pad_h and not pad_w:
+        return img  # Stages downstream never write into their input
+    padded_img = np.pad(img, ((0, pad_h), (0, pad_w), (0, 0)), mode='edge')
+    return padded_img
+
+
+def breed_sources(images, params):
+    """
+    Breeds N source images into one: sources are resampled to the first one's shape and their strips interleaved
+    (see shredder.breed_images) with the chunk sizes and strip schedules of params.
+    """
+    if len(images) < 2:
+        raise InvalidParametersError("Breeding needs at least two source images.")
+    from PIL import Image
+
+    height, width = images[0].shape[:2]
+    stack = np.empty((len(images), height, width, 3), dtype=np.uint8)
+    for i, img in enumerate(images):
+        img = ensure_three_channels(img)
+        if img.shape[:2] != (height, width):
+            img = np.asarray(Image.fromarray(img).resize((width, height), Image.Resampling.LANCZOS))
+        stack[i] = img
+    return breed_images(stack, params.chunk_w, params.chunk_h, params.strip_widths, params.strip_heights)
+
+
+def validate_inputs(
+    chunk_w, chunk_h, brightness_offset, contrast_factor, output_image_width, iterations=DEFAULT_ITERATIONS,
+    strip_widths="", strip_heights=""
+):
+    """
+    Validate the input parameters for the image processing function.
+    Raises InvalidParametersError with appropriate messages if validation fails.
+    """
+    try:
+        chunk_w = int(chunk_w)
+        chunk_h = int(chunk_h)
+    except (TypeError, ValueError):
+        raise InvalidParametersError(
+            "Chunk width and height must be valid integer numbers. Please check your input."
+        )
+
+    if chunk_w < 2 or chunk_h < 2:
+        raise InvalidParametersError(
+            "Chunk size too small. Minimum is 2px."
+        )
+
+    try:
+        brightness_offset = int(brightness_offset)
+    except (TypeError, ValueError):
+        raise InvalidParametersError(
+            "Brightness must be valid integer number. Please check your input."
+        )
+
+    try:
+        contrast_factor = float(contrast_factor)
+    except (TypeError, ValueError):
+        raise InvalidParametersError(
+            "Contrast must be valid float number. Please check your input."
+        )
+
+    try:
+        output_image_width = int(output_image_width)
+    except (TypeError, ValueError):
+        raise InvalidParametersError(
+            "Output image width must be a valid integer number. Please check your input."
+        )
+
+    try:
+        iterations = int(iterations)
+    except (TypeError, ValueError):
+        raise InvalidParametersError(
+            "Iterations must be a valid integer number. Please check your input."
+        )
+
+    if not 1 <= iterations <= MAX_ITERATIONS:
+        raise InvalidParametersError(
+            f"Iterations must be between 1 and {MAX_ITERATIONS}."
+        )
+
+    for axis, schedule in (("Strip widths", strip_widths), ("Strip heights", strip_heights)):
+        try:
+            parse_strip_schedule(schedule)
+        except (TypeError, ValueError) as e:
+            raise InvalidParametersError(f"{axis}: {e}")
+
+
+def render_shreds(img, params, cancel_check=None):
+    """
+    Runs pad, effects and shred stages.
+    Returns (padded image, vertical shred, final shred), effects are applied to both shreds.
+    """
+    if img is None or not isinstance(img, np.ndarray):
+        raise RenderError("No image loaded or invalid image data.")
+    if cancel_check is None:
+        def cancel_check(stage):
+            return None
+
+    cancel_check("pad")
+    with metrics.span("pad"):
+        padded_img = pad_image_to_fit_chunks(
+            img, params.chunk_w, params.chunk_h, params.strip_widths, params.strip_heights)
+    cancel_check("effects")
+    with metrics.span("effects"):
+        img_after_effects = apply_color_effect(
+            padded_img, params.color_effects, params.brightness_offset, params.contrast_factor)
+    cancel_check("shred")
+    with metrics.span("shred"):
+        vertical_shred, final_shred = shred_image_iterated(
+            img_after_effects, params.chunk_w, params.chunk_h, params.iterations,
+            params.strip_widths, params.strip_heights)
+    return padded_img, vertical_shred, final_shred
+
+
+def render_png(img, params, image_url=None, cancel_check=None):
+    """
+    Renders the 3-panel (input, vertical shred, final) view of an image as encoded PNG bytes.
+    cancel_check (e.g. RenderTicket.check) is called with the stage name before each stage
+    and stops an outdated render early by raising.
+    Stages are the same as in src.pipeline, which runs them incrementally per session.
+    """
+    if cancel_check is None:
+        def cancel_check(stage):
+            return None
+
+    padded_img, vertical_shred, final_shred = render_shreds(img, params, cancel_check)
+
+    cancel_check("guidelines")
+    with metrics.span("guidelines"):
+        display_vertical_shred, display_final_shred = apply_guidelines(
+            vertical_shred, final_shred, params.chunk_w, params.chunk_h,
+            params.show_guidelines, params.guideline_color_rgb, params.strip_widths, params.strip_heights
+        )
+
+    cancel_check("compose")
+    with metrics.span("compose"):
+        view = compose_shred_view(
+            padded_img, display_vertical_shred, display_final_shred,
+            params.color_effects, params.brightness_offset, params.contrast_factor,
+            params.output_image_width, image_url
+        )
+
+    cancel_check("encode")
+    with metrics.span("encode"):
+        return encode_view_png(view)
+
+
+def render_final_shred_png(img, params, cancel_check=None):
+    """Full-resolution final shred (effects and guidelines applied, no 3-panel view) as encoded PNG bytes."""
+    buffer = BytesIO()
+    write_final_shred_png(img, params, buffer, cancel_check)
+    return buffer.getvalue()
+
+
+def final_shred_shape(img, params):
+    """(height, width) of the final shred of img: the padded source."""
+    height, width = img.shape[:2]
+    return (padded_length(height, params.chunk_h, params.strip_heights),
+            padded_length(width, params.chunk_w, params.strip_widths))
+
+
+def iter_final_shred_bands(img, params, band_bytes=STREAM_BAND_BYTES, cancel_check=None):
+    """
+    Yields the final shred as render_final_shred_png draws it (effects and guidelines applied) in row bands,
+    top to bottom. Each band is gathered straight from the source through the shred's index maps (padding by
+    clamping them), so the padded image and the full-size shreds are never built.
+    """
+    if img is None or not isinstance(img, np.ndarray):
+        raise RenderError("No image loaded or invalid image data.")
+    if cancel_check is None:
+        def cancel_check(stage):
+            return None
+
+    height, width = img.shape[:2]
+    padded_h, padded_w = final_shred_shape(img, params)
+    _, rows, cols = iterated_index_maps(
+        padded_h, padded_w, params.chunk_w, params.chunk_h, params.iterations,
+        params.strip_widths, params.strip_heights)
+    rows = np.minimum(rows, height - 1)
+    cols = np.minimum(cols, width - 1)
+    guideline_rows = None
+    if params.show_guidelines:
+        guideline_rows = shredded_strip_boundaries(padded_h, params.chunk_h, params.strip_heights)
+        line_color_rgb = np.asarray(params.guideline_color_rgb, dtype=np.uint8)
+
+    band_rows = max(1, band_bytes // (padded_w * img.shape[2]))
+    for start in range(0, padded_h, band_rows):
+        stop = min(start + band_rows, padded_h)
+        cancel_check("shred")
+        with metrics.span("shred"):
+            band = _take_columns(img[rows[start:stop]], cols)
+        with metrics.span("effects"):
+            band = apply_color_effect(band, params.color_effects, params.brightness_offset, params.contrast_factor)
+        if guideline_rows is not None:
+            lines = np.isin(np.arange(start, stop), guideline_rows)
+            if band.shape[2] == 1:
+                band[lines] = 255 if np.mean(line_color_rgb) > 128 else 0
+            else:
+                band[lines] = line_color_rgb
+        yield band
+
+
+def write_final_shred_png(img, params, fileobj, cancel_check=None, band_bytes=STREAM_BAND_BYTES):
+    """
+    Writes the final shred PNG (see render_final_shred_png) to a file object band by band, memory stays at
+    O(band) next to the source. Returns the number of bytes written.
+    """
+    padded_h, padded_w = final_shred_shape(img, params)
+    writer = PngStreamWriter(fileobj, padded_w, padded_h)
+    for band in iter_final_shred_bands(img, params, band_bytes, cancel_check):
+        with metrics.span("encode"):
+            writer.write_band(band)
+    with metrics.span("encode"):
+        writer.close()
+    return writer.bytes_written
+
+
+def apply_guidelines(
+    vertical_shred, final_shred, chunk_w, chunk_h, show_guidelines, guideline_color_rgb_array,
+    strip_widths="", strip_heights=""
+):
+    """
+    Returns the vertical and final shreds for display, with chunk guidelines drawn if enabled.
+    With strip schedules the lines go on the shredded strip boundaries.
+    """
+    if not show_guidelines:
+        return vertical_shred, final_shred
+    guideline_color_rgb_array = np.asarray(guideline_color_rgb_array, dtype=np.uint8)
+    vertical_positions = final_positions = None
+    if strip_widths:
+        vertical_positions = shredded_strip_boundaries(vertical_shred.shape[1], chunk_w, strip_widths)
+    if strip_heights:
+        final_positions = shredded_strip_boundaries(final_shred.shape[0], chunk_h, strip_heights)
+    display_vertical_shred = draw_guidelines(
+        vertical_shred, chunk_w, orientation='vertical', line_color_rgb=guideline_color_rgb_array,
+        positions=vertical_positions)
+    display_final_shred = draw_guidelines(
+        final_shred, chunk_h, orientation='horizontal', line_color_rgb=guideline_color_rgb_array,
+        positions=final_positions)
+    return display_vertical_shred, display_final_shred
+
+
+def _compose_layout(padded_img, color_effects, brightness_offset, contrast_factor, output_image_width):
+    """
+        Shared layout of the 3-panel view for all renderers.
+        Returns (applied effects title suffix, title font size in points, output width px, output height px).
+    """
+    if output_image_width is None or not isinstance(output_image_width, (int, float)) or output_image_width < MIN_VALID_OUTPUT_WIDTH:
+        raise InvalidParametersError(
+            f"Output image width must be a positive number. Received: '{output_image_width}'. Please enter a valid width (e.g., >= {MIN_VALID_OUTPUT_WIDTH}px)."
+        )
+
+    effects_applied_list = []
+    if color_effects:
+        effects_applied_list.extend(color_effects)
+    if brightness_offset != 0:
+        effects_applied_list.append(f"Bright {brightness_offset:+.0f}")
+    if contrast_factor != 1.0:
+        effects_applied_list.append(f"Contrast x{contrast_factor:.1f}")
+
+    applied_effects_str = f" ({', '.join(effects_applied_list)})" if effects_applied_list else ""
+
+    if output_image_width < MIN_VALID_OUTPUT_WIDTH:
+        scaled_title_fontsize = DEFAULT_TITLE_FONT_SIZE
+    else:
+        reference_width = OUTPUT_IMAGE_WIDTH_IN_PIXELS if OUTPUT_IMAGE_WIDTH_IN_PIXELS > 0 else output_image_width
+        if reference_width == 0:
+            reference_width = 800  # Failsafe
+        scaled_title_fontsize = (output_image_width / OUTPUT_IMAGE_WIDTH_IN_PIXELS) * DEFAULT_TITLE_FONT_SIZE
+    scaled_title_fontsize = np.clip(scaled_title_fontsize, 7, 72)  # Clamping font size to a reasonable range
+
+    padded_h, padded_w = padded_img.shape[:2]
+    if padded_h == 0 or padded_w == 0:
+        input_aspect_ratio = OUTPUT_IMAGE_ASPECT_RATIO  # Fallback
+    else:
+        input_aspect_ratio = padded_w / padded_h
+
+    dynamic_output_image_height_px = (output_image_width / (input_aspect_ratio * 3)) + (scaled_title_fontsize * 4)
+
+    if output_image_width <= 0 or dynamic_output_image_height_px <= 0:
+        raise RenderError(
+            f"Calculated output dimensions are invalid (width: {output_image_width}px, height: {dynamic_output_image_height_px:.0f}px). "
+            f"Please check output width ({output_image_width}px) and aspect ratio ({OUTPUT_IMAGE_ASPECT_RATIO})."
+        )
+    return applied_effects_str, scaled_title_fontsize, output_image_width, dynamic_output_image_height_px
+
+
+def compose_shred_view(
+    padded_img, display_vertical_shred, display_final_shred,
+    color_effects, brightness_offset, contrast_factor, output_image_width, image_url=None, renderer=None
+):
+    """Composes the 3-panel view with the configured renderer ('matplotlib' or 'pillow'), see encode_view_png."""
+    renderer = renderer or OUTPUT_RENDERER
+    if renderer == "matplotlib":
+        compose = compose_shred_figure
+    elif renderer == "pillow":
+        compose = compose_shred_image
+    else:
+        raise RenderError(f"Unknown output renderer '{renderer}', expected one of: {', '.join(OUTPUT_RENDERERS)}.")
+    return compose(
+        padded_img, display_vertical_shred, display_final_shred,
+        color_effects, brightness_offset, contrast_factor, output_image_width, image_url
+    )
+
+
+def compose_shred_figure(
+    padded_img, display_vertical_shred, display_final_shred,
+    color_effects, brightness_offset, contrast_factor, output_image_width, image_url=None
+):
+    """
+        Composes the input, vertical shred and final images into a 3-panel Matplotlib figure.
+        The figure is created without pyplot, so it's not registered in pyplot's global state
+        and doesn't leak when a render is abandoned before encoding.
+    """
+    applied_effects_str, scaled_title_fontsize, output_width_px, output_height_px = _compose_layout(
+        padded_img, color_effects, brightness_offset, contrast_factor, output_image_width)
+
+    current_dpi = OUTPUT_IMAGE_DPI
+    if current_dpi == 0:
+        raise RenderError("Output Image DPI in configuration cannot be zero.")
+
+    fig_w = output_width_px / current_dpi
+    fig_h = output_height_px / current_dpi
+
+    # Lazy import, Matplotlib is loaded on the first compose only.
+    # Figure is used without pyplot: no GUI backend gets involved, which avoids the macOS crashes when
+    # Gradio runs handlers in background threads (GUI backends require the main thread), Agg renders to memory.
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(fig_w, fig_h), dpi=current_dpi)
+    axs = fig.subplots(1, 3)
+
+    axs[0].imshow(padded_img)
+    axs[0].set_title(f'Input Image', fontsize=scaled_title_fontsize)
+    axs[0].axis('off')
+
+    axs[1].imshow(display_vertical_shred)
+    axs[1].set_title(f'Vertical Shred{applied_effects_str}', fontsize=scaled_title_fontsize)
+    axs[1].axis('off')
+
+    axs[2].imshow(display_final_shred)
+    axs[2].set_title(f'Final Image{applied_effects_str}', fontsize=scaled_title_fontsize)
+    axs[2].axis('off')
+
+    fig.text(
+        0.5,
+        0.01,
+        str(image_url) if image_url else "",
+        ha='center',
+        va='bottom',
+        fontsize=scaled_title_fontsize,
+        color='#888888',
+        wrap=True
+    )
+
+    fig.tight_layout()
+    return fig
+
+
+def _pillow_font(size_px):
+    from PIL import ImageFont
+    try:
+        return ImageFont.load_default(size=size_px)
+    except TypeError:  # Pillow < 10.1 has a fixed size bitmap font only
+        return ImageFont.load_default()
+
+
+def compose_shred_image(
+    padded_img, display_vertical_shred, display_final_shred,
+    color_effects, brightness_offset, contrast_factor, output_image_width, image_url=None
+):
+    """
+        Pillow renderer of the 3-panel view, same layout as compose_shred_figure without importing Matplotlib.
+        Panels are scaled to fit (nearest neighbour when enlarging, keeps the strips crisp).
+    """
+    from PIL import Image, ImageDraw
+
+    applied_effects_str, scaled_title_fontsize, output_width_px, output_height_px = _compose_layout(
+        padded_img, color_effects, brightness_offset, contrast_factor, output_image_width)
+    width_px, height_px = int(round(output_width_px)), int(round(output_height_px))
+    font_px = max(1, int(round(scaled_title_fontsize * OUTPUT_IMAGE_DPI / 72)))  # Points to pixels
+    font = _pillow_font(font_px)
+    margin = max(2, font_px // 2)
+    title_h = int(font_px * 1.5)
+    caption_h = int(font_px * 1.5) if image_url else 0
+    panel_w = max(1, (width_px - margin * 4) // 3)
+    panel_h = max(1, height_px - title_h - caption_h - margin * 2)
+
+    canvas = Image.new('RGB', (width_px, height_px), 'white')
+    draw = ImageDraw.Draw(canvas)
+    panels = (
+        (padded_img, 'Input Image'),
+        (display_vertical_shred, f'Vertical Shred{applied_effects_str}'),
+        (display_final_shred, f'Final Image{applied_effects_str}'),
+    )
+    for i, (panel, title) in enumerate(panels):
+        panel_img = Image.fromarray(np.ascontiguousarray(panel[..., 0] if panel.shape[2] == 1 else panel)).convert('RGB')
+        scale = min(panel_w / panel_img.width, panel_h / panel_img.height)
+        size = (max(1, round(panel_img.width * scale)), max(1, round(panel_img.height * scale)))
+        panel_img = panel_img.resize(size, Image.Resampling.NEAREST if scale >= 1 else Image.Resampling.BOX)
+        x0 = margin + i * (panel_w + margin)
+        canvas.paste(panel_img, (x0 + (panel_w - size[0]) // 2, margin + title_h + (panel_h - size[1]) // 2))
+        draw.text((x0 + panel_w // 2, margin + title_h // 2), title, fill='black', font=font, anchor='mm')
+
+    if image_url:
+        draw.text((width_px // 2, height_px - margin), str(image_url), fill='#888888', font=font, anchor='md')
+    return canvas
+
+
+def encode_figure_png(fig):
+    """Renders the figure with the Agg backend and returns the encoded PNG bytes."""
+    buf = BytesIO()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+
+def encode_view_png(view):
+    """Encodes a composed view, a Matplotlib figure or a PIL image, as PNG bytes."""
+    if hasattr(view, 'savefig'):
+        return encode_figure_png(view)
+    buf = BytesIO()
+    view.save(buf, format='png')
+    return buf.getvalue()
+
+
+def apply_color_effect(img, effects_list, brightness_offset, contrast_factor):
+    img_temp_float = img.astype(np.float32)
+
+    if not effects_list:
+        effects_list = []
+
+    for effect in effects_list:
+        if effect == "Invert Colors":
+            img_temp_float = 255 - img_temp_float
+        elif effect == "Swap R/G Channels":
+            if img_temp_float.ndim < 3 or img_temp_float.shape[2] < 3:
+                print(f"Warning: '{effect}' effect skipped as image does not have 3 channels.")
+                continue
+            temp_swap = img_temp_float.copy()
+            temp_swap[..., 0], temp_swap[..., 1] = temp_swap[..., 1].copy(), temp_swap[..., 0].copy()
+            img_temp_float = temp_swap
+        elif effect == "Red Channel Only":
+            if img_temp_float.ndim < 3 or img_temp_float.shape[2] < 3:
+                print(f"Warning: '{effect}' effect skipped as image does not have 3 channels.")
+                continue
+            temp_red = img_temp_float.copy()
+            temp_red[..., 1:] = 0
+            img_temp_float = temp_red
+        elif effect == "Grayscale":
+            if img_temp_float.ndim < 3:
+                print(f"Warning: '{effect}' effect skipped as image does not have color channels.")
+                continue
+            gray_img_single_channel = np.mean(img_temp_float, axis=2, keepdims=True)
+            img_temp_float = np.repeat(gray_img_single_channel, 3, axis=2)
+        elif effect == "Grayscale 1 Channel":
+            if img_temp_float.ndim < 3:
+                print(f"Warning: '{effect}' effect skipped as image does not have color channels.")
+                continue
+            img_temp_float = np.mean(img_temp_float, axis=2, keepdims=True)
+        elif effect == "Sepia":
+            if img_temp_float.ndim < 3 or img_temp_float.shape[2] < 3:
+                print(f"Warning: '{effect}' effect skipped as image does not have 3 channels.")
+                continue
+            sepia_matrix = np.array([
+                [0.393, 0.769, 0.189],
+                [0.349, 0.686, 0.168],
+                [0.272, 0.534, 0.131]
+            ])
+            r, g, b = img_temp_float[..., 0].copy(), img_temp_float[..., 1].copy(), img_temp_float[..., 2].copy()
+            img_temp_float[..., 0] = r * sepia_matrix[0, 0] + g * sepia_matrix[0, 1] + b * sepia_matrix[0, 2]
+            img_temp_float[..., 1] = r * sepia_matrix[1, 0] + g * sepia_matrix[1, 1] + b * sepia_matrix[1, 2]
+            img_temp_float[..., 2] = r * sepia_matrix[2, 0] + g * sepia_matrix[2, 1] + b * sepia_matrix[2, 2]
+        elif effect == "Solarize":
+            threshold = 128 + 64 + 16
+            condition = img_temp_float >= threshold
+            img_temp_float[condition] = 255 - img_temp_float[condition]
+
+    if brightness_offset != 0:
+        img_temp_float = img_temp_float + brightness_offset
+
+    if contrast_factor != 1.0:
+        img_temp_float = 128 + contrast_factor * (img_temp_float - 128)
+
+    return np.clip(img_temp_float, 0, 255).astype(np.uint8)
+
+
+def ensure_three_channels(img):
+    if img.ndim == 2:
+        # (H, W) -> (H, W, 3)
+        return np.repeat(img[:, :, np.newaxis], 3, axis=2)
+    elif img.ndim == 3 and img.shape[2] == 1:
+        # (H, W, 1) -> (H, W, 3)
+        return np.repeat(img, 3, axis=2)
+    return img
+
+
+def draw_guidelines(
+    image_array, chunk_size, orientation='vertical', line_thickness=1,
+    line_color_rgb=np.array([255, 0, 0], dtype=np.uint8), positions=None
+):
+    """Draws guidelines on an image array, every chunk_size pixels or at the given positions."""
+    img_with_lines = image_array.copy()
+    if positions is None:
+        extent = img_with_lines.shape[1 if orientation == 'vertical' else 0]
+        positions = range(chunk_size, extent // chunk_size * chunk_size, chunk_size)
+    # Check if the image is 1 channel or RGB
+    if img_with_lines.ndim == 2 or (img_with_lines.ndim == 3 and img_with_lines.shape[2] == 1):
+        # Grayscale image
+        h, w = img_with_lines.shape[:2]
+        line_value = 255 if np.mean(line_color_rgb) > 128 else 0
+        if orientation == 'vertical':
+            for x in positions:
+                start_x = max(0, x - line_thickness // 2)
+                end_x = min(w, x + (line_thickness + 1) // 2)
+                if start_x < end_x:
+                    if img_with_lines.ndim == 2:
+                        img_with_lines[:, start_x:end_x] = line_value
+                    else:
+                        img_with_lines[:, start_x:end_x, 0] = line_value
+        elif orientation == 'horizontal':
+            for y in positions:
+                start_y = max(0, y - line_thickness // 2)
+                end_y = min(h, y + (line_thickness + 1) // 2)
+                if start_y < end_y:
+                    if img_with_lines.ndim == 2:
+                        img_with_lines[start_y:end_y, :] = line_value
+                    else:
+                        img_with_lines[start_y:end_y, :, 0] = line_value
+    else:
+        # RGB image processing
+        h, w, _ = img_with_lines.shape
+        if orientation == 'vertical':
+            for x in positions:
+                start_x = max(0, x - line_thickness // 2)
+                end_x = min(w, x + (line_thickness + 1) // 2)
+                if start_x < end_x:
+                    img_with_lines[:, start_x:end_x, :] = line_color_rgb
+        elif orientation == 'horizontal':
+            for y in positions:
+                start_y = max(0, y - line_thickness // 2)
+                end_y = min(h, y + (line_thickness + 1) // 2)
+                if start_y < end_y:
+                    img_with_lines[start_y:end_y, :, :] = line_color_rgb
+    return img_with_lines
+
+
+def read_settings_file(path):
+    """
+    Reads a settings JSON file as written by the app's "Download settings" button,
+    missing keys fall back to the defaults.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        settings = json.load(f)
+    return {
+        "chunk_w": settings.get("chunk_w", DEFAULT_CHUNK_W),
+        "chunk_h": settings.get("chunk_h", DEFAULT_CHUNK_H),
+        "is_locked": settings.get("is_locked", False),
+        "color_effects": settings.get("color_effects", DEFAULT_COLOR_EFFECT),
+        "brightness": settings.get("brightness", DEFAULT_BRIGHTNESS),
+        "contrast": settings.get("contrast", DEFAULT_CONTRAST),
+        "iterations": settings.get("iterations", DEFAULT_ITERATIONS),
+        "strip_widths": settings.get("strip_widths", ""),
+        "strip_heights": settings.get("strip_heights", ""),
+    }
@@ -0,0 +1,246 @@
+"""
+Deep-zoom (DZI) tile pyramid of the final shred, for panning and zooming high-resolution outputs.
+The shred is a row and a column permutation of the padded source (iterated_index_maps), so each tile is gathered
+straight from the source and gets the (per-pixel) color effects applied, the full-size shred is never built.
+Tiles are generated on demand by the browser's viewer and kept in a byte-budgeted LRU.
+"""
+import math
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+
+import numpy as np
+
+from src.shredder import iterated_index_maps, padded_length, shredded_strip_boundaries
+from src.core import apply_color_effect
+from src.render_cache import RenderCache, make_render_key
+from src.metrics import metrics
+from src.config import (
+    DEEP_ZOOM_TILE_PX, DEEP_ZOOM_TILE_FORMAT, DEEP_ZOOM_TILE_QUALITY, DEEP_ZOOM_SUPERSAMPLE,
+    DEEP_ZOOM_CACHE_BUDGET_BYTES, DEEP_ZOOM_MAX_VIEWS, OPENSEADRAGON_URL
+)
+
+ROUTE_PREFIX = "/deepzoom"
+
+
+class ShredTileSource:
+    """
+    DZI pyramid of one (source, ShredParams) pair. Level max_level is the full-size shred, each level below
+    halves it, down to level 0 (1x1 pixel). Padding is replicated by clamping the index maps to the source edges.
+    """
+
+    def __init__(self, load_image, shape, params, tile_size=DEEP_ZOOM_TILE_PX, supersample=DEEP_ZOOM_SUPERSAMPLE):
+        height, width = shape[:2]
+        padded_h = padded_length(height, params.chunk_h, params.strip_heights)
+        padded_w = padded_length(width, params.chunk_w, params.strip_widths)
+        _, rows, cols = iterated_index_maps(
+            padded_h, padded_w, params.chunk_w, params.chunk_h, params.iterations,
+            params.strip_widths, params.strip_heights
+        )
+        self.guideline_rows = shredded_strip_boundaries(padded_h, params.chunk_h, params.strip_heights)
+        self.rows = np.minimum(rows, height - 1)
+        self.cols = np.minimum(cols, width - 1)
+        self.load_image = load_image
+        self.params = params
+        self.width, self.height = padded_w, padded_h
+        self.tile_size = tile_size
+        self.supersample = supersample
+        self.max_level = math.ceil(math.log2(max(padded_w, padded_h, 1)))
+
+    def level_size(self, level):
+        scale = 2 ** (self.max_level - level)
+        return -(-self.width // scale), -(-self.height // scale)
+
+    def dzi_xml(self, tile_format=DEEP_ZOOM_TILE_FORMAT):
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" '
+            f'Format="{tile_format}" Overlap="0" TileSize="{self.tile_size}">'
+            f'<Size Width="{self.width}" Height="{self.height}"/></Image>'
+        )
+
+    def _sample_positions(self, start, stop, scale, length):
+        """Full-size positions sampled for level pixels start..stop, `samples` evenly spread per level pixel."""
+        samples = min(scale, self.supersample)
+        offsets = np.arange(samples) * scale // samples + scale // (2 * samples)
+        positions = (np.arange(start, stop)[:, None] * scale + offsets).ravel()
+        return np.minimum(positions, length - 1), samples
+
+    def tile(self, level, col, row):
+        """
+        Returns the tile as an (H, W, C) uint8 array.
+        Raises IndexError outside of the pyramid and LookupError if the source got evicted.
+        """
+        if not 0 <= level <= self.max_level:
+            raise IndexError(f"Level {level} is outside of 0..{self.max_level}.")
+        level_w, level_h = self.level_size(level)
+        x0, y0 = col * self.tile_size, row * self.tile_size
+        if col < 0 or row < 0 or x0 >= level_w or y0 >= level_h:
+            raise IndexError(f"Tile {col}_{row} is outside of level {level}.")
+        x1, y1 = min(x0 + self.tile_size, level_w), min(y0 + self.tile_size, level_h)
+
+        scale = 2 ** (self.max_level - level)
+        ys, samples = self._sample_positions(y0, y1, scale, self.height)
+        xs, _ = self._sample_positions(x0, x1, scale, self.width)
+        img = self.load_image()
+        if img is None:
+            raise LookupError("The source image is no longer stored, render it again.")
+        gathered = img[np.ix_(self.rows[ys], self.cols[xs])]
+        params = self.params
+        tile = apply_color_effect(gathered, params.color_effects, params.brightness_offset, params.contrast_factor)
+
+        if params.show_guidelines:
+            # Same lines as draw_guidelines on the final shred: the inner strip boundaries
+            lines = np.isin(ys, self.guideline_rows)
+            color = np.asarray(params.guideline_color_rgb, dtype=np.uint8)
+            tile[lines] = color if tile.shape[2] == 3 else (255 if color.mean() > 128 else 0)
+
+        if samples > 1:
+            h, w, c = tile.shape
+            tile = tile.reshape(h // samples, samples, w // samples, samples, c).mean(axis=(1, 3))
+            tile = np.rint(tile).astype(np.uint8)
+        return tile
+
+    def tile_bytes(self, level, col, row, tile_format=DEEP_ZOOM_TILE_FORMAT, quality=DEEP_ZOOM_TILE_QUALITY):
+        from PIL import Image
+
+        tile = self.tile(level, col, row)
+        pil_tile = Image.fromarray(tile[..., 0] if tile.shape[2] == 1 else tile)
+        buffer = BytesIO()
+        if tile_format == "png":
+            pil_tile.save(buffer, format="PNG", compress_level=1)
+        else:
+            pil_tile.save(buffer, format="JPEG", quality=quality)
+        return buffer.getvalue()
+
+
+class DeepZoomViews:
+    """Registered tile sources by view id (LRU capped in count) and the shared LRU of encoded tiles."""
+
+    def __init__(self, max_views=DEEP_ZOOM_MAX_VIEWS, cache_budget_bytes=DEEP_ZOOM_CACHE_BUDGET_BYTES):
+        self.max_views = max_views
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+        self.tile_cache = RenderCache(cache_budget_bytes, name="deep_zoom_tiles")
+
+    @staticmethod
+    def make_view_id(image_key, params, image_url=None):
+        return hashlib.sha1(repr(make_render_key(image_key, params, image_url)).encode("utf-8")).hexdigest()[:20]
+
+    def register(self, image_key, params, load_image, shape, image_url=None):
+        """Registers the shred of a stored image, returns its view id (stable for the same image and parameters)."""
+        view_id = self.make_view_id(image_key, params, image_url)
+        with self._lock:
+            if view_id in self._views:
+                self._views.move_to_end(view_id)
+                return view_id
+        source = ShredTileSource(load_image, shape, params)  # Index maps are built outside of the lock
+        with self._lock:
+            self._views[view_id] = source
+            while len(self._views) > self.max_views:
+                self._views.popitem(last=False)
+        return view_id
+
+    def get(self, view_id):
+        with self._lock:
+            source = self._views.get(view_id)
+            if source is not None:
+                self._views.move_to_end(view_id)
+            return source
+
+    def tile_bytes(self, view_id, level, col, row):
+        """Encoded tile, None for unknown views. Raises LookupError (IndexError outside of the pyramid)."""
+        source = self.get(view_id)
+        if source is None:
+            return None
+        key = (view_id, level, col, row)
+        data = self.tile_cache.get(key)
+        if data is None:
+            with metrics.span("deep_zoom_tile"):
+                data = source.tile_bytes(level, col, row)
+            self.tile_cache.put(key, data)
+        return data
+
+    def stats(self):
+        with self._lock:
+            views = len(self._views)
+        return {"views": views, "tiles": self.tile_cache.stats()}
+
+
+deep_zoom_views = DeepZoomViews()
+metrics.gauge("shredder_deep_zoom_tile_cache_bytes", "Bytes held by the deep-zoom tile cache.",
+              lambda: deep_zoom_views.tile_cache.stats()["bytes"])
+
+
+VIEWER_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<style>html, body, #viewer {{ margin: 0; width: 100%; height: 100%; background: #111; }}</style>
+<script src="{openseadragon_url}/openseadragon.min.js"></script>
+</head>
+<body>
+<div id="viewer"></div>
+<script>
+OpenSeadragon({{
+    id: "viewer",
+    prefixUrl: "{openseadragon_url}/images/",
+    tileSources: "../{view_id}.dzi",
+    showNavigator: true,
+    maxZoomPixelRatio: 4,
+    immediateRender: true
+}});
+</script>
+</body>
+</html>
+"""
+
+
+def viewer_iframe_html(view_id, height_px):
+    """gr.HTML content embedding the viewer of a registered view, relative to the app's root path."""
+    return (
+        f'<iframe src="{ROUTE_PREFIX.lstrip("/")}/{view_id}/viewer" '
+        f'style="width: 100%; height: {height_px}px; border: 0;" loading="lazy"></iframe>'
+    )
+
+
+def add_deep_zoom_routes(app, views=deep_zoom_views):
+    """
+    Adds the viewer page, DZI descriptors and tile routes to a FastAPI app (e.g. the launched Gradio app):
+    /deepzoom/{view_id}/viewer, /deepzoom/{view_id}.dzi and /deepzoom/{view_id}_files/{level}/{col}_{row}.{format}
+    """
+    from fastapi import APIRouter, HTTPException
+    from fastapi.responses import HTMLResponse, Response
+
+    router = APIRouter(prefix=ROUTE_PREFIX)
+    media_types = {"jpg": "image/jpeg", "jpeg": "image/jpeg", "png": "image/png"}
+
+    @router.get("/{view_id}/viewer", response_class=HTMLResponse)
+    def viewer(view_id: str):
+        if views.get(view_id) is None:
+            raise HTTPException(status_code=404, detail="Unknown view, render the image again.")
+        return VIEWER_HTML.format(openseadragon_url=OPENSEADRAGON_URL, view_id=view_id)
+
+    @router.get("/{view_id}.dzi")
+    def descriptor(view_id: str):
+        source = views.get(view_id)
+        if source is None:
+            raise HTTPException(status_code=404, detail="Unknown view.")
+        return Response(source.dzi_xml(), media_type="application/xml")
+
+    # Sync handlers run in FastAPI's threadpool, tile generation doesn't block the event loop
+    @router.get("/{view_id}_files/{level}/{col}_{row}.{tile_format}")
+    def tile(view_id: str, level: int, col: int, row: int, tile_format: str):
+        if tile_format != DEEP_ZOOM_TILE_FORMAT:
+            raise HTTPException(status_code=404, detail="Unknown tile format.")
+        try:
+            data = views.tile_bytes(view_id, level, col, row)
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        if data is None:
+            raise HTTPException(status_code=404, detail="Unknown view.")
+        return Response(data, media_type=media_types[tile_format], headers={"Cache-Control": "private, max-age=3600"})
+
+    app.include_router(router)
+    return app
@@ -0,0 +1,174 @@
+"""
+Upstream request control. Concurrent downloads of one URL share a single download and decode (single flight),
+and requests to each upstream host are capped, more wait in line. Page-load spikes then cost one request per URL,
+and stay within the host's rate limits. Limits are per process (batch workers each have their own).
+"""
+import time
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from src.core import ImageSourceError
+from src.metrics import metrics
+from src.config import DOWNLOAD_HOST_CONCURRENCY, DOWNLOAD_HOST_MAX_WAIT_S
+
+POLL_INTERVAL_S = 0.1  # Waiting callers check their cancellation this often
+
+coalesced_requests = metrics.counter(
+    "shredder_coalesced_requests_total", "Upstream requests served by another caller's request in flight.")
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.cancel_checks = []
+
+    def check(self, stage=None):
+        """The shared work only stops once every caller gave up: raises when all their cancel checks raise."""
+        error = None
+        for cancel_check in list(self.cancel_checks):
+            if cancel_check is None:
+                return
+            try:
+                cancel_check(stage)
+                return
+            except Exception as e:
+                error = e
+        if error is not None:
+            raise error
+
+
+class SingleFlight:
+    """
+    Calls with the same key while one is running share its result (or error): the first caller runs fn,
+    the others wait for it. fn gets a cancel check that raises once every waiting caller has been cancelled.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, fn, cancel_check=None, stage="download"):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+            else:
+                self.followers += 1
+            flight.cancel_checks.append(cancel_check)
+
+        if leader:
+            try:
+                flight.result = fn(flight.check)
+            except Exception as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+        else:
+            coalesced_requests.inc(stage=stage)
+            metrics.annotate(**{stage: "coalesced"})
+            try:
+                while not flight.done.wait(POLL_INTERVAL_S):
+                    if cancel_check is not None:
+                        cancel_check(stage)
+            finally:
+                with self._lock:
+                    flight.cancel_checks.remove(cancel_check)
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._flights), "leaders": self.leaders, "followers": self.followers}
+
+
+def url_host(url):
+    return urlparse(url).netloc.lower() if isinstance(url, str) else ""
+
+
+class _HostSlots:
+    """A host's request slots and the number of callers holding or waiting for one."""
+
+    def __init__(self, limit):
+        self.semaphore = threading.BoundedSemaphore(limit)
+        self.users = 0
+
+
+class HostLimiter:
+    """
+    At most `limit` concurrent requests per host, callers over it wait in line up to max_wait_s.
+    A host's slots are dropped when no caller holds or waits for one, only hosts in use are kept.
+    """
+
+    def __init__(self, limit=DOWNLOAD_HOST_CONCURRENCY, max_wait_s=DOWNLOAD_HOST_MAX_WAIT_S):
+        self.limit = limit
+        self.max_wait_s = max_wait_s
+        self._hosts = {}  # Host: _HostSlots
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.rejected = 0
+
+    @contextmanager
+    def slot(self, url, cancel_check=None):
+        """Holds one of the host's request slots, raises ImageSourceError when the wait exceeds max_wait_s."""
+        host = url_host(url)
+        if self.limit <= 0 or not host:
+            yield
+            return
+        with self._lock:
+            slots = self._hosts.get(host)
+            if slots is None:
+                slots = self._hosts[host] = _HostSlots(self.limit)
+            slots.users += 1
+        try:
+            if not slots.semaphore.acquire(blocking=False):
+                self._wait(slots.semaphore, host, cancel_check)
+            try:
+                yield
+            finally:
+                slots.semaphore.release()
+        finally:
+            with self._lock:
+                slots.users -= 1
+                if not slots.users:
+                    del self._hosts[host]
+
+    def _wait(self, semaphore, host, cancel_check):
+        deadline = time.monotonic() + self.max_wait_s
+        with self._lock:
+            self.waiting += 1
+        try:
+            with metrics.span("host_queue"):
+                while not semaphore.acquire(timeout=POLL_INTERVAL_S):
+                    if cancel_check is not None:
+                        cancel_check("host_queue")
+                    if time.monotonic() >= deadline:
+                        with self._lock:
+                            self.rejected += 1
+                        raise ImageSourceError(
+                            f"Too many concurrent requests to {host}, gave up after {self.max_wait_s:.0f}s in line.",
+                            title="Image Download Error"
+                        )
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def stats(self):
+        with self._lock:
+            return {"hosts": len(self._hosts), "waiting": self.waiting, "rejected": self.rejected}
+
+
+download_flights = SingleFlight()
+host_limiter = HostLimiter()
+metrics.gauge("shredder_host_queue_waiting", "Upstream requests waiting for a per-host slot.",
+              lambda: host_limiter.stats()["waiting"])
@@ -0,0 +1,211 @@
+"""
+Async image fetching for the UI. Scrape and download are blocking (Requests), so they run in a bounded thread pool
+while the handler awaits them on the event loop: a slow upstream holds a fetch thread, not a Gradio worker.
+Each step has a deadline, and the whole fetch has one too. A session's pending fetch is cancelled by its next image
+request or when it disconnects. The waiting handler returns right away, and an abandoned download stops at its next
+body chunk, unless a concurrent fetch of another session shares it (see src.downloads). Decoding runs in the fetch
+thread with the download. Rendering stays on its own threads or the render pool.
+"""
+import time
+import asyncio
+import functools
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core import ImageSourceError
+from src.sources import load_image_source
+from src.downloads import download_flights
+from src.metrics import metrics
+from src.config import FETCH_WORKERS, SCRAPE_TIMEOUT_S, DOWNLOAD_TIMEOUT_S, FETCH_TIMEOUT_S
+
+fetch_outcomes = metrics.counter("shredder_fetches_total", "UI image fetches by outcome (ok, cancelled, timeout, error).")
+
+
+class FetchCancelled(Exception):
+    """Raised in a fetch superseded by a newer image request of its session, or whose session disconnected."""
+
+
+class FetchTimeout(ImageSourceError):
+    default_title = "Image Fetching Timeout"
+
+
+class FetchTicket:
+    """Deadline and cancellation of one fetch, shared by the awaiting handler and the fetch thread."""
+
+    def __init__(self, timeout_s):
+        self.deadline = time.monotonic() + timeout_s
+        self.reason = None
+        self._loop = asyncio.get_running_loop()
+        self._cancelled = asyncio.Event()
+        self._abandoned = threading.Event()
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+    def cancel(self, reason):
+        """Cancels the fetch, callable from any thread."""
+        self.reason = self.reason or reason
+        self._abandoned.set()
+        try:
+            self._loop.call_soon_threadsafe(self._cancelled.set)
+        except RuntimeError:  # Event loop closed, nothing awaits the fetch anymore
+            pass
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check(self, stage=None):
+        """Called by the fetch thread between chunks, stops a fetch that was cancelled or ran out of time."""
+        if self._abandoned.is_set():
+            raise ImageSourceError(f"Fetch abandoned during {stage}: {self.reason or 'deadline exceeded'}")
+        if self.remaining() <= 0:
+            raise ImageSourceError(f"Fetch deadline exceeded during {stage}")
+
+    async def run_step(self, executor, stage, timeout_s, fn, *args, **kwargs):
+        """Runs fn in the executor until it returns, its deadline (or the fetch's) passes or the fetch is cancelled."""
+        timeout_s = min(timeout_s, self.remaining())
+        if self.cancelled:
+            raise FetchCancelled(self.reason)
+        if timeout_s <= 0:
+            raise FetchTimeout(f"Fetch deadline exceeded before {stage}.")
+        context = contextvars.copy_context()  # Spans of the step join the request trace
+        future = self._loop.run_in_executor(executor, functools.partial(context.run, fn, *args, **kwargs))
+        cancel_wait = asyncio.ensure_future(self._cancelled.wait())
+        try:
+            done, _ = await asyncio.wait({future, cancel_wait}, timeout=timeout_s, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:  # The handler itself was cancelled
+            self._abandoned.set()
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            raise
+        finally:
+            cancel_wait.cancel()
+        if future in done:
+            return future.result()
+        self._abandoned.set()  # The thread stops at its next check, its result is dropped
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())  # Retrieved, so asyncio doesn't log it
+        if self.cancelled:
+            raise FetchCancelled(self.reason)
+        raise FetchTimeout(f"The {stage} step took longer than {timeout_s:.0f}s and was abandoned.")
+
+
+class ImageFetcher:
+    """Runs the UI's scrape and download steps off the event loop, at most one pending fetch per session."""
+
+    def __init__(self, workers=FETCH_WORKERS, scrape_timeout_s=SCRAPE_TIMEOUT_S,
+                 download_timeout_s=DOWNLOAD_TIMEOUT_S, timeout_s=FETCH_TIMEOUT_S):
+        self.workers = workers
+        self.scrape_timeout_s = scrape_timeout_s
+        self.download_timeout_s = download_timeout_s
+        self.timeout_s = timeout_s
+        self._executor = None
+        self._pending = {}  # Session: FetchTicket
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="fetch")
+            return self._executor
+
+    async def fetch(self, session_id=None, item=None, image_url=None):
+        """
+        Fetches the image of a sample item (scraped if it has a scraping config) or of image_url.
+        Returns (image array, image URL), raises FetchCancelled, FetchTimeout or ImageSourceError.
+        """
+        return await self._run(session_id, lambda ticket, executor: self._fetch(ticket, executor, item, image_url))
+
+    async def fetch_many(self, session_id, item, count):
+        """
+        Fetches count images of a sample item concurrently (e.g. a random source's images to breed) under one
+        deadline and cancellation. Returns a list of (image array, image URL), the first failure abandons the others.
+        """
+        async def fetch_all(ticket, executor):
+            tasks = [asyncio.ensure_future(self._fetch(ticket, executor, item, None)) for _ in range(count)]
+            try:
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            except asyncio.CancelledError:
+                for task in tasks:
+                    task.cancel()
+                raise
+            failed = next((task for task in tasks if task.done() and task.exception() is not None), None)
+            if failed is None:
+                return [task.result() for task in tasks]
+            ticket.cancel("another image of the fetch failed")
+            await asyncio.gather(*tasks, return_exceptions=True)  # Retrieved, so asyncio doesn't log them
+            raise failed.exception()
+
+        return await self._run(session_id, fetch_all)
+
+    async def _run(self, session_id, fetch):
+        ticket = FetchTicket(self.timeout_s)
+        self._begin(session_id, ticket)
+        outcome = "error"
+        try:
+            result = await fetch(ticket, self._get_executor())
+            outcome = "ok"
+            return result
+        except FetchCancelled:
+            outcome = "cancelled"
+            raise
+        except FetchTimeout:
+            outcome = "timeout"
+            raise
+        finally:
+            fetch_outcomes.inc(outcome=outcome)
+            self._end(session_id, ticket)
+
+    async def _fetch(self, ticket, executor, item, image_url):
+        # Random sources return a new image on every request, only the others are shared with concurrent fetches
+        coalesce = not (item is not None and item.get("multiple"))
+        if item is not None:
+            if item.get("scraping"):
+                image_url = await ticket.run_step(executor, "scrape", self.scrape_timeout_s, self._scrape, item,
+                                                  min(self.scrape_timeout_s, ticket.remaining()), coalesce,
+                                                  ticket.check)
+            else:
+                image_url = item.get("image_url") or item.get("source_url")
+        img = await ticket.run_step(
+            executor, "download", self.download_timeout_s, load_image_source, image_url,
+            timeout=self.download_timeout_s, cancel_check=ticket.check, coalesce=coalesce)
+        return img, image_url
+
+    @staticmethod
+    def _scrape(item, timeout_s, coalesce, cancel_check):
+        from src.image_updater import get_image_url_from_item  # Lazy import, pulls in Requests
+
+        if not coalesce:
+            return get_image_url_from_item(item, timeout=timeout_s)
+        return download_flights.do(
+            ("scrape", item["source_url"]), lambda check: get_image_url_from_item(item, timeout=timeout_s),
+            cancel_check, stage="scrape")
+
+    def _begin(self, session_id, ticket):
+        if session_id is None:
+            return
+        with self._lock:
+            previous = self._pending.get(session_id)
+            self._pending[session_id] = ticket
+        if previous is not None:
+            previous.cancel("superseded by a newer image request")
+
+    def _end(self, session_id, ticket):
+        with self._lock:
+            if session_id is not None and self._pending.get(session_id) is ticket:
+                del self._pending[session_id]
+
+    def cancel(self, session_id, reason="session closed"):
+        """Cancels the session's pending fetch, if any (on disconnect)."""
+        with self._lock:
+            ticket = self._pending.pop(session_id, None)
+        if ticket is not None:
+            ticket.cancel(reason)
+
+    def stats(self):
+        with self._lock:
+            return {"pending": len(self._pending)}
+
+
+image_fetcher = ImageFetcher()
+metrics.gauge("shredder_pending_fetches", "UI image fetches in flight.", lambda: image_fetcher.stats()["pending"])
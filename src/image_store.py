@@ -0,0 +1,138 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from src.config import IMAGE_STORE_BUDGET_BYTES
+from src.metrics import metrics, cache_lookups
+
+
+def root_array(array):
+    """The outermost ndarray of a view chain, the array whose allocation (or mapped buffer) the view reads."""
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array
+
+
+def _read_only_buffer(buffer):
+    try:
+        with memoryview(buffer) as view:
+            return view.readonly
+    except (TypeError, ValueError):  # No buffer protocol, or a closed mmap
+        return False
+
+
+class ImageStore:
+    """
+    Process-wide store of decoded images keyed by content hash.
+    Every image is held once as a read-only array, sessions keep only the key (a short hex string).
+    Least recently used images are evicted when the memory budget is exceeded.
+    """
+
+    def __init__(self, budget_bytes=IMAGE_STORE_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self._images = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def content_hash(img):
+        """Hash of the array's shape, dtype and pixel data."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{img.shape}|{img.dtype.str}".encode())
+        digest.update(memoryview(np.ascontiguousarray(img)).cast('B'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def read_only(img):
+        """
+        The image with no writable path to its memory: an array owning its data is marked read-only in place (the
+        caller's array too), a view is copied unless its bases are read-only already and its memory is owned by an
+        array or a read-only buffer (bytes, a read-only mmap such as np.load(mmap_mode='r')'s).
+        """
+        if img.base is None:
+            img.setflags(write=False)
+            return img
+        base = img
+        while isinstance(base, np.ndarray):
+            if base.flags.writeable:
+                break
+            base = base.base
+        if base is None or _read_only_buffer(base):
+            return img
+        frozen = img.copy()
+        frozen.setflags(write=False)
+        return frozen
+
+    def put(self, img):
+        """Stores the image (deduplicated by content) and returns its key."""
+        key = self.content_hash(img)
+        with self._lock:
+            if key in self._images:
+                self._images.move_to_end(key)
+                return key
+
+            read_only = self.read_only(img).view()
+            self._images[key] = read_only
+            self._nbytes += read_only.nbytes
+            self._evict_over_budget()
+        return key
+
+    def get(self, key):
+        """Returns the read-only image for a key or None if it was never stored or has been evicted."""
+        if key is None:
+            return None
+        with self._lock:
+            img = self._images.get(key)
+            if img is None:
+                self.misses += 1
+                cache_lookups.inc(cache="image_store", result="miss")
+                return None
+            self._images.move_to_end(key)
+            self.hits += 1
+        cache_lookups.inc(cache="image_store", result="hit")
+        return img
+
+    def holds(self, array):
+        """True if the array's memory belongs to a stored image (pipelines don't count views of stored sources)."""
+        root = root_array(array)
+        with self._lock:
+            return any(root_array(img) is root for img in self._images.values())
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._images
+
+    def __len__(self):
+        with self._lock:
+            return len(self._images)
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def stats(self):
+        with self._lock:
+            return {
+                "images": len(self._images),
+                "bytes": self._nbytes,
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _evict_over_budget(self):
+        # The most recent image is always kept, even if it alone exceeds the budget
+        while self._nbytes > self.budget_bytes and len(self._images) > 1:
+            _, evicted = self._images.popitem(last=False)
+            self._nbytes -= evicted.nbytes
+            self.evictions += 1
+
+
+image_store = ImageStore()
+metrics.gauge("shredder_image_store_bytes", "Bytes of decoded images held by the image store.", lambda: image_store.nbytes)
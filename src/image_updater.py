@@ -2,11 +2,12 @@ import os
 import re
 
 import requests
-import gradio as gr
 
 from urllib.parse import urljoin
 
-from src.config import DEFAULT_ERROR_DURATION
+from src.config import DEFAULT_ERROR_DURATION, SCRAPE_TIMEOUT_S
+from src.metrics import metrics, fetched_bytes
+from src.downloads import host_limiter
 from .sample_image_metadata import SAMPLE_IMAGES_DATA
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -32,10 +33,10 @@ session.headers.update({
 })
 
 
-def get_image_url_from_item(item):
+def get_image_url_from_item(item, timeout=SCRAPE_TIMEOUT_S):
     """
     Get the final image URL for an item.
-    If item has scraping config, scrape fresh URL from source_url.
+    If item has scraping config, scrape fresh URL from source_url (page request timeout in seconds).
     Otherwise, return the static image_url.
 
     Returns:
@@ -48,7 +49,8 @@ def get_image_url_from_item(item):
 
     if has_scraping:
         print(f"Info: Scraping fresh URL for '{item['name']}' from {item['source_url']}")
-        return _fetch_image_url_with_regex(item['source_url'], scraping_config)
+        with metrics.span("scrape"):
+            return _fetch_image_url_with_regex(item['source_url'], scraping_config, timeout=timeout)
     else:
         image_url = item.get('image_url')
         if image_url:
@@ -59,7 +61,7 @@ def get_image_url_from_item(item):
             return None
 
 
-def _fetch_image_url_with_regex(source_url, scraping_config, gr=None):
+def _fetch_image_url_with_regex(source_url, scraping_config, gr=None, timeout=SCRAPE_TIMEOUT_S):
     """
     Fetches image URL using regex patterns from scraping config.
 
@@ -74,7 +76,9 @@ def _fetch_image_url_with_regex(source_url, scraping_config, gr=None):
         str or None: The extracted/transformed image URL, or None if failed
     """
     try:
-        response = session.get(source_url, timeout=15)
+        with host_limiter.slot(source_url):
+            response = session.get(source_url, timeout=timeout)
+        fetched_bytes.inc(len(response.content), kind="page")
         response.raise_for_status()
 
         print(f"Info: Response status code for {source_url}: {response.status_code}")
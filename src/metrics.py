@@ -0,0 +1,336 @@
+"""
+Runtime metrics: per-stage spans, counters and histograms.
+Exported as Prometheus text (start_metrics_server, local port) and as one structured JSON log line per request.
+Standard library only, cheap enough to stay enabled (a span is two perf_counter calls and a locked dict update).
+"""
+import json
+import inspect
+import functools
+import time
+import bisect
+import datetime
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from src.config import METRICS_LOG_REQUESTS
+
+# Seconds, upper bounds of the duration histograms
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+MEGAPIXEL_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 33, 66)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {_format_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}  # label key: [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in series_items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_number(float(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_number(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Gauge read from a callback at export time (e.g. cache sizes)."""
+
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def exposition(self):
+        try:
+            value = self.read()
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {_format_number(value)}"]
+
+
+class RequestTrace:
+    """Spans and attributes of a single request (one UI event handler call)."""
+
+    def __init__(self, handler, session_id=None):
+        self.handler = handler
+        self.session_id = session_id
+        self.started = time.perf_counter()
+        self.timestamp = datetime.datetime.now().isoformat(timespec="milliseconds")
+        self.spans = []  # (stage, seconds) in completion order
+        self.attributes = {}
+        self.duration = None
+        self.error = None
+
+    def stage_totals(self):
+        totals = {}
+        for stage, seconds in self.spans:
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        return totals
+
+    def as_dict(self):
+        return {
+            "ts": self.timestamp,
+            "event": "request",
+            "handler": self.handler,
+            "session": self.session_id,
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "stages_ms": {stage: round(seconds * 1000, 3) for stage, seconds in self.stage_totals().items()},
+            **self.attributes,
+            **({"error": self.error} if self.error else {}),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self, log_requests=METRICS_LOG_REQUESTS):
+        self.log_requests = log_requests
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._trace = contextvars.ContextVar("shredder_request_trace", default=None)
+        self._last_traces = {}
+
+        self.stage_seconds = self.histogram("shredder_stage_seconds", "Duration of a pipeline stage in seconds.")
+        self.request_seconds = self.histogram("shredder_request_seconds", "Duration of a UI request in seconds.")
+        self.requests = self.counter("shredder_requests_total", "UI requests by handler and outcome.")
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text):
+        return self._register(Counter(name, help_text))
+
+    def histogram(self, name, help_text, buckets=DURATION_BUCKETS):
+        return self._register(Histogram(name, help_text, buckets))
+
+    def gauge(self, name, help_text, read):
+        return self._register(Gauge(name, help_text, read))
+
+    # --------------------------------* Tracing *--------------------------------
+
+    def current_trace(self):
+        return self._trace.get()
+
+    @contextmanager
+    def request(self, handler, session_id=None):
+        """
+        Traces a UI request: spans recorded inside are attached to it, on exit its duration is recorded,
+        a structured log line is printed and it becomes the session's last request. Nested calls join the outer trace.
+        """
+        trace = self._trace.get()
+        if trace is not None:
+            yield trace
+            return
+        trace = RequestTrace(handler, session_id)
+        token = self._trace.set(trace)
+        outcome = "ok"
+        try:
+            yield trace
+        except BaseException as e:
+            outcome = "cancelled" if type(e).__name__ == "RenderCancelled" else "error"
+            trace.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._trace.reset(token)
+            trace.duration = time.perf_counter() - trace.started
+            outcome = trace.attributes.setdefault("outcome", outcome)  # Handlers may annotate e.g. a dropped render
+            self.request_seconds.observe(trace.duration, handler=handler)
+            self.requests.inc(handler=handler, outcome=outcome)
+            with self._lock:
+                self._last_traces[session_id] = trace
+                while len(self._last_traces) > 256:
+                    self._last_traces.pop(next(iter(self._last_traces)))
+            if self.log_requests:
+                print(json.dumps(trace.as_dict(), default=str))
+
+    @contextmanager
+    def span(self, stage):
+        """Times a stage, recorded in the stage histogram and the current request trace."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stage_seconds.observe(elapsed, stage=stage)
+            trace = self._trace.get()
+            if trace is not None:
+                trace.spans.append((stage, elapsed))
+
+    def annotate(self, **attributes):
+        """Adds attributes (e.g. image size, cache hit) to the current request trace, if any."""
+        trace = self._trace.get()
+        if trace is not None:
+            trace.attributes.update(attributes)
+
+    def last_trace(self, session_id=None):
+        with self._lock:
+            return self._last_traces.get(session_id)
+
+    # --------------------------------* Export *--------------------------------
+
+    def render_prometheus(self):
+        """Prometheus text exposition format (version 0.0.4) of all registered metrics."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.exposition())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+fetched_bytes = metrics.counter("shredder_fetched_bytes_total", "Bytes downloaded from image and scraping URLs.")
+decoded_images = metrics.counter("shredder_decoded_images_total", "Decoded source images by source kind.")
+image_megapixels = metrics.histogram(
+    "shredder_image_megapixels", "Decoded source image size in megapixels.", MEGAPIXEL_BUCKETS)
+cache_lookups = metrics.counter("shredder_cache_lookups_total", "Cache lookups by cache and result (hit or miss).")
+
+
+def record_decoded_image(img, kind):
+    """Counts a decoded source image and its dimensions."""
+    decoded_images.inc(kind=kind)
+    image_megapixels.observe(img.shape[0] * img.shape[1] / 1e6)
+    metrics.annotate(image_width=int(img.shape[1]), image_height=int(img.shape[0]))
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """
+    Serves GET /metrics (Prometheus text) on a local port from a daemon thread.
+    Returns the server, or None if the port is taken.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes would flood the console
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        print(f"⚠️ Metrics endpoint not started on {host}:{port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"📊 Prometheus metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def _session_id(args, kwargs):
+    return next((value.session_hash for value in (*args, *kwargs.values()) if hasattr(value, "session_hash")), None)
+
+
+def traced_request(handler):
+    """
+    Decorator tracing a UI event handler (plain or async) as a request, the session is taken from a gr.Request
+    argument if present. The wrapped signature is kept, so Gradio still injects gr.Request.
+    """
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with metrics.request(handler, _session_id(args, kwargs)):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with metrics.request(handler, _session_id(args, kwargs)):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def format_trace_markdown(trace):
+    """Markdown breakdown of a request trace for the UI debug panel."""
+    if trace is None:
+        return "No requests recorded for this session yet."
+    total_ms = (trace.duration or 0) * 1000
+    lines = [
+        f"**{trace.handler}** at {trace.timestamp}: **{total_ms:.1f} ms** ({trace.attributes.get('outcome', 'running')})",
+        "",
+    ]
+    stage_totals = trace.stage_totals()
+    if stage_totals:
+        lines += ["| Stage | ms | Share |", "|---|---:|---:|"]
+    else:
+        lines.append("No stages ran.")
+    for stage, seconds in stage_totals.items():
+        share = seconds * 1000 / total_ms if total_ms else 0
+        lines.append(f"| {stage} | {seconds * 1000:.1f} | {share:.0%} |")
+    attributes = {k: v for k, v in trace.attributes.items() if k != "outcome"}
+    if attributes:
+        lines += ["", ", ".join(f"{k}: `{v}`" for k, v in attributes.items())]
+    if trace.error:
+        lines += ["", f"Error: `{trace.error}`"]
+    return "\n".join(lines)
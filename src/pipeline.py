@@ -0,0 +1,272 @@
+import threading
+from collections import OrderedDict, ChainMap
+from dataclasses import asdict
+
+import numpy as np
+
+from src.shredder import shred_image_iterated
+from src.metrics import metrics
+from src.core import (
+    pad_image_to_fit_chunks, apply_color_effect, apply_guidelines, compose_shred_view, encode_view_png
+)
+from src.admission import render_budget
+from src.image_store import image_store, root_array
+from src.config import PIPELINE_MAX_SESSIONS, PIPELINE_BUDGET_BYTES
+
+
+class Stage:
+    """
+    A single pipeline stage. `depends_on` lists the render parameters the stage reads
+    (ShredParams fields, image_key, image_url), `inputs` the stages whose results it reads, and
+    `run(results, params)` gets the results of the previous stages and all render parameters.
+    Only `retain` stages keep their result between runs, the others are recomputed when a later stage needs them.
+    """
+
+    def __init__(self, name, depends_on, run, inputs=(), retain=False):
+        self.name = name
+        self.depends_on = tuple(depends_on)
+        self.run = run
+        self.inputs = tuple(inputs)
+        self.retain = retain
+
+
+def _decode(results, params):
+    return params["load_image"]()
+
+
+def _pad(results, params):
+    return pad_image_to_fit_chunks(
+        results["decode"], params["chunk_w"], params["chunk_h"], params["strip_widths"], params["strip_heights"])
+
+
+def _effects(results, params):
+    return apply_color_effect(
+        results["pad"], params["color_effects"], params["brightness_offset"], params["contrast_factor"])
+
+
+def _shred(results, params):
+    return shred_image_iterated(
+        results["effects"], params["chunk_w"], params["chunk_h"], params["iterations"],
+        params["strip_widths"], params["strip_heights"]
+    )
+
+
+def _guidelines(results, params):
+    vertical_shred, final_shred = results["shred"]
+    return apply_guidelines(
+        vertical_shred, final_shred, params["chunk_w"], params["chunk_h"],
+        params["show_guidelines"], params["guideline_color_rgb"], params["strip_widths"], params["strip_heights"]
+    )
+
+
+def _compose(results, params):
+    display_vertical_shred, display_final_shred = results["guidelines"]
+    return compose_shred_view(
+        results["pad"], display_vertical_shred, display_final_shred,
+        params["color_effects"], params["brightness_offset"], params["contrast_factor"],
+        params["output_image_width"], params["image_url"]
+    )
+
+
+def _encode(results, params):
+    return encode_view_png(results["compose"])
+
+
+# Stages run in order, each one consumes the results of the stages before it. Effects and shred are the costly
+# ones to recompute, decode is a store lookup and pad a copy at most: only their results are kept between runs
+PIPELINE_STAGES = (
+    Stage("decode", ("image_key",), _decode),
+    Stage("pad", ("chunk_w", "chunk_h", "strip_widths", "strip_heights"), _pad, inputs=("decode",)),
+    Stage("effects", ("color_effects", "brightness_offset", "contrast_factor"), _effects, inputs=("pad",),
+          retain=True),
+    Stage("shred", ("chunk_w", "chunk_h", "iterations", "strip_widths", "strip_heights"), _shred,
+          inputs=("effects",), retain=True),
+    Stage("guidelines", ("show_guidelines", "guideline_color_rgb", "chunk_w", "chunk_h",
+                         "strip_widths", "strip_heights"), _guidelines, inputs=("shred",)),
+    Stage("compose", ("color_effects", "brightness_offset", "contrast_factor", "output_image_width", "image_url"),
+          _compose, inputs=("pad", "guidelines")),
+    Stage("encode", (), _encode, inputs=("compose",)),
+)
+
+
+def _freeze(value):
+    """Hashable, comparable form of a parameter value (lists and arrays become tuples)."""
+    if isinstance(value, np.ndarray):
+        return tuple(value.tolist())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _arrays(result):
+    if isinstance(result, np.ndarray):
+        yield result
+    elif isinstance(result, (list, tuple)):
+        for item in result:
+            yield from _arrays(item)
+
+
+def owned_nbytes(results, store=image_store):
+    """
+    Bytes of the allocations the results' arrays read: every array counts its root array once, whatever views of it
+    the results hold (e.g. _take_columns' reinterpreted gather). Roots held by the image store are counted there.
+    """
+    roots = {}
+    for result in results:
+        for array in _arrays(result):
+            root = root_array(array)
+            roots[id(root)] = root
+    return sum(root.nbytes for root in roots.values() if not store.holds(root))
+
+
+class IncrementalPipeline:
+    """
+    Runs PIPELINE_STAGES keeping the last result of every retained stage.
+    A stage is recomputed only if one of its parameters changed or the stage before it was recomputed,
+    e.g. a guideline color change reruns guidelines, compose and encode (and pad, which compose reads) only.
+    on_retain(delta) is called when the bytes of the kept results change.
+    """
+
+    def __init__(self, stages=PIPELINE_STAGES, on_retain=None):
+        self.stages = stages
+        self.on_retain = on_retain
+        self._results = {}
+        self._signatures = {}
+        self._revisions = {}
+        self._lock = threading.Lock()
+        self.retained_bytes = 0
+        self.last_recomputed = []
+
+    def run(self, params, image_key, load_image, image_url=None, cancel_check=None):
+        """
+        Runs the pipeline for the given ShredParams and returns the result of the last stage (PNG bytes).
+        load_image is a callable returning the decoded image of image_key, called when a stage reading it reruns.
+        cancel_check is called with the stage name before every recomputed stage.
+        """
+        params = dict(asdict(params), image_key=image_key, image_url=image_url, load_image=load_image)
+        with self._lock:
+            plan = []
+            previous_revision = None
+            for stage in self.stages:
+                signature = (previous_revision, tuple(_freeze(params[name]) for name in stage.depends_on))
+                stale = self._signatures.get(stage.name) != signature
+                plan.append((stage, signature, stale))
+                previous_revision = self._revisions.get(stage.name, 0) + 1 if stale else self._revisions[stage.name]
+            # Stale stages, the output and the results they read that weren't kept
+            needed = {stage.name for stage, _, stale in plan if stale} | {self.stages[-1].name}
+            for stage, _, _ in reversed(plan):
+                if stage.name in needed:
+                    needed.update(name for name in stage.inputs if name not in self._results)
+
+            run_results = {}  # Results of the stages that aren't kept, dropped with the run
+            results = ChainMap(run_results, self._results)
+            recomputed = []
+            try:
+                for stage, signature, stale in plan:
+                    if stage.name not in needed:
+                        continue
+                    if cancel_check is not None:
+                        cancel_check(stage.name)
+                    with metrics.span(stage.name):
+                        result = stage.run(results, params)
+                    if stage.retain:
+                        self._results[stage.name] = result
+                    else:
+                        run_results[stage.name] = result
+                    if stale:
+                        self._signatures[stage.name] = signature
+                        self._revisions[stage.name] = self._revisions.get(stage.name, 0) + 1
+                    recomputed.append(stage.name)
+                self.last_recomputed = recomputed
+                return results[self.stages[-1].name]
+            finally:
+                self._update_retained()
+
+    def _update_retained(self):
+        retained_bytes = owned_nbytes(self._results.values())
+        delta, self.retained_bytes = retained_bytes - self.retained_bytes, retained_bytes
+        if delta and self.on_retain is not None:
+            self.on_retain(delta)
+
+    def clear(self, blocking=True):
+        """Drops the kept results (the next run recomputes everything), False if the pipeline is busy."""
+        if not self._lock.acquire(blocking=blocking):
+            return False
+        try:
+            self._results.clear()
+            self._signatures.clear()
+            self._revisions.clear()
+            self._update_retained()
+            return True
+        finally:
+            self._lock.release()
+
+
+class SessionPipelines:
+    """
+    Per-session IncrementalPipeline registry. The least recently used sessions are dropped over the session limit or
+    when their kept results exceed the byte budget. Kept bytes are reserved in the render memory budget, which
+    reclaims them from idle sessions when a render needs the room.
+    """
+
+    def __init__(self, max_sessions=PIPELINE_MAX_SESSIONS, budget_bytes=PIPELINE_BUDGET_BYTES, memory_budget=render_budget):
+        self.max_sessions = max_sessions
+        self.budget_bytes = budget_bytes
+        self.memory_budget = memory_budget
+        self._pipelines = OrderedDict()
+        self._lock = threading.Lock()
+        self._nbytes = 0
+        self.evictions = 0
+        memory_budget.add_reclaimer(self.reclaim)
+
+    def get(self, session_id):
+        with self._lock:
+            pipeline = self._pipelines.get(session_id)
+            if pipeline is None:
+                pipeline = self._pipelines[session_id] = IncrementalPipeline(on_retain=self._retained)
+            self._pipelines.move_to_end(session_id)
+            dropped = []
+            while len(self._pipelines) > self.max_sessions:
+                dropped.append(self._pipelines.popitem(last=False)[1])
+        for old in dropped:
+            old.clear()
+        return pipeline
+
+    def _retained(self, delta):
+        with self._lock:
+            self._nbytes += delta
+            over_budget = self._nbytes > self.budget_bytes
+        self.memory_budget.retain(delta)
+        if over_budget:
+            self.reclaim(self._nbytes - self.budget_bytes)
+
+    def reclaim(self, nbytes):
+        """Drops the kept results of the least recently used idle sessions until nbytes are freed, returns the bytes."""
+        with self._lock:
+            pipelines = list(self._pipelines.values())
+        freed = 0
+        for pipeline in pipelines:
+            if freed >= nbytes:
+                break
+            retained_bytes = pipeline.retained_bytes
+            if retained_bytes and pipeline.clear(blocking=False):  # A running pipeline keeps its results
+                freed += retained_bytes
+                with self._lock:
+                    self.evictions += 1
+        return freed
+
+    def forget(self, session_id):
+        with self._lock:
+            pipeline = self._pipelines.pop(session_id, None)
+        if pipeline is not None:
+            pipeline.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._pipelines), "bytes": self._nbytes, "budget_bytes": self.budget_bytes,
+                    "evictions": self.evictions}
+
+
+session_pipelines = SessionPipelines()
+metrics.gauge("shredder_pipeline_bytes", "Bytes of stage results kept by session pipelines.",
+              lambda: session_pipelines.stats()["bytes"])
@@ -0,0 +1,170 @@
+"""
+Streaming PNG encoder: the image comes in as row bands, scanlines are filtered and compressed incrementally
+(zlib compressobj) and written out as IDAT chunks, so memory stays at O(band) whatever the image height.
+Output goes to any object with a write() method (file, socket file, BytesIO), iter_png_bytes yields it instead.
+"""
+import zlib
+import struct
+
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_FILTERS = {"none": 0, "sub": 1, "up": 2, "paeth": 4}
+DEFAULT_PNG_FILTER = "up"
+IDAT_CHUNK_BYTES = 256 * 1024  # Compressed bytes gathered before an IDAT chunk is written
+_COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}  # Channels: gray, gray + alpha, RGB, RGBA
+
+
+def png_chunk(chunk_type, data):
+    """Length, type, data and CRC of a PNG chunk."""
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def _paeth(left, up, up_left):
+    p = left + up - up_left
+    pa, pb, pc = np.abs(p - left), np.abs(p - up), np.abs(p - up_left)
+    return np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, up_left))
+
+
+def filter_scanlines(band, previous_row, filter_type):
+    """
+    Filtered scanlines of an (H, W, C) uint8 band, each prefixed with its filter type byte.
+    previous_row is the row above the band (None at the top of the image). Encoder filters only read the
+    unfiltered bytes, so every row of the band is filtered at once.
+    """
+    h = band.shape[0]
+    rows = band.reshape(h, -1)
+    channels = band.shape[2]
+    code = PNG_FILTERS[filter_type]
+    if code == 0:
+        filtered = rows
+    else:
+        x = rows.astype(np.int16)
+        above = np.empty_like(x)
+        above[0] = 0 if previous_row is None else previous_row.reshape(-1)
+        above[1:] = x[:-1]
+        left = np.zeros_like(x)
+        left[:, channels:] = x[:, :-channels]
+        if code == 1:
+            prediction = left
+        elif code == 2:
+            prediction = above
+        else:
+            up_left = np.zeros_like(x)
+            up_left[:, channels:] = above[:, :-channels]
+            prediction = _paeth(left, above, up_left)
+        filtered = (x - prediction).astype(np.uint8)  # Modulo 256
+    out = np.empty((h, rows.shape[1] + 1), dtype=np.uint8)
+    out[:, 0] = code
+    out[:, 1:] = filtered
+    return out
+
+
+class PngStreamWriter:
+    """
+    Writes a width x height PNG band by band: write_band((h, W, C) uint8) in top to bottom order, then close().
+    The header is written with the first band (its channel count sets the color type: 1 gray, 3 RGB, 2/4 alpha).
+    """
+
+    def __init__(self, fileobj, width, height, compress_level=6, filter_type=DEFAULT_PNG_FILTER):
+        if filter_type not in PNG_FILTERS:
+            raise ValueError(f"Unknown PNG filter '{filter_type}', expected one of: {', '.join(PNG_FILTERS)}.")
+        self.fileobj = fileobj
+        self.width, self.height = int(width), int(height)
+        self.filter_type = filter_type
+        self.channels = None
+        self.rows_written = 0
+        self.bytes_written = 0
+        self._compressor = zlib.compressobj(compress_level)
+        self._pending = []
+        self._pending_bytes = 0
+        self._previous_row = None
+
+    def _write(self, data):
+        self.fileobj.write(data)
+        self.bytes_written += len(data)
+
+    def _start(self, channels):
+        if channels not in _COLOR_TYPES:
+            raise ValueError(f"PNG bands must have 1 to 4 channels, got {channels}.")
+        self.channels = channels
+        header = struct.pack(">IIBBBBB", self.width, self.height, 8, _COLOR_TYPES[channels], 0, 0, 0)
+        self._write(PNG_SIGNATURE + png_chunk(b"IHDR", header))
+
+    def write_band(self, band):
+        band = np.asarray(band)
+        if band.ndim == 2:
+            band = band[..., None]
+        if band.dtype != np.uint8 or band.shape[1] != self.width:
+            raise ValueError(f"PNG bands must be uint8 and {self.width} px wide, got {band.dtype} {band.shape}.")
+        if self.channels is None:
+            self._start(band.shape[2])
+        elif band.shape[2] != self.channels:
+            raise ValueError(f"Band has {band.shape[2]} channels, the image has {self.channels}.")
+        if self.rows_written + band.shape[0] > self.height:
+            raise ValueError(f"Bands exceed the image height of {self.height} px.")
+        if not band.shape[0]:
+            return
+        scanlines = filter_scanlines(band, self._previous_row, self.filter_type)
+        self._previous_row = band[-1].copy()
+        self.rows_written += band.shape[0]
+        self._add_compressed(self._compressor.compress(scanlines))
+
+    def _add_compressed(self, data):
+        if data:
+            self._pending.append(data)
+            self._pending_bytes += len(data)
+        if self._pending_bytes >= IDAT_CHUNK_BYTES:
+            self._flush_idat()
+
+    def _flush_idat(self):
+        if self._pending:
+            self._write(png_chunk(b"IDAT", b"".join(self._pending)))
+            self._pending, self._pending_bytes = [], 0
+
+    def close(self):
+        """Finishes the image, raises if fewer rows than its height were written."""
+        if self.rows_written != self.height:
+            raise ValueError(f"Only {self.rows_written} of {self.height} rows were written.")
+        self._add_compressed(self._compressor.flush())
+        self._flush_idat()
+        self._write(png_chunk(b"IEND", b""))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+
+
+def write_png_bands(fileobj, bands, width, height, **kwargs):
+    """Writes an iterator of row bands as a PNG to fileobj, returns the number of bytes written."""
+    writer = PngStreamWriter(fileobj, width, height, **kwargs)
+    with writer:
+        for band in bands:
+            writer.write_band(band)
+    return writer.bytes_written
+
+
+class _ChunkBuffer:
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(data)
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+def iter_png_bytes(bands, width, height, **kwargs):
+    """Yields the encoded PNG as byte chunks while the bands are consumed, e.g. for a streaming HTTP response."""
+    buffer = _ChunkBuffer()
+    writer = PngStreamWriter(buffer, width, height, **kwargs)
+    for band in bands:
+        writer.write_band(band)
+        yield from buffer.drain()
+    writer.close()
+    yield from buffer.drain()
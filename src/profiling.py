@@ -0,0 +1,355 @@
+"""
+Opt-in request profiling: a sampled share of requests (IMAGE_SHREDDER_PROFILE_RATE) runs under cProfile, or under
+pyinstrument's sampling profiler when it is installed. Each profiled request is saved to PROFILE_DIR as a pstats file
+and a JSON sidecar with the handler, its parameters, the image shape and the stage breakdown of its trace.
+Profilers only see the request's thread, renders in worker processes (render backend "process") show up as waits.
+One request is profiled at a time per process: profiles of overlapping requests would mix (the async handlers share
+the event loop thread), and cProfile on Python 3.12+ is process-wide. Sampled requests overlapping it run unprofiled.
+
+    python -m src.profiling aggregate profiles/ --handler redraw
+    python -m src.profiling diff before/ after/ --limit 20
+"""
+import os
+import sys
+import json
+import glob
+import time
+import random
+import pstats
+import inspect
+import importlib.util
+import argparse
+import functools
+import itertools
+import threading
+
+from src.metrics import metrics
+from src.config import PROFILE_RATE, PROFILE_DIR, PROFILER, PROFILERS, PROFILE_MAX_FILES
+
+PROFILE_SUFFIX = ".prof"
+META_SUFFIX = ".json"
+SORT_KEYS = ("cumulative", "tottime", "calls")
+
+
+def _pyinstrument_available():
+    return importlib.util.find_spec("pyinstrument") is not None
+
+
+class _CProfileRun:
+    name = "cprofile"
+
+    def __init__(self):
+        import cProfile
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+
+    def save(self, path):
+        self._profile.dump_stats(path)
+
+
+class _PyinstrumentRun:
+    name = "pyinstrument"
+
+    def __init__(self, async_mode="disabled"):
+        from pyinstrument import Profiler
+        self._profiler = Profiler(async_mode=async_mode)
+        self._profiler.start()
+        self._session = None
+
+    def stop(self):
+        self._session = self._profiler.stop()
+
+    def save(self, path):
+        from pyinstrument.renderers import PstatsRenderer
+        with open(path, "wb") as f:
+            f.write(PstatsRenderer().render(self._session))
+
+
+class RequestProfiler:
+    """Samples requests to profile and saves their profiles, thread safe (one profiled request at a time)."""
+
+    def __init__(self, rate=PROFILE_RATE, directory=PROFILE_DIR, profiler=PROFILER, max_files=PROFILE_MAX_FILES):
+        if profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{profiler}', expected one of: {', '.join(PROFILERS)}.")
+        self.rate = rate
+        self.directory = directory
+        self.profiler = profiler
+        self.max_files = max_files
+        self._random = random.Random()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._active = threading.Lock()  # Held by the request being profiled
+        self.saved = 0
+        self.skipped = 0
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def configure(self, rate=None, directory=None, profiler=None):
+        """Changes the sampling rate, output directory or profiler at runtime."""
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{profiler}', expected one of: {', '.join(PROFILERS)}.")
+        with self._lock:
+            self.rate = self.rate if rate is None else rate
+            self.directory = directory or self.directory
+            self.profiler = profiler or self.profiler
+
+    def should_profile(self):
+        if self.rate <= 0:
+            return False
+        with self._lock:
+            return self.rate >= 1 or self._random.random() < self.rate
+
+    def _start(self, async_mode="disabled"):
+        if self.profiler != "cprofile" and _pyinstrument_available():
+            return _PyinstrumentRun(async_mode)
+        if self.profiler == "pyinstrument":
+            print("Warning: pyinstrument is not installed, profiling with cProfile instead.")
+            self.profiler = "cprofile"
+        return _CProfileRun()
+
+    def _begin(self, async_mode="disabled"):
+        """Starts profiling a request, None when another one is being profiled or the profiler fails to start."""
+        if not self._active.acquire(blocking=False):
+            with self._lock:
+                self.skipped += 1
+            return None
+        try:
+            return self._start(async_mode)
+        except Exception as e:  # E.g. another profiling tool is active, profiling never fails a request
+            self._active.release()
+            print(f"Warning: Profiler failed to start, request not profiled: {e}")
+            return None
+
+    def run(self, handler, params, fn, *args, **kwargs):
+        """Calls fn under the profiler and saves the profile, also when fn raises."""
+        run = self._begin()
+        if run is None:
+            return fn(*args, **kwargs)
+        started = time.perf_counter()
+        error = None
+        try:
+            return fn(*args, **kwargs)
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._finish(run, handler, params, time.perf_counter() - started, error)
+
+    async def run_async(self, handler, params, fn, *args, **kwargs):
+        """
+        Awaits fn under the profiler (see run). cProfile follows the event loop thread, so its profile also holds
+        whatever other tasks ran while fn was waiting (pyinstrument attributes the wait to the awaiting frame).
+        Work handed to threads only shows up as the wait.
+        """
+        run = self._begin(async_mode="enabled")
+        if run is None:
+            return await fn(*args, **kwargs)
+        started = time.perf_counter()
+        error = None
+        try:
+            return await fn(*args, **kwargs)
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._finish(run, handler, params, time.perf_counter() - started, error)
+
+    def _finish(self, run, handler, params, duration, error):
+        try:
+            run.stop()
+            path = self._save(run, handler, params, duration, error)
+            metrics.annotate(profile=os.path.basename(path))
+        except Exception as e:
+            print(f"Warning: Profile of '{handler}' not saved: {e}")
+        finally:
+            self._active.release()
+
+    def _save(self, run, handler, params, duration, error):
+        os.makedirs(self.directory, exist_ok=True)
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._counter):05d}-{handler}"
+        path = os.path.join(self.directory, stem + PROFILE_SUFFIX)
+        run.save(path)
+        trace = metrics.current_trace()
+        attributes = dict(trace.attributes) if trace is not None else {}
+        meta = {
+            "handler": handler,
+            "profiler": run.name,
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "duration_ms": round(duration * 1000, 3),
+            "image_shape": [attributes["image_height"], attributes["image_width"]]
+            if "image_height" in attributes else None,
+            "params": params,
+            "stages_ms": {stage: round(seconds * 1000, 3) for stage, seconds in trace.stage_totals().items()}
+            if trace is not None else {},
+            "attributes": attributes,
+            **({"error": error} if error else {}),
+        }
+        with open(os.path.join(self.directory, stem + META_SUFFIX), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2, default=str)
+        with self._lock:
+            self.saved += 1
+        self._prune()
+        return path
+
+    def _prune(self):
+        profiles = sorted(glob.glob(os.path.join(self.directory, "*" + PROFILE_SUFFIX)), key=os.path.getmtime)
+        for path in profiles[:max(0, len(profiles) - self.max_files)]:
+            for file_path in (path, path[:-len(PROFILE_SUFFIX)] + META_SUFFIX):
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    pass
+
+
+request_profiler = RequestProfiler()
+
+
+def profiled_request(handler):
+    """
+    Decorator profiling a sampled share of the calls of a UI event handler (see RequestProfiler).
+    Goes under traced_request, so the saved profile gets the trace's stages and attributes.
+    The wrapped signature is kept, so Gradio still injects gr.Request.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        def request_params(args, kwargs):
+            arguments = signature.bind_partial(*args, **kwargs).arguments
+            return {name: value for name, value in arguments.items() if not hasattr(value, "session_hash")}
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not request_profiler.should_profile():
+                    return await fn(*args, **kwargs)
+                return await request_profiler.run_async(handler, request_params(args, kwargs), fn, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not request_profiler.should_profile():
+                return fn(*args, **kwargs)
+            return request_profiler.run(handler, request_params(args, kwargs), fn, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --------------------------------* Aggregate and diff *--------------------------------
+
+def profile_files(paths, handler=None):
+    """Profile files of paths (files or directories), only those of handler if given (from their sidecar)."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*" + PROFILE_SUFFIX))))
+        else:
+            files.append(path)
+    if handler:
+        files = [f for f in files if (read_profile_meta(f) or {}).get("handler") == handler]
+    return files
+
+
+def read_profile_meta(profile_path):
+    """The JSON sidecar of a profile file, None if it has none."""
+    try:
+        with open(profile_path[:-len(PROFILE_SUFFIX)] + META_SUFFIX, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_stats(files):
+    """Merged pstats.Stats of profile files."""
+    if not files:
+        raise ValueError("No profiles found.")
+    return pstats.Stats(*files, stream=sys.stdout)
+
+
+def per_request_times(stats, requests):
+    """{function label: (tottime, cumtime)} in seconds per request."""
+    return {
+        pstats.func_std_string(func): (tottime / requests, cumtime / requests)
+        for func, (_, _, tottime, cumtime, _) in stats.stats.items()
+    }
+
+
+def summarize_requests(files):
+    """Request count, mean duration and mean stage times (ms) per handler, from the sidecars."""
+    summary = {}
+    for path in files:
+        meta = read_profile_meta(path) or {"handler": "unknown", "duration_ms": 0}
+        row = summary.setdefault(meta["handler"], {"count": 0, "duration_ms": 0.0, "stages_ms": {}})
+        row["count"] += 1
+        row["duration_ms"] += meta.get("duration_ms") or 0
+        for stage, ms in (meta.get("stages_ms") or {}).items():
+            row["stages_ms"][stage] = row["stages_ms"].get(stage, 0.0) + ms
+    for row in summary.values():
+        row["duration_ms"] /= row["count"]
+        row["stages_ms"] = {stage: ms / row["count"] for stage, ms in row["stages_ms"].items()}
+    return summary
+
+
+def print_request_summary(files):
+    for handler, row in sorted(summarize_requests(files).items()):
+        stages = ", ".join(f"{stage} {ms:.1f}" for stage, ms in row["stages_ms"].items())
+        print(f"{handler}: {row['count']} request(s), mean {row['duration_ms']:.1f} ms" + (f" ({stages})" if stages else ""))
+
+
+def aggregate(paths, handler=None, sort="cumulative", limit=30):
+    files = profile_files(paths, handler)
+    stats = load_stats(files)
+    print_request_summary(files)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+
+
+def diff(before_paths, after_paths, handler=None, sort="cumulative", limit=25):
+    """Prints the functions whose time per request changed most between two sets of profiles."""
+    before_files, after_files = profile_files(before_paths, handler), profile_files(after_paths, handler)
+    before = per_request_times(load_stats(before_files).strip_dirs(), len(before_files))
+    after = per_request_times(load_stats(after_files).strip_dirs(), len(after_files))
+    column = 0 if sort == "tottime" else 1
+    deltas = sorted(
+        ((label, before.get(label, (0, 0))[column], after.get(label, (0, 0))[column]) for label in before.keys() | after.keys()),
+        key=lambda row: abs(row[2] - row[1]), reverse=True
+    )
+    print("Before:")
+    print_request_summary(before_files)
+    print("After:")
+    print_request_summary(after_files)
+    print(f"\n{'before ms':>10}{'after ms':>10}{'delta ms':>10}  function ({'tottime' if column == 0 else 'cumtime'} per request)")
+    for label, before_s, after_s in deltas[:limit]:
+        print(f"{before_s * 1000:>10.2f}{after_s * 1000:>10.2f}{(after_s - before_s) * 1000:>+10.2f}  {label}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.profiling", description="Aggregate and diff saved request profiles")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    aggregate_parser = subparsers.add_parser("aggregate", help="Merged statistics of saved profiles")
+    aggregate_parser.add_argument("paths", nargs="+", help="Profile files or directories")
+    diff_parser = subparsers.add_parser("diff", help="Functions whose time per request changed the most")
+    diff_parser.add_argument("before", help="Profile file or directory")
+    diff_parser.add_argument("after", help="Profile file or directory")
+    for sub, sort_keys, default_limit in ((aggregate_parser, SORT_KEYS, 30), (diff_parser, SORT_KEYS[:2], 25)):
+        sub.add_argument("--handler", help="Only profiles of this handler, e.g. redraw or fetch")
+        sub.add_argument("--sort", choices=sort_keys, default="cumulative")
+        sub.add_argument("--limit", type=int, default=default_limit, help="Functions shown (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "aggregate":
+            aggregate(args.paths, args.handler, args.sort, args.limit)
+        else:
+            diff([args.before], [args.after], args.handler, args.sort, args.limit)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import os
+import time
+import atexit
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from dataclasses import replace
+
+from src.config import RENDER_CACHE_BUDGET_BYTES
+from src.metrics import metrics, cache_lookups
+
+RETIRED_FILE_GRACE_S = 60  # Files of evicted entries are kept this long, the UI copies them after serving
+
+
+def make_render_key(image_key, params, image_url=None):
+    """
+    Cache key of a render from validated ShredParams (already coerced, so a locked slider's '16' and 16
+    hit the same entry). Guideline color is ignored while guidelines are hidden.
+    """
+    if not params.show_guidelines:
+        params = replace(params, guideline_color_rgb=None)
+    return image_key, params, image_url
+
+
+class RenderCache:
+    """
+    Byte-budgeted LRU of encoded (PNG) render outputs with hit/miss counters.
+    path() writes an entry to a PNG file once, served by path so the UI doesn't decode and re-encode it on every hit.
+    """
+
+    def __init__(self, budget_bytes=RENDER_CACHE_BUDGET_BYTES, name="render"):
+        self.budget_bytes = budget_bytes
+        self.name = name  # Cache label of the lookup metrics
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._paths = {}  # Key: PNG file of the entry, written on the first path() call
+        self._retired = deque()  # (retired at, path) of files of evicted entries to delete after the grace period
+        self._dir = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                cache_lookups.inc(cache=self.name, result="miss")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        cache_lookups.inc(cache=self.name, result="hit")
+        return data
+
+    def put(self, key, data):
+        if len(data) > self.budget_bytes:
+            return
+        with self._lock:
+            now = time.monotonic()
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._nbytes -= len(previous)
+                self._retire(key, now)
+            self._entries[key] = data
+            self._nbytes += len(data)
+            while self._nbytes > self.budget_bytes:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self._nbytes -= len(evicted)
+                self._retire(evicted_key, now)
+                self.evictions += 1
+            self._purge(now)
+
+    def path(self, key):
+        """Path of the entry's PNG file (written on the first call), None if the key isn't cached."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                return None
+            path = self._paths.get(key)
+            if path is not None:
+                return path
+            if self._dir is None:
+                self._dir = tempfile.mkdtemp(prefix=f"shredder-{self.name}-cache-")
+                atexit.register(shutil.rmtree, self._dir, ignore_errors=True)
+            directory = self._dir
+        with tempfile.NamedTemporaryFile(dir=directory, prefix="shred-", suffix=".png", delete=False) as f:
+            f.write(data)
+        with self._lock:
+            if key in self._entries and key not in self._paths:
+                self._paths[key] = f.name
+                return f.name
+            # Evicted or written by a concurrent call meanwhile, this file is only served this once
+            self._retired.append((time.monotonic(), f.name))
+        return f.name
+
+    def _retire(self, key, now):
+        path = self._paths.pop(key, None)
+        if path is not None:
+            self._retired.append((now, path))
+
+    def _purge(self, now):
+        while self._retired and now - self._retired[0][0] >= RETIRED_FILE_GRACE_S:
+            _, path = self._retired.popleft()
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            now = time.monotonic()
+            for key in list(self._paths):
+                self._retire(key, now)
+            self._entries.clear()
+            self._nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "files": len(self._paths),
+                "bytes": self._nbytes,
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+render_cache = RenderCache()
+metrics.gauge("shredder_render_cache_bytes", "Bytes held by the render cache.", lambda: render_cache.stats()["bytes"])
@@ -0,0 +1,392 @@
+"""
+Process-pool render backend (IMAGE_SHREDDER_RENDER_BACKEND=process).
+Renders run in worker processes, so concurrent sessions are not serialized by the GIL.
+Source images are copied once into a shared memory segment per image key and attached by name in the workers,
+only the segment name, shape, dtype and ShredParams are pickled per render.
+Each render also gets a byte of a shared cancel flag segment: a superseded render stops at its worker's next stage
+check instead of keeping the worker busy. A render over the task timeout restarts the pool (its worker is hung).
+"""
+import os
+import time
+import atexit
+import threading
+from threading import BrokenBarrierError
+import multiprocessing
+from collections import OrderedDict
+from multiprocessing import shared_memory, resource_tracker
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from src.core import RenderError, get_timestamp, render_png
+from src.metrics import metrics
+from src.config import (
+    RENDER_WORKERS, RENDER_POOL_SHARED_BYTES, RENDER_POOL_HEALTH_INTERVAL_S, RENDER_POOL_TASK_TIMEOUT_S
+)
+
+# Seconds between cancel checks while waiting for a worker
+_CANCEL_POLL_S = 0.05
+# Renders with a cancel flag at the same time, more run without one (they can't be stopped in the worker)
+_CANCEL_SLOTS = 4096
+
+# Set in each worker process by _init_worker
+_worker_barrier = None
+_worker_cancel_flags = None
+
+
+def _attach_shared_memory(name):
+    """Attaches an existing segment without registering it with the resource tracker (the parent owns it)."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _init_worker(barrier, cancel_flags_name):
+    global _worker_barrier, _worker_cancel_flags
+    _worker_barrier = barrier
+    _worker_cancel_flags = _attach_shared_memory(cancel_flags_name)
+
+
+def _cancel_check(cancel_slot):
+    if cancel_slot is None:
+        return None
+
+    def check(stage):
+        if _worker_cancel_flags.buf[cancel_slot]:
+            raise RenderError(f"Render cancelled before stage '{stage}'")
+    return check
+
+
+def _render_shared(shm_name, shape, dtype, params, image_url, cancel_slot=None):
+    """Worker entry point: renders the image held in a shared memory segment, returns PNG bytes."""
+    shm = _attach_shared_memory(shm_name)
+    try:
+        img = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        img.flags.writeable = False
+        png_data = render_png(img, params, image_url=image_url, cancel_check=_cancel_check(cancel_slot))
+        del img
+        return png_data
+    finally:
+        try:
+            shm.close()
+        except BufferError:
+            pass  # An intermediate array still views the buffer, the mapping is released with it
+
+
+def _ping(timeout):
+    """Returns once every worker runs a ping (a worker can't answer for another), raises BrokenBarrierError if not."""
+    _worker_barrier.wait(timeout)
+    return os.getpid()
+
+
+class _SharedImage:
+    def __init__(self, img):
+        self.shape = img.shape
+        self.dtype = img.dtype.str
+        self.nbytes = img.nbytes
+        self.in_use = 0
+        self.shm = shared_memory.SharedMemory(create=True, size=max(img.nbytes, 1))
+        np.ndarray(img.shape, dtype=img.dtype, buffer=self.shm.buf)[...] = img
+
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class RenderPool:
+    """
+    Pool of render worker processes with a byte-budgeted LRU of shared memory source images.
+    The pool is started on first use, checked periodically by pinging every worker and
+    restarted when a worker dies, stops responding or a render exceeds the task timeout.
+    """
+
+    def __init__(
+        self, workers=RENDER_WORKERS, shared_budget_bytes=RENDER_POOL_SHARED_BYTES,
+        health_interval_s=RENDER_POOL_HEALTH_INTERVAL_S, task_timeout_s=RENDER_POOL_TASK_TIMEOUT_S
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.shared_budget_bytes = shared_budget_bytes
+        self.health_interval_s = health_interval_s
+        self.task_timeout_s = task_timeout_s
+        self._executor = None
+        self._barrier = None
+        self._cancel_flags = None
+        self._free_cancel_slots = []
+        self._health_lock = threading.Lock()
+        self._images = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self._health_thread = None
+        self._stopped = threading.Event()
+        self._atexit_registered = False
+        self._in_flight = 0
+        self.renders = 0
+        self.failures = 0
+        self.restarts = 0
+
+    # --------------------------------* Lifecycle *--------------------------------
+
+    def start(self):
+        """Starts the workers (spawned, Gradio's threads are not safe to fork) and the health check thread."""
+        with self._lock:
+            if self._executor is not None:
+                return
+            context = multiprocessing.get_context("spawn")
+            if self._cancel_flags is None:  # Kept across restarts, renders of the old pool free their slots
+                self._cancel_flags = shared_memory.SharedMemory(create=True, size=_CANCEL_SLOTS)
+                self._cancel_flags.buf[:] = bytes(_CANCEL_SLOTS)
+                self._free_cancel_slots = list(range(_CANCEL_SLOTS))
+            self._barrier = context.Barrier(self.workers)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=context,
+                initializer=_init_worker, initargs=(self._barrier, self._cancel_flags.name))
+            self._stopped.clear()
+            if not self._atexit_registered:
+                atexit.register(self.shutdown)
+                self._atexit_registered = True
+        print(f"{get_timestamp()} 🚀 Render pool started with {self.workers} worker process(es)")
+        self.health_check()
+        if self.health_interval_s > 0 and self._health_thread is None:
+            self._health_thread = threading.Thread(target=self._health_loop, name="render-pool-health", daemon=True)
+            self._health_thread.start()
+
+    def shutdown(self):
+        """Stops the workers and unlinks all shared memory segments."""
+        self._stopped.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+            images = list(self._images.values())
+            self._images.clear()
+            self._nbytes = 0
+            cancel_flags, self._cancel_flags = self._cancel_flags, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        for shared in images:
+            shared.release()
+        if cancel_flags is not None:
+            cancel_flags.close()
+            cancel_flags.unlink()
+
+    def _restart(self, reason, failed_executor=None):
+        """Replaces the pool, unless failed_executor is given and was already replaced (by a concurrent restart)."""
+        with self._lock:
+            if failed_executor is not None and failed_executor is not self._executor:
+                return
+            executor, self._executor = self._executor, None
+            self.restarts += 1
+        print(f"{get_timestamp()} ⚠️ Restarting render pool: {reason}")
+        if executor is not None:
+            self._terminate(executor)
+        self.start()
+
+    @staticmethod
+    def _terminate(executor):
+        """Stops an executor's workers, also hung ones. Their running renders fail with BrokenProcessPool."""
+        terminate_workers = getattr(executor, "terminate_workers", None)  # Python 3.14+
+        if terminate_workers is not None:
+            terminate_workers()
+            return
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    def health_check(self, timeout=10):
+        """
+        Pings every worker, restarts the pool if any of them is dead or unresponsive. Returns True if healthy.
+        The pings meet at a barrier, so each one has to be answered by a different worker.
+        Skipped while renders are running (pings would queue behind them), a dead worker then fails its
+        render with BrokenProcessPool and a hung one hits the task timeout. The pings are queued under the lock
+        renders count themselves in with, so a render starting meanwhile queues behind them and can't take a
+        worker they wait for.
+        """
+        if not self._health_lock.acquire(blocking=False):
+            return True  # A check is running, concurrent pings would meet at its barrier
+        try:
+            executor, barrier = self._executor, self._barrier
+            if executor is None:
+                return False
+            try:
+                with self._lock:
+                    if self._in_flight:
+                        return True
+                    futures = [executor.submit(_ping, timeout) for _ in range(self.workers)]
+                deadline = time.monotonic() + timeout
+                for future in futures:
+                    future.result(timeout=max(deadline - time.monotonic(), 0) + 1)
+                return True
+            except (BrokenProcessPool, BrokenBarrierError, FutureTimeoutError, RuntimeError) as e:
+                if not self._stopped.is_set():
+                    self._restart(f"health check failed ({type(e).__name__}: {e})", executor)
+                return False
+            finally:
+                barrier.reset()
+        finally:
+            self._health_lock.release()
+
+    def _health_loop(self):
+        while not self._stopped.wait(self.health_interval_s):
+            self.health_check()
+
+    # --------------------------------* Shared images *--------------------------------
+
+    def _acquire_image(self, image_key, load_image):
+        with self._lock:
+            shared = self._images.get(image_key)
+            if shared is not None:
+                self._images.move_to_end(image_key)
+                shared.in_use += 1
+                return shared
+
+        img = load_image()
+        shared = _SharedImage(img)
+        with self._lock:
+            existing = self._images.get(image_key)
+            if existing is not None:  # Another thread shared the same image meanwhile
+                shared.release()
+                shared = existing
+            else:
+                self._images[image_key] = shared
+                self._nbytes += shared.nbytes
+            shared.in_use += 1
+            self._evict_over_budget()
+            return shared
+
+    def _release_image(self, shared):
+        with self._lock:
+            shared.in_use -= 1
+            self._evict_over_budget()
+
+    def _evict_over_budget(self):
+        # Segments used by running renders and the most recent one are kept
+        for image_key in list(self._images)[:-1]:
+            if self._nbytes <= self.shared_budget_bytes:
+                break
+            shared = self._images[image_key]
+            if shared.in_use:
+                continue
+            del self._images[image_key]
+            self._nbytes -= shared.nbytes
+            shared.release()
+
+    # --------------------------------* Rendering *--------------------------------
+
+    def render(self, image_key, load_image, params, image_url=None, cancel_check=None):
+        """
+        Renders the 3-panel view in a worker process and returns PNG bytes, same as core.render_png.
+        load_image is called only if the image is not shared yet. cancel_check is polled while waiting,
+        a superseded render returns immediately and its worker result is dropped.
+        """
+        if cancel_check is not None:
+            cancel_check("submit")
+
+        shared = self._acquire_image(image_key, load_image)
+        with self._lock:
+            self._in_flight += 1
+        try:
+            for attempt in range(2):
+                try:
+                    with metrics.span("worker_render"):  # Stage spans of the worker process are not collected
+                        executor, future, cancel_slot = self._submit_render(shared, params, image_url)
+                        png_data = self._wait(executor, future, cancel_check, cancel_slot)
+                    self.renders += 1
+                    return png_data
+                except BrokenProcessPool as e:
+                    # A worker died mid-render (e.g. killed by the OOM killer), retried once on a fresh pool
+                    self.failures += 1
+                    if attempt:
+                        raise RenderError(f"Render worker failed: {e}") from e
+                    self._restart(f"worker died ({e})", executor)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._release_image(shared)
+
+    def _submit_render(self, shared, params, image_url):
+        with self._lock:
+            cancel_slot = self._free_cancel_slots.pop() if self._free_cancel_slots else None
+            if cancel_slot is not None:
+                self._cancel_flags.buf[cancel_slot] = 0
+        try:
+            executor, future = self._submit(
+                _render_shared, shared.shm.name, shared.shape, shared.dtype, params, image_url, cancel_slot)
+        except BaseException:
+            self._free_cancel_slot(cancel_slot)
+            raise
+        # Freed once the worker is done with it, a cancelled render may still be running
+        future.add_done_callback(lambda _: self._free_cancel_slot(cancel_slot))
+        return executor, future, cancel_slot
+
+    def _free_cancel_slot(self, cancel_slot):
+        if cancel_slot is not None:
+            with self._lock:
+                self._free_cancel_slots.append(cancel_slot)
+
+    def _cancel_render(self, future, cancel_slot):
+        """Drops a queued render, or stops a running one at its next stage check."""
+        if not future.cancel() and cancel_slot is not None:
+            with self._lock:
+                # Once done, the slot may already belong to another render
+                if not future.done() and self._cancel_flags is not None:
+                    self._cancel_flags.buf[cancel_slot] = 1
+
+    def _submit(self, fn, *args):
+        for _ in range(2):
+            executor = self._executor
+            if executor is None:
+                self.start()
+                continue
+            try:
+                return executor, executor.submit(fn, *args)
+            except BrokenProcessPool as e:
+                # A worker died since the last health check, the broken pool refuses new tasks
+                self._restart(f"pool broken ({e})", executor)
+            except RuntimeError:
+                continue  # The executor was shut down by a concurrent restart
+        raise RenderError("Render pool is not running")
+
+    def _wait(self, executor, future, cancel_check, cancel_slot):
+        deadline = time.monotonic() + self.task_timeout_s
+        while True:
+            try:
+                return future.result(timeout=_CANCEL_POLL_S)
+            except FutureTimeoutError:
+                pass
+            if cancel_check is not None:
+                try:
+                    cancel_check("render")
+                except Exception:
+                    self._cancel_render(future, cancel_slot)
+                    raise
+            if time.monotonic() > deadline:
+                self.failures += 1
+                if not future.cancel():  # Running past the timeout: its worker is hung, pings can't tell
+                    threading.Thread(
+                        target=self._restart, args=(f"render timed out after {self.task_timeout_s:.0f}s", executor),
+                        daemon=True).start()
+                raise RenderError(f"Render timed out after {self.task_timeout_s:.0f}s")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running": self._executor is not None,
+                "in_flight": self._in_flight,
+                "shared_images": len(self._images),
+                "shared_bytes": self._nbytes,
+                "shared_budget_bytes": self.shared_budget_bytes,
+                "renders": self.renders,
+                "failures": self.failures,
+                "restarts": self.restarts,
+            }
+
+
+render_pool = RenderPool()
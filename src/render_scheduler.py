@@ -0,0 +1,89 @@
+"""
+Latest-wins render scheduling per session. A new render request supersedes the session's pending and running
+ones: waiting renders are dropped once they get the session lock, running ones stop at their next stage check
+(RenderCancelled). Only the latest settings of a slider drag get rendered, renders of a session run one at a time.
+"""
+import threading
+from contextlib import contextmanager
+
+
+class RenderCancelled(Exception):
+    """Raised inside a render when a newer render request has been submitted for the same session."""
+
+
+class RenderTicket:
+    """Handle of a single render request, checked between pipeline stages."""
+
+    def __init__(self, session, generation):
+        self._session = session
+        self.generation = generation
+
+    def is_stale(self):
+        return self._session.generation != self.generation
+
+    def check(self, stage=None):
+        if self.is_stale():
+            raise RenderCancelled(f"Render superseded before stage '{stage}'" if stage else "Render superseded")
+
+
+class _SessionRenders:
+    def __init__(self):
+        self.generation = 0
+        self.lock = threading.Lock()
+
+
+class RenderScheduler:
+    """
+    Latest-wins render scheduling per session.
+    Every new request supersedes the pending and running ones of the same session: renders waiting for the
+    session lock are dropped once they get it, running renders stop at the next stage check.
+    """
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.cancelled = 0
+
+    def _session(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _SessionRenders()
+            return session
+
+    def supersede(self, session_id):
+        """Marks all pending and running renders of the session as stale."""
+        session = self._session(session_id)
+        with self._lock:
+            session.generation += 1
+            return RenderTicket(session, session.generation)
+
+    @contextmanager
+    def render(self, session_id):
+        """
+        Context manager yielding a RenderTicket. Renders of one session run one at a time,
+        superseded ones raise RenderCancelled (on enter or on ticket.check()).
+        """
+        ticket = self.supersede(session_id)
+        session = ticket._session
+        with session.lock:
+            try:
+                ticket.check("start")
+                yield ticket
+                with self._lock:
+                    self.completed += 1
+            except RenderCancelled:
+                with self._lock:
+                    self.cancelled += 1
+                raise
+
+    def forget(self, session_id):
+        """Drops session bookkeeping (on disconnect), running renders of the session get cancelled."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                session.generation += 1
+
+
+render_scheduler = RenderScheduler()
@@ -0,0 +1,129 @@
+"""
+Seam analysis: scores every candidate chunk width and height by the color jumps the shred would create at its
+strip boundaries, without shredding. The shred puts strip 2k+2 next to strip 2k (and the first odd strip after
+the last even one), so each seam puts source column (row) a right after column b, which are not neighbors.
+The seam blends in when a looks like the column that follows b in the source, and b like the one before a: their
+mean absolute differences, relative to the image's median difference between neighbor columns (rows), make the
+seam score. 0 means the shred continues the image, e.g. a repeating pattern shredded with a multiple of its period,
+1.0 means the seams are as strong as a typical step of the image. The normalization is one constant per axis, so
+chunk sizes are ranked by their absolute mismatch.
+
+Scores are separable: the final image's columns are the vertical shred's, in every row (rows are only permuted),
+and the mean over a row pair doesn't depend on the column order, so widths and heights are scored per axis.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.core import InvalidParametersError
+from src.shredder import shred_strip_order
+from src.config import MIN_CHUNK_SIZE_PX, INITIAL_MAX_CHUNK_PX, CHUNK_STEP_PX, SEAM_SUGGESTIONS
+
+# Line pairs gathered per batch are bounded by this many pixel values (int16), to cap the temporary memory
+SEAM_BATCH_VALUES = 4 * 1024 * 1024
+# Lines are compared over an evenly strided sample of at most this many pixels (the means barely move)
+SEAM_SAMPLE_PX = 512
+SCORE_DECIMALS = 2  # Scores equal at this precision are ties (a gray level of rounding moves them ~1%)
+MIN_NEIGHBOR_DIFFERENCE = 1.0  # Flat images: scores are relative to at least one gray level
+
+
+@dataclass(frozen=True)
+class SeamAnalysis:
+    chunk_widths: tuple
+    width_scores: tuple  # None for widths without seams inside the image (fewer than 3 strips)
+    chunk_heights: tuple
+    height_scores: tuple
+
+    def score(self, chunk_w, chunk_h):
+        """Mean of both axis scores, lower is more seamless."""
+        width_score = self.width_scores[self.chunk_widths.index(chunk_w)]
+        height_score = self.height_scores[self.chunk_heights.index(chunk_h)]
+        if width_score is None or height_score is None:
+            return None
+        return (width_score + height_score) / 2
+
+    def suggestions(self, count=SEAM_SUGGESTIONS):
+        """Best (chunk_w, chunk_h, score) combinations, most seamless first."""
+        widths = [(w, s) for w, s in zip(self.chunk_widths, self.width_scores) if s is not None]
+        heights = [(h, s) for h, s in zip(self.chunk_heights, self.height_scores) if s is not None]
+        if not widths or not heights:
+            return []
+        grid = np.add.outer([s for _, s in widths], [s for _, s in heights]) / 2
+        # Near ties (e.g. every multiple of a pattern's period) go to the smaller chunk sizes
+        best = np.argsort(grid.round(SCORE_DECIMALS), axis=None, kind="stable")[:count]
+        rows, cols = np.unravel_index(best, grid.shape)
+        return [(widths[r][0], heights[c][0], float(grid[r, c])) for r, c in zip(rows, cols)]
+
+
+def candidate_chunk_sizes(start=MIN_CHUNK_SIZE_PX, stop=INITIAL_MAX_CHUNK_PX, step=CHUNK_STEP_PX):
+    """The chunk size slider values."""
+    return tuple(range(start, stop + 1, step))
+
+
+def seam_pairs(length, chunk_sizes):
+    """
+    Source line pairs (before, after) of every seam of every chunk size, concatenated, and the chunk size index
+    of each pair. Seams touching the edge padding are left out, the padding is a flat band whatever the chunk size.
+    """
+    before, after, owners = [], [], []
+    for i, chunk_size in enumerate(chunk_sizes):
+        order = shred_strip_order(length + (-length) % chunk_size, chunk_size)
+        if len(order) < 3:
+            continue
+        ends, starts = order[:-1] + chunk_size - 1, order[1:]
+        inside = (ends < length) & (starts < length)
+        before.append(ends[inside])
+        after.append(starts[inside])
+        owners.append(np.full(np.count_nonzero(inside), i))
+    if not before:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty, empty
+    return np.concatenate(before), np.concatenate(after), np.concatenate(owners)
+
+
+def line_differences(img, before, after):
+    """Mean absolute difference of the column pairs img[:, before] and img[:, after] over rows and channels."""
+    differences = np.empty(len(before), dtype=np.float64)
+    batch = max(1, SEAM_BATCH_VALUES // (img.shape[0] * img.shape[2]))
+    for start in range(0, len(before), batch):
+        stop = start + batch
+        jumps = np.abs(img[:, before[start:stop]].astype(np.int16) - img[:, after[start:stop]])
+        differences[start:stop] = jumps.mean(axis=(0, 2))
+    return differences
+
+
+def _axis_scores(img, chunk_sizes):
+    """Seam scores of chunk sizes along the columns of img (transposed for the rows)."""
+    img = img[::-(-img.shape[0] // SEAM_SAMPLE_PX)]
+    length = img.shape[1]
+    before, after, owners = seam_pairs(length, chunk_sizes)
+    neighbors = np.arange(length - 1)
+    # A typical step of the image, column x to x + 1
+    step = max(float(np.median(line_differences(img, neighbors, neighbors + 1))), MIN_NEIGHBOR_DIFFERENCE)
+    # The seam's columns against the source columns they replace: after b (a seam's b is never the last column
+    # of a padded image, clamped for the image's own last one) and before a (a strip start, never column 0)
+    mismatch = (line_differences(img, after, np.minimum(before + 1, length - 1))
+                + line_differences(img, before, after - 1)) / 2
+    mismatches = np.bincount(owners, weights=mismatch, minlength=len(chunk_sizes))
+    counts = np.bincount(owners, minlength=len(chunk_sizes))
+    return tuple(
+        float(total / (count * step)) if count else None
+        for total, count in zip(mismatches, counts)
+    )
+
+
+def analyze_seams(img, chunk_widths=None, chunk_heights=None):
+    """
+    Seam scores of the candidate chunk widths and heights (default: the slider range) for an RGB uint8 image.
+    Scores are computed on the source image, before color effects.
+    """
+    if img is None or not isinstance(img, np.ndarray) or img.ndim != 3 or img.shape[0] < 2 or img.shape[1] < 2:
+        raise InvalidParametersError("Seam analysis needs a loaded image of at least 2x2 px.")
+    chunk_widths = tuple(int(c) for c in (chunk_widths or candidate_chunk_sizes()))
+    chunk_heights = tuple(int(c) for c in (chunk_heights or candidate_chunk_sizes()))
+    if min(chunk_widths + chunk_heights) < MIN_CHUNK_SIZE_PX:
+        raise InvalidParametersError(f"Chunk sizes must be at least {MIN_CHUNK_SIZE_PX} px.")
+    return SeamAnalysis(
+        chunk_widths, _axis_scores(img, chunk_widths),
+        chunk_heights, _axis_scores(img.transpose(1, 0, 2), chunk_heights)
+    )
@@ -1,3 +1,5 @@
+import math
+
 import numpy as np
 
 
@@ -11,3 +13,245 @@ def shred_image(img, chunk_width, chunk_height):
     final_image = np.vstack(horizontal_chunks[::2] + horizontal_chunks[1::2])
 
     return stacked_vertical, final_image
+
+
+def shred_strip_order(length, chunk_size):
+    """Source offsets of the strips in shredded order (even-indexed strips followed by odd-indexed ones)."""
+    starts = np.arange(0, length, chunk_size)
+    return np.concatenate([starts[::2], starts[1::2]])
+
+
+# Strip schedules: "" (uniform chunk size strips), "16, 32, 8" (explicit sizes, the last one repeats),
+# "pattern: 8, 16, 32" (sizes repeated cyclically) or "geom: 4, 1.5" (first size and ratio of a geometric progression)
+STRIP_SCHEDULE_KINDS = ("list", "pattern", "geom")
+MIN_STRIP_PX = 2
+MAX_STRIP_SCHEDULE_VALUES = 256
+
+
+def parse_strip_schedule(spec):
+    """Parses a strip schedule spec into (kind, values), None for the uniform (empty) schedule. Raises ValueError."""
+    spec = (spec or "").strip()
+    if not spec:
+        return None
+    kind, _, values = spec.rpartition(":")
+    kind = kind.strip().lower() or "list"
+    if kind not in STRIP_SCHEDULE_KINDS:
+        raise ValueError(f"Unknown strip schedule '{kind}', expected one of: {', '.join(STRIP_SCHEDULE_KINDS)}.")
+    values = values.replace(",", " ").split()
+    if not values or len(values) > MAX_STRIP_SCHEDULE_VALUES:
+        raise ValueError(f"Strip schedule needs 1 to {MAX_STRIP_SCHEDULE_VALUES} values.")
+    if kind == "geom" and len(values) != 2:
+        raise ValueError("Geometric strip schedule needs a first size and a ratio, e.g. 'geom: 4, 1.5'.")
+    try:
+        if kind == "geom":
+            values = (int(values[0]), float(values[1]))
+        else:
+            values = tuple(int(v) for v in values)
+    except ValueError:
+        raise ValueError(f"Strip schedule values must be numbers, received: '{spec}'.")
+    if kind == "geom" and not 0 < values[1] <= 16:
+        raise ValueError("Geometric strip schedule ratio must be in (0, 16].")
+    if min(values[:1] if kind == "geom" else values) < MIN_STRIP_PX:
+        raise ValueError(f"Strip sizes must be at least {MIN_STRIP_PX}px.")
+    return kind, values
+
+
+def format_strip_schedule(schedule):
+    """Canonical spec of a parsed schedule, parse_strip_schedule(format_strip_schedule(s)) == s."""
+    if schedule is None:
+        return ""
+    kind, values = schedule
+    values = ", ".join(f"{v:g}" if isinstance(v, float) else str(v) for v in values)
+    return values if kind == "list" else f"{kind}: {values}"
+
+
+def strip_sizes(length, chunk_size, schedule=""):
+    """
+    Sizes of the consecutive strips covering `length` pixels: chunk_size strips or the compiled schedule.
+    The last strip is ragged (cut at the edge) instead of padded.
+    """
+    parsed = parse_strip_schedule(schedule)
+    if parsed is None:
+        sizes = np.full(-(-length // chunk_size), chunk_size)
+    else:
+        kind, values = parsed
+        if kind == "geom":
+            first, ratio = values
+            sizes, size, total = [], float(first), 0
+            while total < length:
+                sizes.append(max(MIN_STRIP_PX, min(round(size), length)))
+                total += sizes[-1]
+                size *= ratio
+            sizes = np.array(sizes)
+        elif kind == "pattern":
+            sizes = np.tile(values, -(-length // sum(values)))
+        else:
+            tail = max(0, -(-(length - sum(values)) // values[-1]))
+            sizes = np.concatenate([values, np.full(tail, values[-1])])
+    ends = np.cumsum(sizes)
+    count = int(np.searchsorted(ends, length)) + 1
+    sizes = sizes[:count].copy()
+    sizes[-1] -= ends[count - 1] - length
+    return sizes
+
+
+def padded_length(length, chunk_size, schedule=""):
+    """Length after edge padding: a multiple of chunk_size for uniform strips, schedules aren't padded."""
+    return length if schedule else -(-length // chunk_size) * chunk_size
+
+
+def strip_index_map(sizes):
+    """1-D index map of shredding strips of `sizes`: shredded[i] == source[index_map[i]]."""
+    sizes = np.asarray(sizes)
+    order = shred_strip_order(len(sizes), 1)
+    starts = np.cumsum(sizes) - sizes
+    shredded_sizes = sizes[order]
+    shredded_starts = np.cumsum(shredded_sizes) - shredded_sizes
+    return np.arange(int(sizes.sum())) + np.repeat(starts[order] - shredded_starts, shredded_sizes)
+
+
+def shredded_strip_boundaries(length, chunk_size, schedule=""):
+    """Inner strip boundaries of the shredded axis (where the guidelines go)."""
+    sizes = strip_sizes(length, chunk_size, schedule)
+    return np.cumsum(sizes[shred_strip_order(len(sizes), 1)])[:-1]
+
+
+def shred_index_maps(height, width, chunk_width, chunk_height, strip_widths="", strip_heights=""):
+    """
+    Row and column index maps of shred_image: final_image == img[rows][:, cols] and stacked_vertical == img[:, cols].
+    Lets crops and tiles of the shred be gathered straight from the source.
+    With strip schedules, the maps are those of the scheduled shred (shred_image_scheduled).
+    """
+    cols = strip_index_map(strip_sizes(width, chunk_width, strip_widths))
+    rows = strip_index_map(strip_sizes(height, chunk_height, strip_heights))
+    return rows, cols
+
+
+def permutation_power(perm, k):
+    """k-th power of an index permutation (perm applied k times, img[perm^k]) by repeated squaring."""
+    result = np.arange(len(perm))
+    base = np.asarray(perm)
+    while k > 0:
+        if k & 1:
+            result = result[base]
+        base = base[base]
+        k >>= 1
+    return result
+
+
+def permutation_period(perm):
+    """Smallest k >= 1 with perm^k == identity: the LCM of the cycle lengths."""
+    perm = np.asarray(perm)
+    visited = np.zeros(len(perm), dtype=bool)
+    period = 1
+    for start in range(len(perm)):
+        if visited[start]:
+            continue
+        length = 0
+        i = start
+        while not visited[i]:
+            visited[i] = True
+            i = perm[i]
+            length += 1
+        period = math.lcm(period, length)
+    return period
+
+
+def strip_permutation_period(length, chunk_size, schedule=""):
+    """
+    Return period of one axis. Uniform strips move as a whole so only their order matters,
+    scheduled strips of different sizes don't line up after a shred and the pixel map's period is taken.
+    """
+    if schedule:
+        return permutation_period(strip_index_map(strip_sizes(length, chunk_size, schedule)))
+    strips = -(-length // chunk_size)
+    order = shred_strip_order(strips, 1)
+    return permutation_period(order)
+
+
+def shred_period(height, width, chunk_width, chunk_height, strip_widths="", strip_heights=""):
+    """Number of iterations after which shredding returns the original (padded) image."""
+    return math.lcm(
+        strip_permutation_period(height, chunk_height, strip_heights),
+        strip_permutation_period(width, chunk_width, strip_widths)
+    )
+
+
+def _iterated_maps(height, width, chunk_width, chunk_height, iterations, strip_widths="", strip_heights=""):
+    """(vertical_rows, rows, cols) with the last vertical shred == img[vertical_rows][:, cols] and the final
+    shred == last vertical shred[rows], rows being the single shred's map."""
+    rows, cols = shred_index_maps(height, width, chunk_width, chunk_height, strip_widths, strip_heights)
+    if iterations == 1:
+        return np.arange(height), rows, cols
+    row_period = strip_permutation_period(height, chunk_height, strip_heights)
+    col_period = strip_permutation_period(width, chunk_width, strip_widths)
+    vertical_rows = permutation_power(rows, (iterations - 1) % row_period)
+    return vertical_rows, rows, permutation_power(cols, iterations % col_period)
+
+
+def iterated_index_maps(height, width, chunk_width, chunk_height, iterations, strip_widths="", strip_heights=""):
+    """
+    Index maps of `iterations` successive shreds: returns (vertical_rows, rows, cols) with
+    the last vertical shred == img[vertical_rows][:, cols] and the final shred == img[rows][:, cols].
+    Powers are taken modulo the strip order periods, O(log k) on the index arrays.
+    """
+    vertical_rows, rows, cols = _iterated_maps(
+        height, width, chunk_width, chunk_height, iterations, strip_widths, strip_heights)
+    return vertical_rows, vertical_rows[rows], cols
+
+
+def _take_columns(img, cols):
+    """img[:, cols], gathering whole pixels (all channels as one opaque item) instead of single bytes."""
+    if img.ndim == 3 and img.flags.c_contiguous:
+        pixels = img.view(np.dtype((np.void, img.shape[2] * img.itemsize)))[..., 0]
+        return np.take(pixels, cols, axis=1)[..., None].view(img.dtype)
+    return np.take(img, cols, axis=1)
+
+
+def shred_image_iterated(img, chunk_width, chunk_height, iterations=1, strip_widths="", strip_heights=""):
+    """
+    shred_image applied `iterations` times (fed its own final image), with a single gather per output:
+    the vertical shred gathers whole source rows then the columns, the final shred its rows.
+    Strip schedules replace the uniform chunk sizes of their axis, see shred_image_scheduled.
+    """
+    if iterations == 1 and not strip_widths and not strip_heights:
+        return shred_image(img, chunk_width, chunk_height)
+    h, w = img.shape[:2]
+    vertical_rows, rows, cols = _iterated_maps(
+        h, w, chunk_width, chunk_height, iterations, strip_widths, strip_heights)
+    source = img if iterations == 1 else img[vertical_rows]
+    stacked_vertical = _take_columns(source, cols)
+    return stacked_vertical, stacked_vertical[rows]
+
+
+def shred_image_scheduled(img, strip_widths, strip_heights, chunk_width=None, chunk_height=None):
+    """
+    shred_image with strip schedules (see parse_strip_schedule) instead of uniform chunks.
+    Schedules compile to 1-D index maps, the shred is one gather per output whatever the layout,
+    and the last strip of each axis is ragged so the image isn't padded.
+    An empty schedule falls back to chunk_width/chunk_height strips on its axis, which are then required.
+    Raises ValueError.
+    """
+    for schedule, chunk_size, name in ((strip_widths, chunk_width, "chunk_width"),
+                                       (strip_heights, chunk_height, "chunk_height")):
+        if parse_strip_schedule(schedule) is None and chunk_size is None:
+            raise ValueError(f"An empty strip schedule falls back to uniform strips, {name} is required.")
+    return shred_image_iterated(img, chunk_width, chunk_height, 1, strip_widths, strip_heights)
+
+
+def breed_images(stack, chunk_width, chunk_height, strip_widths="", strip_heights=""):
+    """
+    Interleaves the strips of N same-shape images stacked as (N, H, W, C): the cell of row strip i and column strip j
+    comes from source (i + j) % N, e.g. even strips from A and odd ones from B on each axis for two sources.
+    One gather over the stack, the last strips are ragged like scheduled shreds.
+    """
+    n, h, w, c = stack.shape
+    sizes_h = strip_sizes(h, chunk_height, strip_heights)
+    sizes_w = strip_sizes(w, chunk_width, strip_widths)
+    row_strips = np.repeat(np.arange(len(sizes_h)), sizes_h)
+    col_strips = np.repeat(np.arange(len(sizes_w)), sizes_w)
+    source = (row_strips[:, None] + col_strips[None, :]) % n
+    # Flat index into the stack of whole pixels (channels as one opaque item), about 2x faster than 3-axis indexing
+    flat = (source * (h * w) + np.arange(h * w).reshape(h, w)).ravel()
+    pixels = np.ascontiguousarray(stack).view(np.dtype((np.void, c * stack.itemsize))).reshape(-1)
+    return pixels.take(flat).view(stack.dtype).reshape(h, w, c)
@@ -0,0 +1,211 @@
+"""
+Image sources: http(s) URLs, 'file://' URLs, local files, directories and raw .npy arrays.
+UI-free, failures raise ImageSourceError.
+"""
+import os
+import random
+from io import BytesIO
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+from src.core import ImageSourceError, ensure_three_channels, get_timestamp
+from src.metrics import metrics, fetched_bytes, record_decoded_image
+from src.downloads import download_flights, host_limiter
+from src.config import (
+    ALLOW_LOCAL_IMAGE_SOURCES, LOCAL_IMAGE_EXTENSIONS, NUMPY_IMAGE_EXTENSIONS, DOWNLOAD_TIMEOUT_S, DOWNLOAD_CHUNK_BYTES
+)
+
+
+def _read_content(response, cancel_check):
+    if cancel_check is None:
+        return response.content
+    chunks = []
+    read1 = getattr(response.raw, "read1", None)  # urllib3 2+: returns what arrived, so a trickle still gets checked
+    if read1 is None:
+        for chunk in response.iter_content(DOWNLOAD_CHUNK_BYTES):
+            cancel_check("download")
+            chunks.append(chunk)
+        return b"".join(chunks)
+    while chunk := read1(DOWNLOAD_CHUNK_BYTES, decode_content=True):
+        cancel_check("download")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def download_image(url, timeout=DOWNLOAD_TIMEOUT_S, cancel_check=None, coalesce=False):
+    """
+    Downloads and decodes an image URL. timeout bounds the connection and every read (not the whole download),
+    cancel_check (see src.fetcher) is called between body chunks and stops an abandoned download by raising.
+    Requests per host are capped (src.downloads). With coalesce, concurrent calls for the same URL share one
+    download and decode, only for URLs that return the same image every time.
+    """
+    if coalesce:
+        return download_flights.do(url, lambda check: _download_image(url, timeout, check), cancel_check)
+    return _download_image(url, timeout, cancel_check)
+
+
+def _download_image(url, timeout, cancel_check):
+    import requests  # Lazy import, local sources and .npy arrays don't need it
+
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
+    }
+    try:
+        with host_limiter.slot(url, cancel_check), metrics.span("download"), \
+                requests.get(url, headers=headers, timeout=timeout, stream=cancel_check is not None) as response:
+            content = _read_content(response, cancel_check) if response.status_code == 200 else None
+    except Exception as e:
+        print(f"{get_timestamp()} ⚠️ Failed to download image from URL: {url}\nError: {e}")
+        raise ImageSourceError(
+            f"URL: {url}\nError: {e}",
+            title="Image Download Error"
+        )
+
+    # response.raise_for_status()
+    if response.status_code != 200:
+        print(f"{get_timestamp()} ⚠️ Failed to download image. Status code {response.status_code} for URL: {url}")
+        raise ImageSourceError(
+            f"Response status code: {response.status_code} from URL: {url}",
+            title="Image Download Error",
+        )
+
+    fetched_bytes.inc(len(content), kind="image")
+    content_type = response.headers.get('Content-Type', '').lower()
+    if not content_type.startswith('image/'):
+        print(f"{get_timestamp()} ⚠️ URL does not point to an image. Content-Type: '{content_type}'. URL: {url}")
+        raise ImageSourceError(
+            f"URL does not point to an image. Content-Type: '{content_type}'. URL: {url}",
+            title="Image Download Error"
+        )
+
+    try:
+        with metrics.span("decode"):
+            img = np.array(Image.open(BytesIO(content)).convert('RGB'))
+    except UnidentifiedImageError as e:
+        print(f"{get_timestamp()} ⚠️ Cannot identify image file. Content-Type: '{content_type}'. URL: '{url}'")
+        raise ImageSourceError(
+            f"Cannot identify image type. URL: '{url}'\nError: {e}",
+            title="Image Processing Error (Pillow)"
+        )
+    record_decoded_image(img, "url")
+    return img
+
+
+def local_source_path(source):
+    """
+    Returns the filesystem path of a 'file://' URL or a local path, None for URLs (http(s) or any other scheme).
+    Doesn't touch the filesystem.
+    """
+    if source is None:
+        return None
+    source = os.fspath(source) if isinstance(source, os.PathLike) else str(source).strip()
+    if source.lower().startswith('file://'):
+        parsed = urlparse(source)
+        return url2pathname(parsed.netloc + parsed.path) if parsed.netloc else url2pathname(parsed.path)
+    if '://' in source:
+        return None
+    return os.path.expanduser(source)
+
+
+def resolve_local_path(source):
+    """
+    Returns a filesystem path for 'file://' URLs and existing local paths, None for anything else.
+    """
+    path = local_source_path(source)
+    return path if path is not None and os.path.exists(path) else None
+
+
+def list_directory_images(dir_path):
+    """Returns sorted paths of all supported image and .npy files in a directory (non-recursive)."""
+    extensions = LOCAL_IMAGE_EXTENSIONS + NUMPY_IMAGE_EXTENSIONS
+    return sorted(
+        os.path.join(dir_path, name) for name in os.listdir(dir_path)
+        if name.lower().endswith(extensions) and os.path.isfile(os.path.join(dir_path, name))
+    )
+
+
+def load_npy_image(path):
+    """
+    Maps a raw .npy image array zero-copy with np.load(mmap_mode='r').
+    Accepted shapes are (H, W), (H, W, 1), (H, W, 3) and (H, W, 4), uint8 arrays are never copied
+    (alpha is dropped as a view), grayscale gets expanded and other dtypes are clipped to uint8.
+    """
+    try:
+        img = np.load(path, mmap_mode='r', allow_pickle=False)
+    except (OSError, ValueError) as e:
+        print(f"{get_timestamp()} ⚠️ Failed to load NumPy array from: {path}\nError: {e}")
+        raise ImageSourceError(
+            f"Path: {path}\nError: {e}",
+            title="Image Loading Error (NumPy)"
+        )
+
+    if img.ndim not in (2, 3) or (img.ndim == 3 and img.shape[2] not in (1, 3, 4)) or 0 in img.shape:
+        raise ImageSourceError(
+            f"Unsupported array shape {img.shape}, expected (H, W), (H, W, 1), (H, W, 3) or (H, W, 4). Path: {path}",
+            title="Image Loading Error (NumPy)"
+        )
+
+    if img.dtype != np.uint8:
+        print(f"{get_timestamp()} ⚠️ Array dtype is {img.dtype}, converting to uint8 (copy). Path: {path}")
+        img = np.clip(img, 0, 255).astype(np.uint8)
+    if img.ndim == 3 and img.shape[2] == 4:
+        img = img[..., :3]
+    return ensure_three_channels(img)
+
+
+def load_local_image(path):
+    """Loads an image from a local file or a random supported file from a directory."""
+    if os.path.isdir(path):
+        candidates = list_directory_images(path)
+        if not candidates:
+            raise ImageSourceError(
+                f"No supported images found in directory: {path}",
+                title="Image Loading Error"
+            )
+        path = random.choice(candidates)
+        print(f"{get_timestamp()} 📂 Picked '{os.path.basename(path)}' from directory")
+
+    if path.lower().endswith(NUMPY_IMAGE_EXTENSIONS):
+        with metrics.span("decode"):
+            img_array = load_npy_image(path)
+        record_decoded_image(img_array, "npy")
+        return img_array
+
+    try:
+        with metrics.span("decode"), Image.open(path) as img:
+            img_array = np.array(img.convert('RGB'))
+    except (OSError, UnidentifiedImageError) as e:
+        print(f"{get_timestamp()} ⚠️ Cannot open local image file: '{path}'")
+        raise ImageSourceError(
+            f"Cannot open image file. Path: '{path}'\nError: {e}",
+            title="Image Processing Error (Pillow)"
+        )
+    record_decoded_image(img_array, "file")
+    return img_array
+
+
+def load_image_source(source, timeout=DOWNLOAD_TIMEOUT_S, cancel_check=None, coalesce=False, allow_local=None):
+    """
+    Loads an image from any supported source: http(s) URL, 'file://' URL, local file path,
+    directory (random image) or raw .npy array. Returns an RGB uint8 NumPy array.
+    timeout, cancel_check and coalesce apply to downloads (see download_image).
+    allow_local overrides IMAGE_SHREDDER_ALLOW_LOCAL_FILES (the batch CLI reads local files, the UI only when enabled).
+    """
+    local_path = local_source_path(source)
+    if local_path is None:
+        return download_image(source, timeout, cancel_check, coalesce)
+    if not (ALLOW_LOCAL_IMAGE_SOURCES if allow_local is None else allow_local):
+        # Rejected before touching the filesystem, so the response doesn't tell whether the path exists
+        raise ImageSourceError(
+            "Local image sources are disabled on this server, enter an http(s) URL.",
+            title="Image Loading Error"
+        )
+    if not os.path.exists(local_path):
+        raise ImageSourceError(
+            f"Local file not found: {source}",
+            title="Image Loading Error"
+        )
+    return load_local_image(local_path)
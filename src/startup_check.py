@@ -0,0 +1,83 @@
+"""
+Startup budget check, guards the fast-startup path against import regressions.
+Imports every module in a fresh interpreter with `python -X importtime` and fails when its cumulative
+import time exceeds the budget or it pulls in a heavy dependency it must not import.
+
+    python -m src.startup_check [--runs 5] [--scale 1.5]
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# module: (cumulative import time budget in ms, modules it must not import)
+STARTUP_BUDGETS = {
+    "src.core": (250, ("gradio", "matplotlib", "requests", "PIL")),
+    "src.sources": (300, ("gradio", "matplotlib", "requests")),
+    "src.cli": (400, ("gradio", "matplotlib", "requests")),
+}
+
+
+def measure_import(module, python=sys.executable):
+    """
+    Imports the module in a fresh interpreter.
+    Returns (cumulative import time in ms, set of all imported module names).
+    """
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    cumulative_us = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        name = name.strip()
+        if not cumulative.strip().isdigit():
+            continue  # Header line
+        imported.add(name)
+        if name == module:
+            cumulative_us = int(cumulative)
+    if cumulative_us is None:
+        raise RuntimeError(f"No importtime record for '{module}':\n{result.stderr[-2000:]}")
+    return cumulative_us / 1000, imported
+
+
+def check_startup(budgets=STARTUP_BUDGETS, runs=5, scale=1.0):
+    """Returns a list of (module, best ms, budget ms, forbidden imports found, ok) records."""
+    results = []
+    for module, (budget_ms, forbidden) in budgets.items():
+        timings, imported = [], set()
+        for _ in range(runs):
+            elapsed_ms, imported = measure_import(module)
+            timings.append(elapsed_ms)
+        found = sorted(
+            name for name in imported
+            if any(name == f or name.startswith(f + ".") for f in forbidden)
+        )
+        best_ms = min(timings)  # Best of runs, filters out scheduler and disk cache noise
+        results.append((module, best_ms, budget_ms * scale, found, best_ms <= budget_ms * scale and not found))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import time budget check")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreter runs per module (best is used)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Budget multiplier for slower machines")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module, best_ms, budget_ms, found, ok in check_startup(runs=args.runs, scale=args.scale):
+        status = "✅" if ok else "❌"
+        print(f"{status} {module:<14} {best_ms:8.1f} ms (budget {budget_ms:.0f} ms)")
+        if found:
+            print(f"    Forbidden imports: {', '.join(found[:10])}{' ...' if len(found) > 10 else ''}")
+        failed = failed or not ok
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
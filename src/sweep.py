@@ -0,0 +1,113 @@
+"""
+Chunk size sweep: renders a grid of chunk widths x heights (optionally per effect preset) into one contact sheet.
+Effects are applied once per preset on the source image and shared by all cells (all effects are per-pixel,
+so they commute with the edge padding), cells only pad, shred and downscale, in parallel threads.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.shredder import shred_image_iterated
+from src.core import (
+    InvalidParametersError, RenderError, ShredParams, apply_color_effect, pad_image_to_fit_chunks, _pillow_font
+)
+from src.config import (
+    MIN_CHUNK_SIZE_PX, CHUNK_STEP_PX, SWEEP_CELL_WIDTH_PX, SWEEP_MAX_CELLS, SWEEP_WORKERS
+)
+
+
+def sweep_chunk_sizes(start, stop, step=CHUNK_STEP_PX):
+    """Chunk sizes from start to stop inclusive, e.g. every CHUNK_STEP_PX value from 4 to 64."""
+    try:
+        start, stop, step = int(start), int(stop), int(step)
+    except (TypeError, ValueError):
+        raise InvalidParametersError("Sweep range values must be integer numbers.")
+    if step < 1:
+        raise InvalidParametersError("Sweep step must be at least 1 px.")
+    if start < MIN_CHUNK_SIZE_PX or stop < start:
+        raise InvalidParametersError(
+            f"Sweep range must start at {MIN_CHUNK_SIZE_PX} px or more and end after it starts.")
+    return list(range(start, stop + 1, step))
+
+
+def _render_cell(source, chunk_w, chunk_h, cell_w, cell_h, iterations=1):
+    from PIL import Image
+
+    _, final_shred = shred_image_iterated(
+        pad_image_to_fit_chunks(source, chunk_w, chunk_h), chunk_w, chunk_h, iterations)
+    cell = Image.fromarray(final_shred[..., 0] if final_shred.shape[2] == 1 else final_shred).convert('RGB')
+    scale = min(cell_w / cell.width, cell_h / cell.height)
+    size = (max(1, round(cell.width * scale)), max(1, round(cell.height * scale)))
+    return cell.resize(size, Image.Resampling.NEAREST if scale >= 1 else Image.Resampling.BOX)
+
+
+def render_sweep(
+    img, chunk_widths, chunk_heights, effect_presets=None, params=None,
+    cell_width=SWEEP_CELL_WIDTH_PX, max_workers=None, cancel_check=None
+):
+    """
+    Renders the final shred for every chunk width (columns) x height (rows) combination into a contact sheet.
+    effect_presets is a list of effect lists, one grid block each (default: params.color_effects),
+    brightness and contrast are taken from params. Returns a PIL image.
+    cancel_check is called once per preset, stops an outdated sweep by raising.
+    """
+    from PIL import Image, ImageDraw
+
+    if img is None or not isinstance(img, np.ndarray):
+        raise RenderError("No image loaded or invalid image data.")
+    params = params or ShredParams()
+    chunk_widths, chunk_heights = list(chunk_widths), list(chunk_heights)
+    if effect_presets is None:
+        effect_presets = [params.color_effects]
+    effect_presets = [tuple(preset or ()) for preset in effect_presets] or [()]
+    if not chunk_widths or not chunk_heights:
+        raise InvalidParametersError("Sweep needs at least one chunk width and one chunk height.")
+    if min(chunk_widths + chunk_heights) < MIN_CHUNK_SIZE_PX:
+        raise InvalidParametersError(f"Sweep chunk sizes must be at least {MIN_CHUNK_SIZE_PX} px.")
+    cell_count = len(chunk_widths) * len(chunk_heights) * len(effect_presets)
+    if cell_count > SWEEP_MAX_CELLS:
+        raise InvalidParametersError(
+            f"Sweep of {cell_count} cells exceeds the limit of {SWEEP_MAX_CELLS}, use a larger step or a narrower range.")
+
+    img_h, img_w = img.shape[:2]
+    cell_w = int(cell_width)
+    cell_h = max(1, round(cell_w * img_h / img_w))
+    font_px = max(10, cell_w // 14)
+    font = _pillow_font(font_px)
+    label_h = int(font_px * 1.6)
+    margin = max(4, font_px // 2)
+    block_w = margin + len(chunk_widths) * (cell_w + margin)
+    block_h = label_h + margin + len(chunk_heights) * (cell_h + label_h + margin)
+
+    sheet = Image.new('RGB', (block_w, block_h * len(effect_presets)), 'white')
+    draw = ImageDraw.Draw(sheet)
+    workers = max_workers or SWEEP_WORKERS or min(8, os.cpu_count() or 1)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for block_index, preset in enumerate(effect_presets):
+            if cancel_check is not None:
+                cancel_check("sweep")
+            # Computed once per preset, shared read-only by all cells of the block
+            source = apply_color_effect(img, preset, params.brightness_offset, params.contrast_factor)
+            source.setflags(write=False)
+
+            y0 = block_index * block_h
+            title = ", ".join(preset) if preset else "No effects"
+            draw.text((margin, y0 + label_h // 2), title, fill='black', font=font, anchor='lm')
+
+            cells = {
+                executor.submit(
+                    _render_cell, source, chunk_w, chunk_h, cell_w, cell_h, params.iterations
+                ): (col, row, chunk_w, chunk_h)
+                for row, chunk_h in enumerate(chunk_heights)
+                for col, chunk_w in enumerate(chunk_widths)
+            }
+            for future, (col, row, chunk_w, chunk_h) in cells.items():
+                cell = future.result()
+                x = margin + col * (cell_w + margin)
+                y = y0 + label_h + margin + row * (cell_h + label_h + margin)
+                sheet.paste(cell, (x + (cell_w - cell.width) // 2, y + (cell_h - cell.height) // 2))
+                draw.text((x + cell_w // 2, y + cell_h + label_h // 2), f"{chunk_w}x{chunk_h}",
+                          fill='#444444', font=font, anchor='mm')
+    return sheet
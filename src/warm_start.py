@@ -0,0 +1,200 @@
+"""
+Warm start of the page-load render: the default sample is downloaded, decoded and rendered with the default
+settings in the background, so a new browser tab is served right away instead of fetching and rendering it.
+A single-image source is kept as one render, re-fetched every refresh interval. A "multiple" source (a new image
+on every fetch) is kept as a pool of prefetched renders, each page load takes one and the pool is refilled.
+An empty pool (or a failing source) falls back to the regular fetch and render of the page load.
+Renders are written to PNG files once and served by path, so the UI doesn't re-encode them on every page load.
+"""
+import os
+import time
+import atexit
+import shutil
+import tempfile
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+from src.core import ShredParams, render_png
+from src.sources import load_image_source
+from src.image_store import image_store
+from src.render_cache import render_cache, make_render_key
+from src.admission import render_budget, estimate_render_bytes
+from src.metrics import metrics
+from src.config import (
+    DEFAULT_CHUNK_W, DEFAULT_CHUNK_H, DEFAULT_COLOR_EFFECT, DEFAULT_BRIGHTNESS, DEFAULT_CONTRAST,
+    DEFAULT_SHOW_GUIDELINES, GUIDELINE_COLORS, DEFAULT_GUIDELINE_COLOR_NAME, OUTPUT_IMAGE_WIDTH_IN_PIXELS,
+    DEFAULT_ITERATIONS, WARM_START_REFRESH_S, WARM_START_POOL_SIZE, WARM_START_RETRY_S
+)
+
+RETIRED_FILE_GRACE_S = 60  # Served or replaced render files are kept this long, the UI copies them after serving
+
+
+@dataclass(frozen=True)
+class WarmRender:
+    image_key: str
+    image_url: str
+    path: str  # The rendered PNG file
+    created: float
+
+
+def default_shred_params():
+    """ShredParams of the page load (the app's reset values)."""
+    return ShredParams.from_values(
+        DEFAULT_CHUNK_W, DEFAULT_CHUNK_H, DEFAULT_COLOR_EFFECT, DEFAULT_BRIGHTNESS, DEFAULT_CONTRAST,
+        DEFAULT_SHOW_GUIDELINES, GUIDELINE_COLORS[DEFAULT_GUIDELINE_COLOR_NAME], OUTPUT_IMAGE_WIDTH_IN_PIXELS,
+        DEFAULT_ITERATIONS
+    )
+
+
+def sample_image_url(item):
+    """Image URL of a sample, scraped from its page if it has a scraping config (None if that fails)."""
+    if item.get("scraping"):
+        from src.image_updater import get_image_url_from_item  # Lazy import, pulls in Requests
+        return get_image_url_from_item(item)
+    return item.get("image_url") or item.get("source_url")
+
+
+class WarmStart:
+    """Prefetched renders of one sample with the default settings, kept fresh by a background thread once started."""
+
+    def __init__(self, params=None, pool_size=WARM_START_POOL_SIZE, refresh_s=WARM_START_REFRESH_S,
+                 retry_s=WARM_START_RETRY_S):
+        self.item = None
+        self.params = params
+        self.multiple = False
+        self.max_pool_size = pool_size
+        self.pool_size = 1
+        self.refresh_s = refresh_s
+        self.retry_s = retry_s
+        self._renders = deque()
+        self._retired = deque()  # (retired at, path) of render files to delete after the grace period
+        self._dir = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.served = 0
+        self.fallbacks = 0
+        self.failures = 0
+
+    def take(self):
+        """A prefetched render for a page load, None when there's none (the caller renders as usual)."""
+        with self._lock:
+            self._drop_stale(time.monotonic())
+            if self.item is None:
+                return None
+            if not self._renders:
+                self.fallbacks += 1
+                return None
+            self.served += 1
+            # A multiple source's render is handed out once, every tab gets its own image
+            if self.multiple:
+                render = self._renders.popleft()
+                self._retire(render, time.monotonic())
+            else:
+                render = self._renders[0]
+        self._wake.set()
+        return render
+
+    def start(self, item):
+        """Starts prefetching the sample item (a SAMPLE_IMAGES_DATA entry), the first renders come in the background."""
+        with self._lock:
+            self.item = item
+            self.params = self.params or default_shred_params()
+            self.multiple = bool(item.get("multiple"))
+            self.pool_size = self.max_pool_size if self.multiple else 1
+            while self._renders:
+                self._retire(self._renders.popleft(), time.monotonic())
+            if self._dir is None:
+                self._dir = tempfile.mkdtemp(prefix="shredder-warm-start-")
+                atexit.register(shutil.rmtree, self._dir, ignore_errors=True)
+        self._wake.set()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="warm-start", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def fill(self):
+        """Prefetches until the pool is full (single sources: until the render is fresh). Raises on failures."""
+        while not self._stop.is_set():
+            with self._lock:
+                now = time.monotonic()
+                self._drop_stale(now)
+                if self.multiple:
+                    if len(self._renders) >= self.pool_size:
+                        return
+                elif self._renders and now - self._renders[0].created < self.refresh_s:
+                    return
+            render = self.prefetch()
+            with self._lock:
+                while not self.multiple and self._renders:
+                    self._retire(self._renders.popleft(), time.monotonic())
+                self._renders.append(render)
+                self._purge(time.monotonic())
+
+    def prefetch(self):
+        """Fetches, decodes and renders the sample once, the render is also put in the shared render cache."""
+        with metrics.span("warm_start"):
+            image_url = sample_image_url(self.item)
+            if not image_url:
+                raise ValueError(f"No image URL for the sample '{self.item.get('name')}'")
+            img = load_image_source(image_url, coalesce=not self.multiple)  # Shares a page load's download
+            image_key = image_store.put(img)
+            with render_budget.admit(img.shape, lambda shape: estimate_render_bytes(shape, self.params)) as admission:
+                if admission.scale < 1:
+                    raise ValueError("The default image doesn't fit the render memory budget at full size")
+                png_data = render_png(img, self.params, image_url=image_url)
+        render_cache.put(make_render_key(image_key, self.params, image_url), png_data)
+        with tempfile.NamedTemporaryFile(dir=self._dir, prefix="shred-", suffix=".png", delete=False) as f:
+            f.write(png_data)
+        return WarmRender(image_key, image_url, f.name, time.monotonic())
+
+    def _drop_stale(self, now):
+        # Single sources keep serving their render until the refresh replaces it, pooled ones expire
+        if self.multiple:
+            while self._renders and now - self._renders[0].created >= self.refresh_s:
+                self._retire(self._renders.popleft(), now)
+
+    def _retire(self, render, now):
+        self._retired.append((now, render.path))
+
+    def _purge(self, now):
+        while self._retired and now - self._retired[0][0] >= RETIRED_FILE_GRACE_S:
+            _, path = self._retired.popleft()
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()  # Takes during the fill wake the next one
+            wait_s = self.refresh_s
+            try:
+                self.fill()
+            except Exception as e:
+                self.failures += 1
+                wait_s = self.retry_s
+                print(f"Warning: Warm start prefetch of '{self.item.get('name')}' failed: {e}")
+            self._wake.wait(wait_s)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "renders": len(self._renders),
+                "pool_size": self.pool_size,
+                "served": self.served,
+                "fallbacks": self.fallbacks,
+                "failures": self.failures,
+            }
+
+
+warm_start = WarmStart()
+metrics.gauge("shredder_warm_start_renders", "Prefetched page-load renders ready to serve.",
+              lambda: warm_start.stats()["renders"])